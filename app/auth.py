@@ -6,14 +6,25 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 
 from app.config import settings
-from app.database import _DB
 from app.exceptions import ProblemDetail
+from app.hashing_service import hashing_service
 from app.models import UserCreate
+from app.rate_limit import rate_limiter
+from app.repository import Repository, get_repository
+from app.token_cache import TokenCache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
+token_cache = TokenCache(settings.jwt_cache_size)
+
+
+def rotate_jwt_secret(new_secret: str) -> None:
+    """Меняет секрет подписи и сбрасывает кэш проверенных токенов"""
+    settings.jwt_secret = new_secret
+    token_cache.clear()
+
 
 def create_access_token(data: Dict, expires_delta: timedelta | None = None) -> str:
     """Создаёт JWT-токен с истечением срока действия"""
@@ -28,6 +39,9 @@ def create_access_token(data: Dict, expires_delta: timedelta | None = None) -> s
 
 def get_current_user(token: str = Depends(oauth2_scheme)) -> int:
     """Декодирует JWT и возвращает user_id"""
+    cached = token_cache.get(token)
+    if cached is not None:
+        return cached
     try:
         payload = jwt.decode(
             token, settings.jwt_secret, algorithms=[settings.jwt_algorithm]
@@ -39,6 +53,8 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> int:
                 detail="Токен не содержит идентификатор пользователя",
                 status=401,
             )
+        if "exp" in payload:
+            token_cache.put(token, int(user_id), float(payload["exp"]))
         return int(user_id)
     except JWTError:
         raise ProblemDetail(
@@ -49,59 +65,63 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> int:
 
 
 @router.post("/register", response_model=Dict)
-def register(user: UserCreate):
+async def register(user: UserCreate, repo: Repository = Depends(get_repository)):
     """Регистрация нового пользователя"""
     # Проверка на дублирование
-    for existing in _DB["users"].values():
-        if existing["username"] == user.username:
-            raise ProblemDetail(
-                title="Username Exists",
-                detail="Имя пользователя уже занято",
-                status=400,
-            )
-        if existing["email"] == user.email:
-            raise ProblemDetail(
-                title="Email Exists", detail="Email уже зарегистрирован", status=400
-            )
+    if await repo.get_user_by_username(user.username) is not None:
+        raise ProblemDetail(
+            title="Username Exists",
+            detail="Имя пользователя уже занято",
+            status=400,
+        )
+    if await repo.get_user_by_email(user.email) is not None:
+        raise ProblemDetail(
+            title="Email Exists", detail="Email уже зарегистрирован", status=400
+        )
 
-    new_id = _DB["next_user_id"]
-    _DB["users"][new_id] = {
-        "id": new_id,
-        "username": user.username,
-        "email": user.email,
-        "password": user.password,
-        "created_at": datetime.now(timezone.utc),
-        "wishlists": [],
-    }
-    _DB["next_user_id"] += 1
+    record = await repo.create_user(
+        {
+            "username": user.username,
+            "email": user.email,
+            "password": await hashing_service.hash(user.password),
+            "created_at": datetime.now(timezone.utc),
+        }
+    )
 
-    return {"id": new_id, "message": "Пользователь создан"}
+    return {"id": record["id"], "message": "Пользователь создан"}
 
 
 @router.post("/login", response_model=Dict)
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    repo: Repository = Depends(get_repository),
+):
     """Аутентификация пользователя"""
-    user = None
-    for u in _DB["users"].values():
-        if u["username"] == form_data.username:
-            user = u
-            break
+    await rate_limiter.check_account(form_data.username)
+    user = await repo.get_user_by_username(form_data.username)
 
-    if not user or user["password"] != form_data.password:
+    if not user or not await hashing_service.verify(
+        form_data.password, user["password"]
+    ):
+        await rate_limiter.record_login_failure(form_data.username)
         raise ProblemDetail(
             title="Invalid Credentials",
             detail="Неверное имя пользователя или пароль",
             status=401,
         )
+    await rate_limiter.record_login_success(form_data.username)
 
     access_token = create_access_token(data={"sub": str(user["id"])})
     return {"access_token": access_token, "token_type": "bearer"}
 
 
 @router.get("/me", response_model=Dict)
-def get_me(current_user: int = Depends(get_current_user)):
+async def get_me(
+    current_user: int = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+):
     """Получить данные текущего пользователя"""
-    user = _DB["users"].get(current_user)
+    user = await repo.get_user(current_user)
     if not user:
         raise ProblemDetail(
             title="User Not Found", detail="Пользователь не найден", status=404
@@ -0,0 +1,121 @@
+import json
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+
+from app.models import WishItemCreate
+
+# Строк валидируется за один вызов TypeAdapter
+IMPORT_BATCH_SIZE = 500
+# Максимум строк в одном импорте
+MAX_IMPORT_ITEMS = 10000
+# Максимальный размер тела импорта
+MAX_IMPORT_BYTES = 10 * 1024 * 1024
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl")
+
+_items_adapter = TypeAdapter(List[WishItemCreate])
+
+
+class ImportFormatError(ValueError):
+    """Тело запроса не является JSON-массивом или NDJSON"""
+
+
+class ImportTooLarge(ValueError):
+    """Тело или число строк импорта превышает лимит"""
+
+
+async def read_body(
+    chunks: AsyncIterator[bytes], content_length: Optional[str]
+) -> bytes:
+    """
+    Читает тело импорта не больше ``MAX_IMPORT_BYTES``.
+
+    Заявленный Content-Length проверяется до чтения, фактический объём —
+    по мере поступления чанков (заголовка может не быть).
+    """
+    if content_length and content_length.isdigit():
+        if int(content_length) > MAX_IMPORT_BYTES:
+            raise ImportTooLarge(f"Тело импорта больше {MAX_IMPORT_BYTES} байт")
+    body = bytearray()
+    async for chunk in chunks:
+        body += chunk
+        if len(body) > MAX_IMPORT_BYTES:
+            raise ImportTooLarge(f"Тело импорта больше {MAX_IMPORT_BYTES} байт")
+    return bytes(body)
+
+
+def _row_error(row: int, loc: Tuple[Any, ...], msg: str) -> dict:
+    return {"row": row, "loc": list(loc), "msg": msg}
+
+
+def _too_many_rows() -> str:
+    return f"Не более {MAX_IMPORT_ITEMS} элементов за запрос"
+
+
+def parse_rows(body: bytes, content_type: str) -> Tuple[List[Any], List[dict]]:
+    """
+    Разбирает тело импорта в список сырых строк.
+
+    NDJSON читается построчно: битая строка попадает в ошибки, остальные
+    импортируются; разбор прекращается, как только строк больше
+    ``MAX_IMPORT_ITEMS``. JSON-массив разбирается целиком.
+    """
+    if content_type.split(";")[0].strip().lower() in NDJSON_MEDIA_TYPES:
+        rows: List[Any] = []
+        errors: List[dict] = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            if len(rows) >= MAX_IMPORT_ITEMS:
+                raise ImportTooLarge(_too_many_rows())
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                errors.append(_row_error(len(rows), (), "Некорректный JSON"))
+                rows.append(None)
+        return rows, errors
+    try:
+        rows = json.loads(body)
+    except ValueError:
+        raise ImportFormatError("Некорректный JSON")
+    if not isinstance(rows, list):
+        raise ImportFormatError("Ожидается JSON-массив элементов")
+    if len(rows) > MAX_IMPORT_ITEMS:
+        raise ImportTooLarge(_too_many_rows())
+    return rows, []
+
+
+def validate_rows(
+    rows: List[Any], skip: frozenset = frozenset()
+) -> Tuple[List[Tuple[int, WishItemCreate]], List[dict]]:
+    """
+    Валидирует строки пачками через ``TypeAdapter(List[WishItemCreate])``.
+
+    Возвращает пары (номер строки, модель) для валидных строк и ошибки
+    по строкам; строки из ``skip`` уже отклонены при разборе.
+    """
+    valid: List[Tuple[int, WishItemCreate]] = []
+    errors: List[dict] = []
+    for start in range(0, len(rows), IMPORT_BATCH_SIZE):
+        numbers = [
+            n
+            for n in range(start, min(start + IMPORT_BATCH_SIZE, len(rows)))
+            if n not in skip
+        ]
+        batch = [rows[n] for n in numbers]
+        try:
+            items = _items_adapter.validate_python(batch)
+        except ValidationError as exc:
+            # loc[0] — индекс в пачке; невалидные строки исключаем целиком
+            failed = set()
+            for error in exc.errors(include_url=False, include_input=False):
+                position, *loc = error["loc"]
+                failed.add(position)
+                errors.append(_row_error(numbers[position], tuple(loc), error["msg"]))
+            batch = [row for i, row in enumerate(batch) if i not in failed]
+            numbers = [n for i, n in enumerate(numbers) if i not in failed]
+            items = _items_adapter.validate_python(batch)
+        valid.extend(zip(numbers, items))
+    errors.sort(key=lambda error: error["row"])
+    return valid, errors
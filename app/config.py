@@ -1,11 +1,87 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings
 
 
 class Settings(BaseSettings):
     jwt_secret: str
     jwt_algorithm: str = "HS256"
+    jwt_cache_size: int = 10000
+
+    # Хранилище: memory | postgres | sqlite
+    db_backend: str = "memory"
+    db_name: str = "wishlist"
+    db_user: str = "postgres"
+    db_password: str = ""
+    db_host: str = "localhost"
+    db_port: int = 5432
+    db_path: str = "wishlist.db"
+
+    # Memory-бэкенд: журнал + снимки в каталоге persist_dir (пусто — без диска)
+    persist_dir: str = ""
+    wal_commit_interval: float = 0.005
+    snapshot_interval: float = 300.0
+
+    # Процессы uvicorn (тот же WEB_CONCURRENCY читает ``uvicorn --workers``).
+    # Больше одного — только с общими хранилищем и лимитером: sqlite или postgres
+    web_concurrency: int = 1
+
+    # Пул соединений
+    db_pool_min_size: int = 1
+    db_pool_max_size: int = 10
+    db_pool_timeout: float = 5.0
+    db_command_timeout: float = 10.0
+    db_statement_cache_size: int = 256
+
+    # Argon2: пул процессов и очередь допуска
+    hash_pool_workers: int = 2
+    hash_queue_limit: int = 32
+    hash_queue_timeout: float = 5.0
+
+    # Rate limiting /auth/* (ADR-003): memory | sqlite
+    rate_limit_backend: str = "memory"
+    rate_limit_path: str = "rate_limits.db"
+    rate_limit_shards: int = 16
+    auth_ip_limit: int = 200
+    auth_ip_window: float = 3600.0
+    login_failure_limit: int = 5
+    login_failure_window: float = 900.0
+
+    # Логи: JSON в фоновом потоке; при переполнении очереди записи отбрасываются
+    log_level: str = "INFO"
+    log_queue_size: int = 10000
+
+    # Idempotency-Key: кэш ответов (записи, TTL в с), ожидание повтора, тело ответа
+    idempotency_cache_size: int = 10000
+    idempotency_ttl: float = 86400.0
+    idempotency_wait_timeout: float = 10.0
+    idempotency_max_body: int = 65536
+
+    # Резерв снимается через reservation_ttl секунд (0 — резервы бессрочные)
+    reservation_ttl: float = 0.0
+
+    # Лента изменений (SSE): очередь подписчика в элементах, пинг простоя, с
+    events_queue_size: int = 256
+    events_heartbeat: float = 15.0
+
+    # Быстрые JSON-ответы: orjson + сериализация записей без повторной валидации
+    fast_json: bool = False
 
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8", "extra": "ignore"}
 
+    @model_validator(mode="after")
+    def _shared_state_for_workers(self) -> "Settings":
+        # Memory-бэкенд и memory-лимитер живут в процессе: у каждого воркера
+        # были бы свои данные, счётчики id и лимиты
+        if self.web_concurrency > 1:
+            if self.db_backend == "memory":
+                raise ValueError(
+                    "WEB_CONCURRENCY > 1 требует DB_BACKEND=sqlite|postgres"
+                )
+            if self.rate_limit_backend == "memory":
+                raise ValueError(
+                    "WEB_CONCURRENCY > 1 требует RATE_LIMIT_BACKEND=sqlite"
+                )
+        return self
+
 
 settings = Settings()
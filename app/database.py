@@ -1,8 +1,921 @@
+import heapq
+import itertools
+import sys
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Deque, Dict, Iterator, List, Optional, Protocol, Tuple, Union
+
+from app.search import SEARCH_FIELDS, SEARCH_PAGE_SIZE, SearchIndex, query_terms
+
+# Число блокировок для элементов: item_id → lock по модулю
+ITEM_LOCK_STRIPES = 64
+
+# Элементов удалённых вишлистов, снимаемых с индексов за один шаг ``reclaim``
+RECLAIM_CHUNK = 1000
+
+# Поля элемента, по которым строятся индексы вишлиста
+INDEXED_ITEM_FIELDS = ("category", "price", "is_reserved")
+
+
+# Цена в индексе — целое число миллионных долей (точное сравнение без Decimal)
+PRICE_KEY_SCALE = 6
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+PriceKey = Union[int, Decimal]
+
+
+def _to_micros(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else _EPOCH + timedelta(microseconds=value)
+
+
+def _pack_price(value: Any) -> Tuple[Optional[int], int]:
+    """Decimal → (целое в единицах последнего знака, показатель степени)"""
+    if value is None:
+        return None, 0
+    if not isinstance(value, Decimal):
+        value = Decimal(str(value))
+    exponent = value.as_tuple().exponent
+    return int(value.scaleb(-exponent)), exponent
+
+
+def _price_key(value: Decimal) -> PriceKey:
+    key = value.scaleb(PRICE_KEY_SCALE)
+    return int(key) if key == key.to_integral_value() else key
+
+
+def _remove_sorted(values: list, value) -> None:
+    position = bisect_left(values, value)
+    if position < len(values) and values[position] == value:
+        del values[position]
+
+
+def _contains_sorted(values: List[int], value: int) -> bool:
+    position = bisect_left(values, value)
+    return position < len(values) and values[position] == value
+
+
+class StoredItem:
+    """
+    Компактная запись элемента в памяти.
+
+    Вместо dict с повторяющимися ключами — ``__slots__``; время хранится
+    целым числом микросекунд от эпохи, цена — целым в единицах последнего
+    знака плюс показатель степени (``Decimal`` восстанавливается точно),
+    категории интернируются. Наружу запись отдаётся через ``to_dict``.
+    """
+
+    __slots__ = (
+        "id",
+        "wishlist_id",
+        "version",
+        "name",
+        "description",
+        "price_units",
+        "price_exp",
+        "url",
+        "category",
+        "is_reserved",
+        "reserved_by",
+        "reserved_at",
+        "reservation_message",
+        "created_at",
+        "updated_at",
+    )
+
+    _TIMESTAMPS = ("created_at", "updated_at", "reserved_at")
+    _TEXT = ("name", "description", "url", "reserved_by", "reservation_message")
+
+    def __init__(self, item_id: int, wishlist_id: int, version: int, record: dict):
+        self.id = item_id
+        self.wishlist_id = wishlist_id
+        self.version = version
+        self.name = self.description = self.url = self.category = None
+        self.reserved_by = self.reservation_message = None
+        self.price_units, self.price_exp = None, 0
+        self.is_reserved = False
+        self.reserved_at = self.created_at = self.updated_at = None
+        self.update(record)
+
+    def update(self, changes: dict) -> None:
+        """Применяет изменения; неизвестные и служебные ключи игнорируются"""
+        for field, value in changes.items():
+            if field == "price":
+                self.price_units, self.price_exp = _pack_price(value)
+            elif field in self._TIMESTAMPS:
+                setattr(self, field, _to_micros(value))
+            elif field == "category":
+                self.category = None if value is None else sys.intern(value)
+            elif field == "is_reserved":
+                self.is_reserved = bool(value)
+            elif field in self._TEXT:
+                setattr(self, field, value)
+        if self.updated_at == self.created_at:
+            # Одно целое на оба поля, пока элемент не менялся
+            self.updated_at = self.created_at
+
+    @property
+    def price(self) -> Optional[Decimal]:
+        if self.price_units is None:
+            return None
+        return Decimal(self.price_units).scaleb(self.price_exp)
+
+    @property
+    def price_key(self) -> Optional[PriceKey]:
+        if self.price_units is None:
+            return None
+        if self.price_exp >= -PRICE_KEY_SCALE:
+            return self.price_units * 10 ** (self.price_exp + PRICE_KEY_SCALE)
+        return _price_key(self.price)
+
+    def get(self, field: str) -> Any:
+        """Значение поля в том виде, в каком его видят вызывающие"""
+        if field == "price":
+            return self.price
+        if field in self._TIMESTAMPS:
+            return _from_micros(getattr(self, field))
+        return getattr(self, field, None)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "wishlist_id": self.wishlist_id,
+            "name": self.name,
+            "description": self.description,
+            "price": self.price,
+            "url": self.url,
+            "category": self.category,
+            "is_reserved": self.is_reserved,
+            "reserved_by": self.reserved_by,
+            "reserved_at": _from_micros(self.reserved_at),
+            "reservation_message": self.reservation_message,
+            "created_at": _from_micros(self.created_at),
+            "updated_at": _from_micros(self.updated_at),
+            "version": self.version,
+        }
+
+
+class ItemIndex:
+    """
+    Упорядоченные индексы элементов одного вишлиста.
+
+    Все списки отсортированы, поэтому страница после курсора ``after``
+    находится бинарным поиском, а фильтры по категории, цене и статусу
+    резерва сужают выборку без перебора всех элементов.
+
+    Заодно индекс — материализованная сводка вишлиста: число элементов и
+    резервов — длины списков, min/max цены — края ``by_price``, сумма цен и
+    время последнего изменения ведутся теми же add/remove (см. ``summary``).
+    """
+
+    __slots__ = (
+        "ids",
+        "by_category",
+        "reserved",
+        "available",
+        "by_price",
+        "total_price",
+        "updated_at",
+        "lock",
+    )
+
+    def __init__(self, created_at: Optional[int] = None) -> None:
+        self.ids: List[int] = []
+        self.by_category: Dict[str, List[int]] = {}
+        self.reserved: List[int] = []
+        self.available: List[int] = []
+        self.by_price: List[Tuple[PriceKey, int]] = []
+        self.total_price = Decimal(0)
+        self.updated_at = created_at
+        self.lock = threading.Lock()
+
+    def _touch(self, micros: Optional[int]) -> None:
+        if micros is not None and (self.updated_at is None or micros > self.updated_at):
+            self.updated_at = micros
+
+    def touch(self, micros: Optional[int]) -> None:
+        """Сдвигает время последнего изменения (не назад)"""
+        with self.lock:
+            self._touch(micros)
+
+    def add(self, item: StoredItem) -> None:
+        item_id = item.id
+        with self.lock:
+            insort(self.ids, item_id)
+            if item.category is not None:
+                insort(self.by_category.setdefault(item.category, []), item_id)
+            insort(self.reserved if item.is_reserved else self.available, item_id)
+            if item.price_units is not None:
+                insort(self.by_price, (item.price_key, item_id))
+                self.total_price += item.price
+            self._touch(item.updated_at)
+
+    def extend(self, items: List[StoredItem]) -> None:
+        """Добавляет пачку элементов с id больше уже проиндексированных"""
+        with self.lock:
+            for item in items:
+                item_id = item.id
+                self.ids.append(item_id)
+                if item.category is not None:
+                    self.by_category.setdefault(item.category, []).append(item_id)
+                status = self.reserved if item.is_reserved else self.available
+                status.append(item_id)
+                if item.price_units is not None:
+                    self.by_price.append((item.price_key, item_id))
+                    self.total_price += item.price
+                self._touch(item.updated_at)
+            self.by_price.sort()
+
+    def remove(self, item: StoredItem) -> None:
+        item_id = item.id
+        with self.lock:
+            _remove_sorted(self.ids, item_id)
+            category = item.category
+            if category is not None:
+                ids = self.by_category.get(category, [])
+                _remove_sorted(ids, item_id)
+                if not ids:
+                    self.by_category.pop(category, None)
+            status = self.reserved if item.is_reserved else self.available
+            _remove_sorted(status, item_id)
+            if item.price_units is not None:
+                _remove_sorted(self.by_price, (item.price_key, item_id))
+                self.total_price -= item.price
+
+    def summary(self, items: Dict[int, StoredItem]) -> dict:
+        """Счётчики и цены вишлиста за O(1); ``items`` — его элементы по id"""
+        with self.lock:
+            min_price = max_price = None
+            if self.by_price:
+                min_price = items[self.by_price[0][1]].price
+                max_price = items[self.by_price[-1][1]].price
+            return {
+                "item_count": len(self.ids),
+                "reserved_count": len(self.reserved),
+                "total_price": self.total_price,
+                "min_price": min_price,
+                "max_price": max_price,
+                "updated_at": _from_micros(self.updated_at),
+            }
+
+    def page(
+        self,
+        items: Dict[int, StoredItem],
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        is_reserved: Optional[bool] = None,
+    ) -> List[int]:
+        """
+        id элементов, удовлетворяющих фильтрам, по возрастанию после ``after``.
+
+        ``items`` — элементы вишлиста по id (для проверки цены). Ведущий —
+        самый короткий список по id: обход с курсора проверяет цену и
+        остальные фильтры у каждого кандидата и останавливается на
+        ``limit``. Диапазон ``by_price`` упорядочен по цене, поэтому его
+        перебирают, только если он короче ожидаемого обхода; из него
+        берутся ``limit`` наименьших id после курсора.
+        """
+        with self.lock:
+            candidates: List[List[int]] = []
+            if category is not None:
+                candidates.append(self.by_category.get(category, []))
+            if is_reserved is not None:
+                candidates.append(self.reserved if is_reserved else self.available)
+            if not candidates:
+                candidates.append(self.ids)
+            candidates.sort(key=len)
+
+            priced = min_price is not None or max_price is not None
+            if priced:
+                low = None if min_price is None else _price_key(min_price)
+                high = None if max_price is None else _price_key(max_price)
+                lo = 0 if low is None else bisect_left(self.by_price, (low,))
+                hi = len(self.by_price)
+                if high is not None:
+                    hi = bisect_right(self.by_price, (high, float("inf")))
+
+            driver, others = candidates[0], candidates[1:]
+            start = 0 if after is None else bisect_right(driver, after)
+            if priced:
+                # Ожидаемая длина обхода ведущего списка до limit совпадений
+                # по цене против размера ценового диапазона
+                walk = len(driver) - start
+                if limit is not None and hi > lo:
+                    walk = min(walk, limit * len(driver) // (hi - lo))
+                if hi - lo < walk:
+                    return self._price_page(lo, hi, after, limit, candidates)
+            if not others and not priced:
+                stop = None if limit is None else start + limit
+                return driver[start:stop]
+            result: List[int] = []
+            for position in range(start, len(driver)):
+                item_id = driver[position]
+                if priced:
+                    key = items[item_id].price_key
+                    if (
+                        key is None
+                        or (low is not None and key < low)
+                        or (high is not None and key > high)
+                    ):
+                        continue
+                if all(_contains_sorted(other, item_id) for other in others):
+                    result.append(item_id)
+                    if limit is not None and len(result) >= limit:
+                        break
+            return result
+
+    def _price_page(
+        self,
+        lo: int,
+        hi: int,
+        after: Optional[int],
+        limit: Optional[int],
+        others: List[List[int]],
+    ) -> List[int]:
+        # Узкий ценовой диапазон: курсор и фильтры применяются до сортировки
+        others = [other for other in others if other is not self.ids]
+        floor = -1 if after is None else after
+        matches = [item_id for _, item_id in self.by_price[lo:hi] if item_id > floor]
+        if others:
+            matches = [
+                item_id
+                for item_id in matches
+                if all(_contains_sorted(other, item_id) for other in others)
+            ]
+        if limit is not None and limit * 8 < len(matches):
+            return heapq.nsmallest(limit, matches)
+        matches.sort()
+        return matches if limit is None else matches[:limit]
+
+
+class Journal(Protocol):
+    """Приёмник мутаций стора (журнал упреждающей записи, см. app.persistence)"""
+
+    def record(self, op: str, *args: Any) -> None: ...
+
+
+class InMemoryStore:
+    """
+    In-memory хранилище с вторичными индексами.
+
+    Индексы username → user, email → user, item_id → wishlist_id,
+    owner_id → [wishlist_id] и упорядоченные индексы элементов каждого
+    вишлиста поддерживаются всеми мутирующими методами, поэтому поиск по
+    ним выполняется без сканирования таблиц. Список вишлистов владельца —
+    тот же объект, что и ``user["wishlists"]``.
+
+    Каждое изменение элемента выдаёт новое значение ``version`` элементу и
+    его вишлисту из общего монотонного счётчика (``next`` атомарен под GIL).
+
+    Элементы публичных вишлистов дополнительно ведутся в ``search_index``
+    (см. ``app.search``), а сами публичные вишлисты — в упорядоченном
+    списке для ленты ``public_wishlists``.
+
+    Удаление вишлиста (и пользователя со всеми вишлистами) трогает только
+    его собственные записи: вишлист отсоединяется от индексов за O(log n),
+    а его элементы ставятся в очередь ``reclaim``. Первый шаг очереди
+    выполняется сразу, поэтому обычный вишлист снимается с индексов целиком;
+    остаток большого каскада дочищается фоном (см. ``InMemoryRepository``).
+    До этого записи item_id → wishlist_id удалённого вишлиста живы, поэтому
+    элемент считается существующим, только пока существует его вишлист.
+
+    Если задан ``journal``, каждая мутация передаётся в него операцией с
+    итоговым состоянием записи; ``restore`` применяет такие операции
+    идемпотентно при восстановлении.
+    """
+
+    def __init__(self) -> None:
+        self.users: Dict[int, dict] = {}
+        self.wishlists: Dict[int, dict] = {}
+        self.next_user_id = 1
+        self.next_wishlist_id = 1
+        self.next_item_id = 1
+
+        self._users_by_username: Dict[str, dict] = {}
+        self._users_by_email: Dict[str, dict] = {}
+        self._item_wishlist: Dict[int, int] = {}
+        self._owner_wishlists: Dict[int, List[int]] = {}
+        self._wishlist_ids: List[int] = []
+        self._public_wishlist_ids: List[int] = []
+        self._item_indexes: Dict[int, ItemIndex] = {}
+        self._item_locks = [threading.Lock() for _ in range(ITEM_LOCK_STRIPES)]
+        self.search_index = SearchIndex(_price_key)
+        # (вишлист был в поиске, элементы) удалённых вишлистов
+        self._garbage: Deque[Tuple[bool, Iterator[StoredItem]]] = deque()
+        self.reclaim_pending = 0
+        self._versions = itertools.count(1)
+        self._restored_version = 0
+        self.journal: Optional[Journal] = None
+
+    def _log(self, op: str, *args: Any) -> None:
+        if self.journal is not None:
+            self.journal.record(op, *args)
+
+    # --- users ---
+
+    def add_user(self, record: dict) -> dict:
+        """Добавляет пользователя и присваивает ему id"""
+        user_id = self.next_user_id
+        self.next_user_id += 1
+        record["id"] = user_id
+        record["wishlists"] = self._owner_wishlists.setdefault(user_id, [])
+        self.users[user_id] = record
+        self._users_by_username[record["username"]] = record
+        self._users_by_email[record["email"]] = record
+        self._log("user", record)
+        return record
+
+    def get_user(self, user_id: int) -> Optional[dict]:
+        return self.users.get(user_id)
+
+    def get_user_by_username(self, username: str) -> Optional[dict]:
+        return self._users_by_username.get(username)
+
+    def get_user_by_email(self, email: str) -> Optional[dict]:
+        return self._users_by_email.get(email)
+
+    def update_user(self, user_id: int, changes: dict) -> dict:
+        """Обновляет поля пользователя с переиндексацией username/email"""
+        user = self.users[user_id]
+        if "username" in changes and changes["username"] != user["username"]:
+            del self._users_by_username[user["username"]]
+            self._users_by_username[changes["username"]] = user
+        if "email" in changes and changes["email"] != user["email"]:
+            del self._users_by_email[user["email"]]
+            self._users_by_email[changes["email"]] = user
+        user.update(changes)
+        self._log("user", user)
+        return user
+
+    def delete_user(self, user_id: int) -> dict:
+        """Удаляет пользователя вместе со всеми его вишлистами"""
+        for wishlist_id in list(self._owner_wishlists.get(user_id, ())):
+            self._detach_wishlist(wishlist_id)
+        self.reclaim()
+        self._owner_wishlists.pop(user_id, None)
+        user = self.users.pop(user_id)
+        del self._users_by_username[user["username"]]
+        del self._users_by_email[user["email"]]
+        self._log("delete_user", user_id)
+        return user
+
+    # --- wishlists ---
+
+    def add_wishlist(self, record: dict) -> dict:
+        """Добавляет вишлист и присваивает ему id"""
+        wishlist_id = self.next_wishlist_id
+        self.next_wishlist_id += 1
+        record["id"] = wishlist_id
+        record.setdefault("items", {})
+        record["version"] = next(self._versions)
+        self.wishlists[wishlist_id] = record
+        insort(self._owner_wishlists.setdefault(record["owner_id"], []), wishlist_id)
+        insort(self._wishlist_ids, wishlist_id)
+        if self._searchable(record):
+            insort(self._public_wishlist_ids, wishlist_id)
+        self._item_indexes[wishlist_id] = ItemIndex(
+            _to_micros(record.get("created_at"))
+        )
+        self._log("wishlist", record)
+        return record
+
+    def get_wishlist(self, wishlist_id: int) -> Optional[dict]:
+        return self.wishlists.get(wishlist_id)
+
+    def wishlists_of(
+        self, owner_id: int, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Вишлисты пользователя в порядке создания, после курсора ``after``"""
+        owned = self._owner_wishlists.get(owner_id, [])
+        start = 0 if after is None else bisect_right(owned, after)
+        stop = None if limit is None else start + limit
+        return [self.wishlists[wishlist_id] for wishlist_id in owned[start:stop]]
+
+    def wishlists_page(
+        self, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Все вишлисты по возрастанию id, после курсора ``after``"""
+        start = 0 if after is None else bisect_right(self._wishlist_ids, after)
+        stop = None if limit is None else start + limit
+        return [
+            self.wishlists[wishlist_id]
+            for wishlist_id in self._wishlist_ids[start:stop]
+        ]
+
+    def public_wishlists(
+        self, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Публичные вишлисты по возрастанию id, после курсора ``after``"""
+        public = self._public_wishlist_ids
+        start = 0 if after is None else bisect_right(public, after)
+        stop = None if limit is None else start + limit
+        return [self.wishlists[wishlist_id] for wishlist_id in public[start:stop]]
+
+    def summaries(self, wishlist_ids: List[int]) -> Dict[int, dict]:
+        """Сводки существующих вишлистов из ``wishlist_ids``: id → сводка"""
+        found = {}
+        for wishlist_id in wishlist_ids:
+            wishlist = self.wishlists.get(wishlist_id)
+            if wishlist is not None:
+                found[wishlist_id] = self.summary(wishlist)
+        return found
+
+    def summary(self, wishlist: dict) -> dict:
+        """Сводка вишлиста из материализованных счётчиков его ``ItemIndex``"""
+        return {
+            "id": wishlist["id"],
+            "owner_id": wishlist["owner_id"],
+            "name": wishlist["name"],
+            "description": wishlist.get("description"),
+            "is_public": wishlist.get("is_public", True),
+            **self._item_indexes[wishlist["id"]].summary(wishlist["items"]),
+        }
+
+    def _touch(self, wishlist_id: int) -> None:
+        self.wishlists[wishlist_id]["version"] = next(self._versions)
+
+    def delete_wishlist(self, wishlist_id: int) -> dict:
+        """Удаляет вишлист; его элементы снимаются с индексов через ``reclaim``"""
+        wishlist = self._detach_wishlist(wishlist_id)
+        self.reclaim()
+        return wishlist
+
+    def _detach_wishlist(self, wishlist_id: int) -> dict:
+        wishlist = self.wishlists.pop(wishlist_id)
+        searchable = self._searchable(wishlist)
+        if wishlist["items"]:
+            # Копия: вызывающий получает вишлист вместе со словарём элементов
+            self._garbage.append((searchable, iter(list(wishlist["items"].values()))))
+            self.reclaim_pending += len(wishlist["items"])
+        self._item_indexes.pop(wishlist_id, None)
+        _remove_sorted(self._wishlist_ids, wishlist_id)
+        if searchable:
+            _remove_sorted(self._public_wishlist_ids, wishlist_id)
+        owned = self._owner_wishlists.get(wishlist["owner_id"])
+        if owned is not None:
+            _remove_sorted(owned, wishlist_id)
+            # Пустой список пользователя остаётся: это его user["wishlists"]
+            if not owned and wishlist["owner_id"] not in self.users:
+                del self._owner_wishlists[wishlist["owner_id"]]
+        self._log("delete_wishlist", wishlist_id)
+        return wishlist
+
+    def reclaim(self, limit: int = RECLAIM_CHUNK) -> int:
+        """
+        Снимает с индексов до ``limit`` элементов удалённых вишлистов;
+        возвращает их число (0 — очередь пуста).
+        """
+        reclaimed = 0
+        while self._garbage and reclaimed < limit:
+            searchable, items = self._garbage[0]
+            for item in itertools.islice(items, limit - reclaimed):
+                self._item_wishlist.pop(item.id, None)
+                if searchable:
+                    self.search_index.remove(item)
+                reclaimed += 1
+            if reclaimed < limit:
+                self._garbage.popleft()
+        self.reclaim_pending -= reclaimed
+        return reclaimed
+
+    # --- items ---
+
+    @staticmethod
+    def _searchable(wishlist: dict) -> bool:
+        return wishlist.get("is_public", True)
+
+    def add_item(self, wishlist_id: int, record: dict) -> dict:
+        """Добавляет элемент в вишлист и присваивает ему id"""
+        item_id = self.next_item_id
+        self.next_item_id += 1
+        item = StoredItem(item_id, wishlist_id, next(self._versions), record)
+        self.wishlists[wishlist_id]["items"][item_id] = item
+        self._item_wishlist[item_id] = wishlist_id
+        self._item_indexes[wishlist_id].add(item)
+        if self._searchable(self.wishlists[wishlist_id]):
+            self.search_index.add(item)
+        self._touch(wishlist_id)
+        self._log("item", item, self.wishlists[wishlist_id]["version"])
+        return item.to_dict()
+
+    def add_items(self, wishlist_id: int, records: List[dict]) -> List[dict]:
+        """Добавляет пачку элементов, выделяя им непрерывный блок id"""
+        first_id = self.next_item_id
+        self.next_item_id += len(records)
+        items = self.wishlists[wishlist_id]["items"]
+        stored = [
+            StoredItem(item_id, wishlist_id, next(self._versions), record)
+            for item_id, record in enumerate(records, start=first_id)
+        ]
+        for item in stored:
+            items[item.id] = item
+            self._item_wishlist[item.id] = wishlist_id
+        self._item_indexes[wishlist_id].extend(stored)
+        if self._searchable(self.wishlists[wishlist_id]):
+            self.search_index.extend(stored)
+        self._touch(wishlist_id)
+        if self.journal is not None:
+            version = self.wishlists[wishlist_id]["version"]
+            for item in stored:
+                self.journal.record("item", item, version)
+        return [item.to_dict() for item in stored]
+
+    def _stored_item(self, wishlist_id: int, item_id: int) -> Optional[StoredItem]:
+        if self._item_wishlist.get(item_id) != wishlist_id:
+            return None
+        wishlist = self.wishlists.get(wishlist_id)
+        return None if wishlist is None else wishlist["items"][item_id]
+
+    def get_item(self, item_id: int) -> Optional[dict]:
+        """Ищет элемент по id через индекс item_id → wishlist_id"""
+        wishlist_id = self._item_wishlist.get(item_id)
+        if wishlist_id is None:
+            return None
+        item = self._stored_item(wishlist_id, item_id)
+        return None if item is None else item.to_dict()
+
+    def get_items(self, item_ids: List[int]) -> Dict[int, dict]:
+        """Элементы по id за один проход индекса item_id → wishlist_id"""
+        found = {}
+        for item_id in item_ids:
+            item = self._stored_item(self._item_wishlist.get(item_id), item_id)
+            if item is not None:
+                found[item_id] = item.to_dict()
+        return found
+
+    def get_wishlist_item(self, wishlist_id: int, item_id: int) -> Optional[dict]:
+        item = self._stored_item(wishlist_id, item_id)
+        return None if item is None else item.to_dict()
+
+    def list_items(self, wishlist_id: int, **filters) -> List[dict]:
+        """Страница элементов вишлиста; фильтры — см. ``ItemIndex.page``"""
+        wishlist = self.wishlists.get(wishlist_id)
+        if wishlist is None:
+            return []
+        items = wishlist["items"]
+        if all(value is None for value in filters.values()):
+            return [item.to_dict() for item in items.values()]
+        page = self._item_indexes[wishlist_id].page(items, **filters)
+        return [items[item_id].to_dict() for item_id in page]
+
+    def reserved_items(self) -> Iterator[StoredItem]:
+        """Зарезервированные элементы — по спискам ``reserved`` индексов"""
+        for wishlist_id, index in list(self._item_indexes.items()):
+            wishlist = self.wishlists.get(wishlist_id)
+            if wishlist is None:
+                continue
+            with index.lock:
+                reserved = index.reserved[:]
+            for item_id in reserved:
+                item = wishlist["items"].get(item_id)
+                if item is not None:
+                    yield item
+
+    def _apply(self, wishlist_id: int, item: StoredItem, changes: dict) -> dict:
+        reindex = any(
+            field in changes and changes[field] != item.get(field)
+            for field in INDEXED_ITEM_FIELDS
+        )
+        searchable = self._searchable(self.wishlists[wishlist_id]) and any(
+            field in changes and changes[field] != item.get(field)
+            for field in SEARCH_FIELDS
+        )
+        if reindex:
+            self._item_indexes[wishlist_id].remove(item)
+        if searchable:
+            self.search_index.remove(item)
+        item.update(changes)
+        item.version = next(self._versions)
+        if reindex:
+            self._item_indexes[wishlist_id].add(item)
+        else:
+            self._item_indexes[wishlist_id].touch(item.updated_at)
+        if searchable:
+            self.search_index.add(item)
+        self._touch(wishlist_id)
+        self._log("item", item, self.wishlists[wishlist_id]["version"])
+        return item.to_dict()
+
+    def update_item(self, wishlist_id: int, item_id: int, changes: dict) -> dict:
+        item = self.wishlists[wishlist_id]["items"][item_id]
+        return self._apply(wishlist_id, item, changes)
+
+    def compare_and_set_item(
+        self, wishlist_id: int, item_id: int, expected: dict, changes: dict
+    ) -> Optional[dict]:
+        """
+        Атомарно применяет ``changes``, если поля элемента равны ``expected``.
+
+        Блокировка берётся по полосе item_id, поэтому операции над разными
+        элементами почти никогда не конкурируют. Возвращает обновлённый
+        элемент или ``None``, если элемента нет или условие не выполнено.
+        """
+        with self._item_locks[item_id % ITEM_LOCK_STRIPES]:
+            item = self._matching_item(wishlist_id, item_id, expected)
+            if item is None:
+                return None
+            return self._apply(wishlist_id, item, changes)
+
+    def compare_and_delete_item(
+        self, wishlist_id: int, item_id: int, expected: dict
+    ) -> Optional[dict]:
+        """Удаляет элемент, если его поля равны ``expected``; иначе ``None``"""
+        with self._item_locks[item_id % ITEM_LOCK_STRIPES]:
+            if self._matching_item(wishlist_id, item_id, expected) is None:
+                return None
+            return self.delete_item(wishlist_id, item_id)
+
+    def _matching_item(
+        self, wishlist_id: int, item_id: int, expected: dict
+    ) -> Optional[StoredItem]:
+        item = self._stored_item(wishlist_id, item_id)
+        if item is None:
+            return None
+        for field, value in expected.items():
+            if item.get(field) != value:
+                return None
+        return item
+
+    def delete_item(self, wishlist_id: int, item_id: int) -> dict:
+        item = self.wishlists[wishlist_id]["items"].pop(item_id)
+        del self._item_wishlist[item_id]
+        index = self._item_indexes[wishlist_id]
+        index.remove(item)
+        index.touch(_to_micros(datetime.now(timezone.utc)))
+        if self._searchable(self.wishlists[wishlist_id]):
+            self.search_index.remove(item)
+        self._touch(wishlist_id)
+        version = self.wishlists[wishlist_id]["version"]
+        self._log("delete_item", wishlist_id, item_id, version)
+        return item.to_dict()
+
+    def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = SEARCH_PAGE_SIZE,
+        offset: int = 0,
+    ) -> Tuple[int, List[dict], Dict[str, int], Dict[int, int]]:
+        """
+        Поиск по элементам публичных вишлистов (см. ``SearchIndex.search``).
+
+        Возвращает элементы страницы с полем ``score`` вместо пар (id, ранг).
+        Элементы удалённого, но ещё не дочищенного вишлиста на страницу не
+        попадают (в итог и фасеты — до ``reclaim``).
+        """
+        total, page, categories, prices = self.search_index.search(
+            query_terms(query), category, min_price, max_price, limit, offset
+        )
+        items = []
+        for item_id, score in page:
+            stored = self._stored_item(self._item_wishlist.get(item_id), item_id)
+            if stored is None:
+                continue
+            item = stored.to_dict()
+            item["score"] = score
+            items.append(item)
+        return total, items, categories, prices
+
+    def counts(self) -> Dict[str, int]:
+        return {
+            "users": len(self.users),
+            "wishlists": len(self.wishlists),
+            "items": len(self._item_wishlist) - self.reclaim_pending,
+        }
+
+    # --- восстановление ---
+
+    def restore(self, op: str, *args: Any) -> None:
+        """
+        Применяет операцию журнала, не записывая её в журнал повторно.
+
+        Операции несут итоговое состояние записи, поэтому повтор уже
+        применённой операции безвреден, а удаление отсутствующей — no-op.
+        Индексы элементов перестраиваются в ``finish_restore``.
+        """
+        journal, self.journal = self.journal, None
+        try:
+            getattr(self, f"_restore_{op}")(*args)
+        finally:
+            self.journal = journal
+
+    def finish_restore(self, version: int = 0) -> None:
+        """
+        Завершает восстановление: строит индексы элементов одной пачкой на
+        вишлист и продолжает счётчик версий после восстановленных записей.
+
+        Время изменения сводки после восстановления — самое позднее из
+        создания вишлиста и ``updated_at`` его элементов: моменты удалений
+        в журнал не пишутся.
+        """
+        while self.reclaim():
+            pass
+        self.search_index = SearchIndex(_price_key)
+        for wishlist_id, wishlist in self.wishlists.items():
+            items = sorted(wishlist["items"].values(), key=lambda item: item.id)
+            created_at = _to_micros(wishlist.get("created_at"))
+            index = self._item_indexes[wishlist_id] = ItemIndex(created_at)
+            index.extend(items)
+            if self._searchable(wishlist):
+                self.search_index.extend(items)
+        self._seen_version(version)
+        self._versions = itertools.count(self._restored_version + 1)
+
+    def current_version(self) -> int:
+        """Выдаёт версию, не меньшую любой уже выданной (для снимка)"""
+        return next(self._versions)
+
+    def _seen_version(self, version: int) -> None:
+        if version > self._restored_version:
+            self._restored_version = version
+
+    def _restore_user(self, record: dict) -> None:
+        # Список вишлистов строится заново из восстановленных вишлистов
+        record.pop("wishlists", None)
+        user_id = record["id"]
+        if user_id in self.users:
+            self.update_user(user_id, record)
+            return
+        record["wishlists"] = self._owner_wishlists.setdefault(user_id, [])
+        self.users[user_id] = record
+        self._users_by_username[record["username"]] = record
+        self._users_by_email[record["email"]] = record
+        self.next_user_id = max(self.next_user_id, user_id + 1)
+
+    def _restore_wishlist(self, record: dict) -> None:
+        wishlist_id = record["id"]
+        self._seen_version(record["version"])
+        wishlist = self.wishlists.get(wishlist_id)
+        if wishlist is not None:
+            record.pop("items", None)
+            wishlist.update(record)
+            return
+        record["items"] = {}
+        self.wishlists[wishlist_id] = record
+        insort(self._owner_wishlists.setdefault(record["owner_id"], []), wishlist_id)
+        insort(self._wishlist_ids, wishlist_id)
+        if self._searchable(record):
+            insort(self._public_wishlist_ids, wishlist_id)
+        self._item_indexes[wishlist_id] = ItemIndex()
+        self.next_wishlist_id = max(self.next_wishlist_id, wishlist_id + 1)
+
+    def _restore_item(self, item: StoredItem, wishlist_version: int) -> None:
+        wishlist = self.wishlists.get(item.wishlist_id)
+        if wishlist is None:
+            return
+        # Индексы не ведутся до finish_restore
+        wishlist["items"][item.id] = item
+        self._item_wishlist[item.id] = item.wishlist_id
+        wishlist["version"] = max(wishlist["version"], wishlist_version)
+        self._seen_version(max(item.version, wishlist_version))
+        self.next_item_id = max(self.next_item_id, item.id + 1)
+
+    def _restore_items(self, wishlist_id: int, items: List[StoredItem]) -> None:
+        """Элементы вишлиста из снимка, по возрастанию id"""
+        wishlist = self.wishlists[wishlist_id]
+        items.sort(key=lambda item: item.id)
+        stored = wishlist["items"]
+        for item in items:
+            stored[item.id] = item
+            self._item_wishlist[item.id] = wishlist_id
+            self._seen_version(item.version)
+        if items:
+            self.next_item_id = max(self.next_item_id, items[-1].id + 1)
+
+    def _restore_delete_user(self, user_id: int) -> None:
+        if user_id in self.users:
+            self.delete_user(user_id)
+
+    def _restore_delete_wishlist(self, wishlist_id: int) -> None:
+        if wishlist_id in self.wishlists:
+            self.delete_wishlist(wishlist_id)
+
+    def _restore_delete_item(
+        self, wishlist_id: int, item_id: int, wishlist_version: int
+    ) -> None:
+        if self._stored_item(wishlist_id, item_id) is None:
+            return
+        self.delete_item(wishlist_id, item_id)
+        self.wishlists[wishlist_id]["version"] = wishlist_version
+        self._seen_version(wishlist_version)
+
+
 # Временный вариант БД
-_DB = {
-    "users": {},
-    "wishlists": {},
-    "next_user_id": 1,
-    "next_wishlist_id": 1,
-    "next_item_id": 1,
-}
+_DB = InMemoryStore()
@@ -0,0 +1,61 @@
+import zlib
+from typing import List
+
+from fastapi import Request, Response
+
+from app.exceptions import ProblemDetail
+
+
+def version_etag(version: int) -> str:
+    """Сильный ETag ресурса по его счётчику версий"""
+    return f'"{version}"'
+
+
+def listing_etag(version: int, query: str) -> str:
+    """Слабый ETag выборки: версия вишлиста + параметры запроса"""
+    return f'W/"{version}-{zlib.crc32(query.encode()):08x}"'
+
+
+def _tags(header: str) -> List[str]:
+    return [tag.strip() for tag in header.split(",") if tag.strip()]
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match: слабое сравнение (RFC 9110, 13.1.2)"""
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    tags = _tags(header)
+    return "*" in tags or _opaque(etag) in {_opaque(tag) for tag in tags}
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def check_if_match(request: Request, etag: str) -> bool:
+    """
+    If-Match: сильное сравнение (RFC 9110, 13.1.1).
+
+    Возвращает ``True``, если заголовок задан и совпал; без заголовка —
+    ``False``; при несовпадении — 412 Precondition Failed.
+    """
+    header = request.headers.get("if-match")
+    if header is None:
+        return False
+    tags = _tags(header)
+    if "*" not in tags and etag not in tags:
+        raise precondition_failed()
+    return True
+
+
+def precondition_failed() -> ProblemDetail:
+    return ProblemDetail(
+        title="Precondition Failed",
+        detail="Ресурс изменился: ETag не совпадает с If-Match",
+        status=412,
+    )
@@ -0,0 +1,172 @@
+"""
+Лента изменений элементов вишлиста (publish/subscribe) для SSE.
+
+Обработчики публикуют событие после успешной мутации, подписчики читают
+события своего вишлиста. Очередь подписчика ограничена и сворачивает
+события: на каждый элемент хранится только последнее, поэтому медленный
+клиент получает итоговое состояние, а не всю историю. Если элементов в
+очереди больше ``queue_size``, очередь заменяется одним событием
+``resync`` — клиент перечитывает список. Брокер живёт в event loop одного
+процесса: ``publish`` вызывается из обработчиков без блокировок.
+"""
+
+import asyncio
+from typing import AsyncIterator, Dict, List, Optional, Set, Union
+
+from app.config import settings
+from app.serialization import ANY_JSON
+
+ITEM_ADDED = "item.added"
+ITEM_UPDATED = "item.updated"
+ITEM_RESERVED = "item.reserved"
+ITEM_UNRESERVED = "item.unreserved"
+ITEM_DELETED = "item.deleted"
+WISHLIST_DELETED = "wishlist.deleted"
+RESYNC = "resync"
+
+MEDIA_TYPE = "text/event-stream"
+
+
+class Subscription:
+    """Ограниченная очередь событий одного клиента со сворачиванием по item_id"""
+
+    def __init__(self, wishlist_id: int, queue_size: int) -> None:
+        self.wishlist_id = wishlist_id
+        self.queue_size = queue_size
+        self.overflowed = False
+        self.closed = False
+        # item_id → последнее событие; порядок — порядок последних изменений
+        self._pending: Dict[Union[int, str, None], dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, event: dict) -> bool:
+        """Ставит событие в очередь; ``True`` — оно заменило более раннее"""
+        if self.closed:
+            return False
+        if event["type"] == WISHLIST_DELETED:
+            self.closed = True
+        elif self.overflowed:
+            # resync уже в очереди и покрывает всё, что было после
+            return True
+        key = event["item_id"]
+        coalesced = self._pending.pop(key, None) is not None
+        self._pending[key] = event
+        if len(self._pending) > self.queue_size and not self.closed:
+            self._pending = {RESYNC: {"type": RESYNC, "wishlist_id": self.wishlist_id}}
+            self.overflowed = True
+        self._ready.set()
+        return coalesced
+
+    async def get(self, timeout: Optional[float] = None) -> List[dict]:
+        """
+        Накопленные события в порядке последнего изменения; ``[]`` — таймаут
+        без событий или подписка закрыта и очередь пуста.
+        """
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+        events = list(self._pending.values())
+        self._pending.clear()
+        self._ready.clear()
+        self.overflowed = False
+        return events
+
+
+class EventBroker:
+    """Подписки по wishlist_id; публикация — O(число подписчиков вишлиста)"""
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue_size = queue_size
+        self.published = 0
+        self.coalesced = 0
+        self.overflows = 0
+        self._subscribers: Dict[int, Set[Subscription]] = {}
+
+    def subscribe(self, wishlist_id: int) -> Subscription:
+        subscription = Subscription(wishlist_id, self.queue_size)
+        self._subscribers.setdefault(wishlist_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscribers = self._subscribers.get(subscription.wishlist_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscription)
+        if not subscribers:
+            del self._subscribers[subscription.wishlist_id]
+
+    def subscribers(self, wishlist_id: Optional[int] = None) -> int:
+        if wishlist_id is not None:
+            return len(self._subscribers.get(wishlist_id, ()))
+        return sum(map(len, self._subscribers.values()))
+
+    def publish(self, event_type: str, wishlist_id: int, item: dict) -> None:
+        """Событие об элементе; ``item`` — запись после изменения"""
+        subscribers = self._subscribers.get(wishlist_id)
+        if not subscribers:
+            return
+        self._deliver(
+            subscribers,
+            {
+                "type": event_type,
+                "wishlist_id": wishlist_id,
+                "item_id": item["id"],
+                "item": None if event_type == ITEM_DELETED else item,
+            },
+        )
+
+    def close(self, wishlist_id: int) -> None:
+        """Вишлист удалён: последнее событие подписчикам, их потоки завершаются"""
+        subscribers = self._subscribers.get(wishlist_id)
+        if subscribers:
+            self._deliver(
+                subscribers,
+                {"type": WISHLIST_DELETED, "wishlist_id": wishlist_id, "item_id": None},
+            )
+
+    def _deliver(self, subscribers: Set[Subscription], event: dict) -> None:
+        self.published += 1
+        for subscription in subscribers:
+            overflowed = subscription.overflowed
+            if subscription.push(event):
+                self.coalesced += 1
+            if subscription.overflowed and not overflowed:
+                self.overflows += 1
+
+
+def format_event(event: dict) -> str:
+    """Кадр SSE: имя события и JSON в ``data``"""
+    return f"event: {event['type']}\ndata: {ANY_JSON.dump_json(event).decode()}\n\n"
+
+
+async def event_stream(
+    broker: EventBroker, wishlist_id: int, heartbeat: float
+) -> AsyncIterator[str]:
+    """
+    Поток кадров SSE до удаления вишлиста или отключения клиента.
+
+    Первый кадр уходит уже после подписки: клиент, перечитавший список
+    элементов после него, не пропустит изменений. Без событий раз в
+    ``heartbeat`` секунд уходит комментарий, чтобы прокси не закрывали
+    простаивающее соединение.
+    """
+    subscription = broker.subscribe(wishlist_id)
+    try:
+        yield ": subscribed\n\n"
+        while True:
+            events = await subscription.get(heartbeat)
+            if not events:
+                if subscription.closed:
+                    return
+                yield ": ping\n\n"
+                continue
+            yield "".join(format_event(event) for event in events)
+            if subscription.closed:
+                return
+    finally:
+        broker.unsubscribe(subscription)
+
+
+broker = EventBroker(settings.events_queue_size)
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Dict, Optional
 from uuid import uuid4
 
 from fastapi import Request
@@ -24,6 +24,7 @@ class ProblemDetail(Exception):
         status: int = 400,
         type: Optional[str] = None,
         instance: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
     ):
         self.title = title
         self.detail = detail
@@ -32,9 +33,13 @@ class ProblemDetail(Exception):
             type or f"https://api.wishlist.com/errors/{title.lower().replace(' ', '-')}"
         )
         self.instance = instance
-        self.correlation_id = str(uuid4())
+        self.headers = headers or {}
+        self.correlation_id: Optional[str] = None
 
     def to_response(self, request: Request) -> JSONResponse:
+        # Тот же id, что выставил CorrelationIdMiddleware; без него — новый
+        correlation_id = getattr(request.state, "correlation_id", None)
+        self.correlation_id = correlation_id or str(uuid4())
         content = {
             "type": self.type,
             "title": self.title,
@@ -46,5 +51,5 @@ class ProblemDetail(Exception):
         return JSONResponse(
             status_code=self.status,
             content=content,
-            headers={"X-Correlation-ID": self.correlation_id},
+            headers={**self.headers, "X-Correlation-ID": self.correlation_id},
         )
@@ -0,0 +1,60 @@
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, List
+
+from app.repository import EXPORT_COLUMNS
+
+EXPORT_BATCH_SIZE = 500
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+
+def _json_default(value: Any) -> Any:
+    # Decimal — строкой, чтобы не терять точность цены
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+async def hide_reservations(
+    batches: AsyncIterator[List[dict]],
+) -> AsyncIterator[List[dict]]:
+    """Без имени зарезервировавшего — для выгрузки не владельцу"""
+    async for batch in batches:
+        for row in batch:
+            row["reserved_by"] = None
+        yield batch
+
+
+async def ndjson_chunks(batches: AsyncIterator[List[dict]]) -> AsyncIterator[str]:
+    """Одна JSON-строка на запись; один чанк на пачку"""
+    async for batch in batches:
+        yield "".join(
+            json.dumps(row, ensure_ascii=False, default=_json_default) + "\n"
+            for row in batch
+        )
+
+
+async def csv_chunks(batches: AsyncIterator[List[dict]]) -> AsyncIterator[str]:
+    """CSV с заголовком ``EXPORT_COLUMNS``; один чанк на пачку"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    async for batch in batches:
+        for row in batch:
+            writer.writerow(
+                [
+                    value.isoformat() if isinstance(value, datetime) else value
+                    for value in (row[column] for column in EXPORT_COLUMNS)
+                ]
+            )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,148 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from app.config import Settings, settings
+from app.exceptions import ProblemDetail
+from app.hashing import hash_password, verify_password
+from app.metrics import hash_latency
+
+
+class HashingService:
+    """
+    Асинхронный Argon2 поверх ограниченного пула процессов.
+
+    Одновременно выполняется не больше ``max_workers`` хешей (≈256 МБ
+    каждый), ещё до ``max_queue`` ждут в очереди не дольше
+    ``queue_timeout`` секунд. Сверх этого — 503, чтобы всплеск логинов
+    не блокировал event loop и не исчерпывал память.
+
+    ``queue_timeout`` ограничивает только ожидание свободного воркера:
+    допущенный хеш выполняется до конца, иначе слот пула был бы занят
+    работой, результат которой уже никому не нужен.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, queue_timeout: float) -> None:
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._running = 0
+        # Ожидающие слота по порядку: [future, получил ли слот]
+        self._waiters: Deque[List[Any]] = deque()
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "HashingService":
+        return cls(
+            settings.hash_pool_workers,
+            settings.hash_queue_limit,
+            settings.hash_queue_timeout,
+        )
+
+    @property
+    def in_flight(self) -> int:
+        """Хеши, выполняющиеся в воркерах"""
+        return self._running
+
+    @property
+    def queued(self) -> int:
+        """Хеши, ожидающие свободного воркера"""
+        return len(self._waiters)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+        }
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        return await self._submit(verify_password, password, hashed)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def _release(self, _: Optional[Future]) -> None:
+        # Слот переходит первому ожидающему, не освобождаясь
+        with self._lock:
+            if not self._waiters:
+                self._running -= 1
+                return
+            waiter = self._waiters.popleft()
+            waiter[1] = True
+        future = waiter[0]
+        future.get_loop().call_soon_threadsafe(_resolve, future)
+
+    async def _admit(self) -> None:
+        """Ждёт свободного воркера не дольше ``queue_timeout``"""
+        with self._lock:
+            if self._running < self.max_workers:
+                self._running += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                raise self._unavailable()
+            waiter = [asyncio.get_running_loop().create_future(), False]
+            self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter[0]), self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if not waiter[1]:
+                    self._waiters.remove(waiter)
+                    raise self._unavailable()
+        except BaseException:
+            with self._lock:
+                if not waiter[1]:
+                    self._waiters.remove(waiter)
+                    raise
+            self._release(None)
+            raise
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        started = time.perf_counter()
+        await self._admit()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            hash_latency.observe(time.perf_counter() - started, fn.__name__)
+
+    def _unavailable(self) -> ProblemDetail:
+        return ProblemDetail(
+            title="Service Unavailable",
+            detail="Сервис перегружен, повторите попытку позже",
+            status=503,
+            headers={"Retry-After": str(max(int(self.queue_timeout), 1))},
+        )
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+hashing_service = HashingService.from_settings(settings)
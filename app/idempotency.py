@@ -0,0 +1,294 @@
+"""
+Заголовок Idempotency-Key для POST/PUT: повтор запроса не выполняет его снова.
+
+Первый ответ на (клиент, ключ) сохраняется в ограниченном LRU/TTL-кэше, а
+повтор с тем же ключом получает его без вызова обработчика (с заголовком
+``Idempotent-Replayed: true``). Повтор, пришедший, пока первый запрос ещё
+выполняется, ждёт его ответа. Клиент — хеш заголовка Authorization, без
+него — IP. Тот же ключ с другим запросом (метод, путь, тело) — 422.
+Ответы 5xx и ответы больше ``max_body`` не сохраняются: повтор выполнит
+обработчик заново.
+"""
+
+import asyncio
+import hashlib
+import re
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+from app.exceptions import ProblemDetail
+
+HEADER = b"idempotency-key"
+REPLAYED_HEADER = (b"idempotent-replayed", b"true")
+
+# Ключ — видимые ASCII-символы (обычно UUID), не длиннее 255
+_VALID_KEY = re.compile(rb"[\x21-\x7e]{1,255}")
+# Заголовки, которые относятся к конкретному запросу, а не к ответу
+_NOT_STORED = {b"x-correlation-id", b"content-length"}
+
+CacheKey = Tuple[str, bytes]
+
+
+class StoredResponse(NamedTuple):
+    status: int
+    headers: List[Tuple[bytes, bytes]]
+    body: bytes
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "expires_at", "response", "done")
+
+    def __init__(self, fingerprint: bytes, expires_at: float) -> None:
+        self.fingerprint = fingerprint
+        self.expires_at = expires_at
+        self.response: Optional[StoredResponse] = None
+        self.done = asyncio.Event()
+
+
+class IdempotencyCache:
+    """
+    LRU/TTL-кэш ответов по (клиент, ключ), включая ещё выполняющиеся.
+
+    Работает в event loop одного процесса; запись «в работе» — событие, на
+    котором ждут параллельные повторы.
+    """
+
+    NEW, REPLAY, WAIT, MISMATCH = "new", "replay", "wait", "mismatch"
+
+    def __init__(self, max_size: int, ttl: float, wait_timeout: float) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.stored = 0
+        self.replayed = 0
+        self.waited = 0
+        self.conflicts = 0
+        self._entries: "OrderedDict[CacheKey, _Entry]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def begin(self, key: CacheKey, fingerprint: bytes) -> Tuple[str, _Entry]:
+        """
+        ``NEW`` — запрос выполняется впервые (запись создана, по окончании —
+        ``finish``); ``REPLAY`` — есть готовый ответ; ``WAIT`` — первый запрос
+        ещё выполняется; ``MISMATCH`` — ключ занят другим запросом.
+        """
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.response is not None and entry.expires_at <= now:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            entry = self._entries[key] = _Entry(fingerprint, now + self.ttl)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            return self.NEW, entry
+        self._entries.move_to_end(key)
+        if entry.fingerprint != fingerprint:
+            self.conflicts += 1
+            return self.MISMATCH, entry
+        if entry.response is None:
+            self.waited += 1
+            return self.WAIT, entry
+        self.replayed += 1
+        return self.REPLAY, entry
+
+    def finish(
+        self, key: CacheKey, entry: _Entry, response: Optional[StoredResponse]
+    ) -> None:
+        """Сохраняет ответ; ``None`` — ответ не сохраняется, ключ освобождается"""
+        if response is None:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        else:
+            entry.response = response
+            self.stored += 1
+        entry.done.set()
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def client_id(scope: Scope) -> str:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            return "auth:" + hashlib.sha256(value).hexdigest()
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+class IdempotencyMiddleware:
+    """Pure-ASGI обработка Idempotency-Key для ``methods`` вне ``exclude``"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: IdempotencyCache,
+        max_body: int,
+        methods: Sequence[str] = ("POST", "PUT"),
+        exclude: Sequence[str] = (),
+    ) -> None:
+        self.app = app
+        self.cache = cache
+        self.max_body = max_body
+        self.methods = frozenset(methods)
+        self.exclude = tuple(exclude)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in self.methods
+            or scope["path"].startswith(self.exclude)
+        ):
+            await self.app(scope, receive, send)
+            return
+        raw_key = next(
+            (value for name, value in scope["headers"] if name == HEADER), None
+        )
+        if raw_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not _VALID_KEY.fullmatch(raw_key):
+            await self._problem(
+                scope,
+                receive,
+                send,
+                ProblemDetail(
+                    title="Invalid Idempotency Key",
+                    detail="Idempotency-Key: 1–255 видимых ASCII-символов",
+                    status=400,
+                ),
+            )
+            return
+
+        body, receive = await _buffer_body(receive)
+        digest = hashlib.sha256(scope["method"].encode())
+        digest.update(scope["path"].encode())
+        digest.update(b"?" + scope["query_string"] + b"\n")
+        digest.update(body)
+        fingerprint = digest.digest()
+        key = (client_id(scope), raw_key)
+
+        while True:
+            state, entry = self.cache.begin(key, fingerprint)
+            if state == IdempotencyCache.NEW:
+                await self._run(scope, receive, send, key, entry)
+                return
+            if state == IdempotencyCache.REPLAY:
+                await _replay(entry.response, send)
+                return
+            if state == IdempotencyCache.MISMATCH:
+                await self._problem(
+                    scope,
+                    receive,
+                    send,
+                    ProblemDetail(
+                        title="Idempotency Key Reused",
+                        detail="Ключ уже использован для другого запроса",
+                        status=422,
+                    ),
+                )
+                return
+            try:
+                await asyncio.wait_for(entry.done.wait(), self.cache.wait_timeout)
+            except asyncio.TimeoutError:
+                await self._problem(
+                    scope,
+                    receive,
+                    send,
+                    ProblemDetail(
+                        title="Request In Progress",
+                        detail="Запрос с этим ключом ещё выполняется",
+                        status=409,
+                        headers={"Retry-After": "1"},
+                    ),
+                )
+                return
+            # Готов ответ — повтор; ответ не сохранён — выполняем сами
+
+    async def _run(
+        self, scope: Scope, receive: Receive, send: Send, key: CacheKey, entry: _Entry
+    ) -> None:
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        size = 0
+
+        async def capture(message: Message) -> None:
+            nonlocal start, size
+            if message["type"] == "http.response.start":
+                start = message
+            elif message["type"] == "http.response.body" and size <= self.max_body:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                chunks.append(chunk)
+            await send(message)
+
+        response = None
+        try:
+            await self.app(scope, receive, capture)
+            if start is not None and start["status"] < 500 and size <= self.max_body:
+                headers = [
+                    (name, value)
+                    for name, value in start.get("headers", [])
+                    if name.lower() not in _NOT_STORED
+                ]
+                response = StoredResponse(start["status"], headers, b"".join(chunks))
+        finally:
+            self.cache.finish(key, entry, response)
+
+    @staticmethod
+    async def _problem(
+        scope: Scope, receive: Receive, send: Send, problem: ProblemDetail
+    ) -> None:
+        await problem.to_response(Request(scope))(scope, receive, send)
+
+
+async def _buffer_body(receive: Receive) -> Tuple[bytes, Receive]:
+    """Читает тело запроса целиком; возвращает его и receive для приложения"""
+    chunks: List[bytes] = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    body = b"".join(chunks)
+    replayed = False
+
+    async def replay_receive() -> Message:
+        nonlocal replayed
+        if not replayed:
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return body, replay_receive
+
+
+async def _replay(response: StoredResponse, send: Send) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status,
+            "headers": [
+                *response.headers,
+                (b"content-length", str(len(response.body)).encode()),
+                REPLAYED_HEADER,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": response.body})
+
+
+idempotency_cache = IdempotencyCache(
+    settings.idempotency_cache_size,
+    settings.idempotency_ttl,
+    settings.idempotency_wait_timeout,
+)
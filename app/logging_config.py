@@ -1,20 +1,180 @@
+import atexit
+import copy
+import json
 import logging
+import queue
 import re
+import sys
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+from app.middleware import correlation_id_var
+
+# Скрываем JWT/токены и пароли; шаблоны компилируются один раз
+_JWT = re.compile(r"eyJ[A-Za-z0-9_\-]*\.[A-Za-z0-9_\-]*\.[A-Za-z0-9_\-]*")
+_TOKEN = re.compile(r"[A-Za-z0-9+/=]{20,}")
+_PASSWORD = re.compile(r'password["\']?:\s*["\'][^"\']+["\']')
+REDACTED = "[REDACTED]"
+
+# Поля extra, значения которых маскируются целиком
+_SECRET_FIELD = re.compile(r"password|passwd|secret|token|authorization|cookie", re.I)
+
+# Аргументы этих типов неизменяемы — форматирование можно отложить до потока
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+# Атрибуты LogRecord, которые не являются пользовательскими полями extra
+_RECORD_FIELDS = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {
+    "message",
+    "asctime",
+    "correlation_id",
+}
+
+
+def redact(text: str) -> str:
+    text = _JWT.sub(REDACTED, text)
+    text = _TOKEN.sub(REDACTED, text)
+    return _PASSWORD.sub("password: " + REDACTED, text)
 
 
 class FilterSecrets(logging.Filter):
+    """
+    Редактирует секреты в сообщении записи.
+
+    Регулярки применяются только к строкам: к шаблону сообщения и строковым
+    аргументам; числа и прочие аргументы не трогаются.
+    """
+
     def filter(self, record):
-        msg = record.getMessage()
-        # Скрываем JWT, пароли, токены
-        msg = re.sub(r"[A-Za-z0-9+/=]{20,}", "[REDACTED]", msg)  # JWT
-        msg = re.sub(
-            r'password["\']?:\s*["\'][^"\']+["\']', "password: [REDACTED]", msg
-        )
-        record.msg = msg
+        if isinstance(record.msg, str):
+            record.msg = redact(record.msg)
+        else:
+            record.msg = redact(str(record.msg))
+        if isinstance(record.args, tuple):
+            record.args = tuple(
+                redact(arg) if isinstance(arg, str) else arg for arg in record.args
+            )
+        elif isinstance(record.args, dict):
+            record.args = {
+                key: redact(value) if isinstance(value, str) else value
+                for key, value in record.args.items()
+            }
         return True
 
 
-def setup_logging():
-    logging.basicConfig(level=logging.INFO)
-    logger = logging.getLogger()
-    logger.handlers[0].addFilter(FilterSecrets())
+class JsonFormatter(logging.Formatter):
+    """Одна JSON-строка на запись (NFR-08), с correlation_id запроса"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "correlation_id": getattr(record, "correlation_id", None),
+        }
+        for key, value in record.__dict__.items():
+            if key in _RECORD_FIELDS:
+                continue
+            if _SECRET_FIELD.search(key):
+                value = REDACTED
+            elif isinstance(value, str):
+                value = redact(value)
+            entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = redact(record.exc_text)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    ``QueueHandler`` для ограниченной очереди.
+
+    На вызывающем потоке запись только дополняется correlation_id и кладётся
+    в очередь; форматирование и вывод — в потоке ``QueueListener``. Если
+    очередь полна, запись отбрасывается и учитывается в ``dropped`` —
+    логирование не ждёт медленный вывод.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record):
+        # Копия: остальные обработчики корневого логгера видят запись как есть
+        record = copy.copy(record)
+        record.correlation_id = correlation_id_var.get()
+        args = record.args
+        if args and not (
+            isinstance(args, tuple)
+            and all(isinstance(arg, _IMMUTABLE_ARGS) for arg in args)
+        ):
+            # Изменяемые аргументы форматируем сразу: к моменту вывода они
+            # могут измениться
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+class _Listener(QueueListener):
+    def enqueue_sentinel(self):
+        # При остановке ждём места в очереди, а не теряем маркер конца
+        self.queue.put(self._sentinel)
+
+
+_listener: Optional[QueueListener] = None
+queue_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging(level: str = "INFO", queue_size: int = 10000) -> None:
+    """
+    Корневой логгер → ограниченная очередь → фоновый поток с JSON-выводом.
+
+    Повторный вызов ничего не делает.
+    """
+    global _listener, queue_handler
+    if _listener is not None:
+        return
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter())
+    output.addFilter(FilterSecrets())
+
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    queue_handler = DroppingQueueHandler(log_queue)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(queue_handler)
+
+    _listener = _Listener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def dropped_records() -> int:
+    """Записи, отброшенные из-за переполнения очереди (для /metrics)"""
+    handler = queue_handler
+    return handler.dropped if handler is not None else 0
+
+
+def shutdown_logging() -> None:
+    """Дописывает очередь и останавливает поток вывода"""
+    global _listener, queue_handler
+    if _listener is None:
+        return
+    logging.getLogger().removeHandler(queue_handler)
+    _listener.stop()
+    _listener = queue_handler = None
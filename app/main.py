@@ -1,28 +1,137 @@
-from typing import Dict, List
+from contextlib import asynccontextmanager
+from decimal import Decimal
+from typing import Dict, List, Literal, Optional
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Query, Request, Response
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-
-from app.auth import router
-from app.database import _DB
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
+
+from app import bulk_import, events, export, metrics, search
+from app.auth import get_current_user, router, token_cache
+from app.config import settings
+from app.etag import (
+    check_if_match,
+    listing_etag,
+    not_modified,
+    not_modified_response,
+    precondition_failed,
+    version_etag,
+)
 from app.exceptions import InvalidCredentials, ProblemDetail
-from app.logging_config import setup_logging
+from app.export import EXPORT_BATCH_SIZE, MEDIA_TYPES, csv_chunks, ndjson_chunks
+from app.hashing_service import hashing_service
+from app.idempotency import IdempotencyMiddleware, idempotency_cache
+from app.logging_config import dropped_records, setup_logging
+from app.middleware import CorrelationIdMiddleware
 from app.models import (
+    ItemLookup,
     ReserveRequest,
+    SearchResponse,
     UserCreate,
     WishItemCreate,
     WishItemResponse,
     WishlistCreate,
+    WishlistLookup,
+    WishlistSummary,
     now_utc,
 )
+from app.rate_limit import RateLimitMiddleware, rate_limiter
+from app.repository import Repository, close_repository, get_repository, init_repository
+from app.reservations import reservation_expiry, unreserve_changes
+from app.serialization import ANY_JSON, BATCH_JSON, ITEM_JSON, ITEMS_JSON, json_response
+
+setup_logging(settings.log_level, settings.log_queue_size)
+
+# Keyset-пагинация списков: размер страницы по умолчанию и максимум
+PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+# Пакетное чтение: не больше id за запрос
+MAX_BATCH_IDS = 100
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    repo = await init_repository(settings)
+    await reservation_expiry.start(repo, settings.reservation_ttl)
+    yield
+    await reservation_expiry.stop()
+    await close_repository()
+    hashing_service.shutdown()
 
-setup_logging()
 
 app = FastAPI(
-    title="Wishlist API", description="API для управления вишлистами", version="1.0.0"
+    title="Wishlist API",
+    description="API для управления вишлистами",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse if settings.fast_json else JSONResponse,
 )
 app.include_router(router)
+# Внутри лимитера: повторы /auth не кэшируются (ответы с токенами)
+app.add_middleware(
+    IdempotencyMiddleware,
+    cache=idempotency_cache,
+    max_body=settings.idempotency_max_body,
+    exclude=["/auth"],
+)
+app.add_middleware(RateLimitMiddleware, limiter=rate_limiter, prefixes=["/auth"])
+app.add_middleware(metrics.MetricsMiddleware)
+# Последним — значит внешним: id доступен и ответам лимитера
+app.add_middleware(CorrelationIdMiddleware)
+
+
+def paginate(rows: List[dict], limit: int, response: Response) -> List[dict]:
+    """Отрезает запись сверх ``limit`` и выставляет курсор X-Next-Cursor"""
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = str(rows[-1]["id"])
+    return rows
+
+
+def if_match_expected(request: Request, item: dict) -> dict:
+    """Условие CAS по If-Match: версия, с которой сверялся клиент"""
+    if check_if_match(request, version_etag(item["version"])):
+        return {"version": item["version"]}
+    return {}
+
+
+async def if_match_item(
+    request: Request, repo: Repository, wishlist_id: int, item_id: int
+) -> dict:
+    """``if_match_expected`` с чтением элемента только при наличии If-Match"""
+    if "if-match" not in request.headers:
+        return {}
+    item = await repo.get_wishlist_item(wishlist_id, item_id)
+    if item is None:
+        raise ProblemDetail(
+            title="Item Not Found", detail="Элемент не найден", status=404
+        )
+    return if_match_expected(request, item)
+
+
+async def raise_cas_failure(
+    repo: Repository, wishlist_id: int, item_id: int, expected: dict
+) -> None:
+    """
+    Разбирает отказ compare-and-set: 404, если элемента нет, 412, если
+    изменилась версия из If-Match. Иначе возвращает управление вызывающему.
+    """
+    current = await repo.get_wishlist_item(wishlist_id, item_id)
+    if current is None:
+        raise ProblemDetail(
+            title="Item Not Found", detail="Элемент не найден", status=404
+        )
+    if "version" in expected and current["version"] != expected["version"]:
+        raise precondition_failed()
+
+
+def edit_conflict() -> ProblemDetail:
+    """Элемент есть и версия совпала, но параллельный запрос успел раньше"""
+    return ProblemDetail(
+        title="Conflict",
+        detail="Элемент изменён параллельным запросом, повторите",
+        status=409,
+    )
 
 
 @app.get("/health")
@@ -30,120 +139,407 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/health/hashing")
+def health_hashing():
+    return hashing_service.stats()
+
+
+# Значения, которые уже считают сами компоненты, — читаются при сборе
+metrics.registry.callback(
+    "rate_limit_rejections_total",
+    "Запросы /auth/*, отклонённые лимитером",
+    lambda: {(): rate_limiter.rejections},
+    kind="counter",
+)
+metrics.registry.callback(
+    "argon2_tasks",
+    "Хеши Argon2 в пуле процессов",
+    lambda: {
+        ("in_flight",): hashing_service.in_flight,
+        ("queued",): hashing_service.queued,
+    },
+    ("state",),
+)
+metrics.registry.callback(
+    "token_cache_requests_total",
+    "Обращения к кэшу проверенных JWT",
+    lambda: {("hit",): token_cache.hits, ("miss",): token_cache.misses},
+    ("result",),
+    kind="counter",
+)
+
+
+metrics.registry.callback(
+    "idempotency_requests_total",
+    "Запросы с Idempotency-Key: сохранённые, повторы, ожидания, конфликты",
+    lambda: {
+        ("stored",): idempotency_cache.stored,
+        ("replayed",): idempotency_cache.replayed,
+        ("waited",): idempotency_cache.waited,
+        ("conflict",): idempotency_cache.conflicts,
+    },
+    ("result",),
+    kind="counter",
+)
+metrics.registry.callback(
+    "reservations_expired_total",
+    "Резервы, снятые по истечении reservation_ttl",
+    lambda: {(): reservation_expiry.expired},
+    kind="counter",
+)
+metrics.registry.callback(
+    "reservation_deadlines",
+    "Сроки резервов в очереди планировщика",
+    lambda: {(): len(reservation_expiry)},
+)
+metrics.registry.callback(
+    "event_subscribers",
+    "Открытые подписки на ленту изменений",
+    lambda: {(): events.broker.subscribers()},
+)
+metrics.registry.callback(
+    "events_total",
+    "События ленты изменений: опубликованные, свёрнутые, переполнения очередей",
+    lambda: {
+        ("published",): events.broker.published,
+        ("coalesced",): events.broker.coalesced,
+        ("overflow",): events.broker.overflows,
+    },
+    ("result",),
+    kind="counter",
+)
+metrics.registry.callback(
+    "log_records_dropped_total",
+    "Записи лога, отброшенные при переполнении очереди вывода",
+    lambda: {(): dropped_records()},
+    kind="counter",
+)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics(repo: Repository = Depends(get_repository)):
+    counts = await repo.counts()
+    store = metrics.Callback(
+        "store_records",
+        "Записи в хранилище",
+        lambda: {(kind,): count for kind, count in counts.items()},
+        ("kind",),
+    )
+    return Response(metrics.registry.render([store]), media_type=metrics.CONTENT_TYPE)
+
+
 @app.get("/wishlists/{wishlist_id}/items", response_model=List[WishItemResponse])
-def get_wishlist_items(wishlist_id: int):
-    if wishlist_id not in _DB["wishlists"]:
+async def get_wishlist_items(
+    wishlist_id: int,
+    request: Request,
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    category: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    is_reserved: Optional[bool] = None,
+    repo: Repository = Depends(get_repository),
+):
+    wishlist = await repo.get_wishlist(wishlist_id)
+    if wishlist is None:
+        raise ProblemDetail(
+            title="Wishlist Not Found", detail="Вишлист не найден", status=404
+        )
+    # Версия читается до выборки: при гонке ETag устареет, но не «залипнет»
+    etag = listing_etag(wishlist["version"], request.url.query)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    items = await repo.list_items(
+        wishlist_id,
+        after=after,
+        limit=limit + 1,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        is_reserved=is_reserved,
+    )
+    page = paginate(items, limit, response)
+    if settings.fast_json:
+        return json_response(ITEMS_JSON, page, response)
+    return page
+
+
+@app.get("/search", response_model=SearchResponse)
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    category: Optional[str] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    limit: int = Query(search.SEARCH_PAGE_SIZE, ge=1, le=search.MAX_SEARCH_PAGE_SIZE),
+    offset: int = Query(0, ge=0, le=search.MAX_SEARCH_OFFSET),
+    repo: Repository = Depends(get_repository),
+):
+    """
+    Поиск по элементам публичных вишлистов: все слова ``q`` должны
+    встретиться в названии или описании. Элементы — по убыванию ``score``,
+    фасеты — счётчики по категориям и ценовым интервалам.
+    """
+    return await repo.search(
+        q,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        limit=limit,
+        offset=offset,
+    )
+
+
+@app.get("/wishlists/{wishlist_id}/events")
+async def wishlist_events(wishlist_id: int, repo: Repository = Depends(get_repository)):
+    """Лента изменений элементов вишлиста (Server-Sent Events, см. app.events)"""
+    if await repo.get_wishlist(wishlist_id) is None:
         raise ProblemDetail(
             title="Wishlist Not Found", detail="Вишлист не найден", status=404
         )
-    return list(_DB["wishlists"][wishlist_id]["items"].values())
+    return StreamingResponse(
+        events.event_stream(events.broker, wishlist_id, settings.events_heartbeat),
+        media_type=events.MEDIA_TYPE,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/wishlists/{wishlist_id}/items", response_model=WishItemResponse)
-def add_to_wishlist(wishlist_id: int, item: WishItemCreate):
-    if wishlist_id not in _DB["wishlists"]:
+async def add_to_wishlist(
+    wishlist_id: int, item: WishItemCreate, repo: Repository = Depends(get_repository)
+):
+    if await repo.get_wishlist(wishlist_id) is None:
         raise ProblemDetail(
             title="Wishlist Not Found", detail="Вишлист не найден", status=404
         )
-    new_id = _DB["next_item_id"]
     now = now_utc()
-    wishlist_item = {
-        "id": new_id,
-        **item.model_dump(),
-        "is_reserved": False,
-        "reserved_by": None,
-        "created_at": now,
-        "updated_at": now,
+    created = await repo.add_item(
+        wishlist_id,
+        {
+            **item.model_dump(),
+            "is_reserved": False,
+            "reserved_by": None,
+            "created_at": now,
+            "updated_at": now,
+        },
+    )
+    events.broker.publish(events.ITEM_ADDED, wishlist_id, created)
+    return created
+
+
+@app.post("/wishlists/{wishlist_id}/items/bulk")
+async def bulk_add_to_wishlist(
+    wishlist_id: int, request: Request, repo: Repository = Depends(get_repository)
+):
+    """
+    Импорт пачки элементов: JSON-массив или NDJSON (application/x-ndjson).
+
+    Валидные строки вставляются одной транзакцией, невалидные возвращаются
+    в ``errors`` с номером строки (с нуля).
+    """
+    if await repo.get_wishlist(wishlist_id) is None:
+        raise ProblemDetail(
+            title="Wishlist Not Found", detail="Вишлист не найден", status=404
+        )
+    try:
+        body = await bulk_import.read_body(
+            request.stream(), request.headers.get("content-length")
+        )
+        rows, errors = bulk_import.parse_rows(
+            body, request.headers.get("content-type", "")
+        )
+    except bulk_import.ImportFormatError as exc:
+        raise ProblemDetail(title="Invalid Import", detail=str(exc), status=400)
+    except bulk_import.ImportTooLarge as exc:
+        raise ProblemDetail(title="Import Too Large", detail=str(exc), status=413)
+    valid, invalid = bulk_import.validate_rows(
+        rows, frozenset(e["row"] for e in errors)
+    )
+    errors = sorted(errors + invalid, key=lambda error: error["row"])
+    now = now_utc()
+    items = await repo.add_items(
+        wishlist_id,
+        [
+            {
+                **item.model_dump(),
+                "is_reserved": False,
+                "reserved_by": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for _, item in valid
+        ],
+    )
+    for item in items:
+        events.broker.publish(events.ITEM_ADDED, wishlist_id, item)
+    return {
+        "imported": len(items),
+        "item_ids": [item["id"] for item in items],
+        "errors": errors,
     }
-    _DB["wishlists"][wishlist_id]["items"][new_id] = wishlist_item
-    _DB["next_item_id"] += 1
-    return wishlist_item
 
 
 @app.get("/wishlist/{item_id}", response_model=WishItemResponse)
-def get_wishlist_item(item_id: int):
-    for wishlist_id, wishlist in _DB["wishlists"].items():
-        if item_id in wishlist["items"]:
-            return wishlist["items"][item_id]
-    raise ProblemDetail(title="Item Not Found", detail="Элемент не найден", status=404)
+async def get_wishlist_item(
+    item_id: int,
+    request: Request,
+    response: Response,
+    repo: Repository = Depends(get_repository),
+):
+    item = await repo.get_item(item_id)
+    if item is None:
+        raise ProblemDetail(
+            title="Item Not Found", detail="Элемент не найден", status=404
+        )
+    etag = version_etag(item["version"])
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    if settings.fast_json:
+        return json_response(ITEM_JSON, item, response)
+    return item
+
+
+@app.get("/items", response_model=List[ItemLookup])
+async def get_items_batch(
+    response: Response,
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_IDS),
+    repo: Repository = Depends(get_repository),
+):
+    """
+    Элементы по списку id (``?ids=1&ids=2``) одним запросом — в порядке
+    запроса, без повторов. Отсутствующий id — запись со статусом 404, а не
+    ошибка всего ответа.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = await repo.get_items(ids)
+    result = [
+        (
+            {"id": item_id, "status": 200, "item": found[item_id]}
+            if item_id in found
+            else {"id": item_id, "status": 404, "item": None}
+        )
+        for item_id in ids
+    ]
+    if settings.fast_json:
+        return json_response(BATCH_JSON, result, response)
+    return result
 
 
 @app.post("/wishlists", response_model=Dict)
-def create_wishlist(wishlist: WishlistCreate, user_id: int):
-    if user_id not in _DB["users"]:
+async def create_wishlist(
+    wishlist: WishlistCreate, user_id: int, repo: Repository = Depends(get_repository)
+):
+    if await repo.get_user(user_id) is None:
         raise ProblemDetail(
             title="User Not Found", detail="Пользователь не найден", status=404
         )
-    new_id = _DB["next_wishlist_id"]
-    _DB["wishlists"][new_id] = {
-        **wishlist.model_dump(),
-        "id": new_id,
-        "owner_id": user_id,
-        "items": {},
-        "created_at": now_utc(),
-    }
-    _DB["next_wishlist_id"] += 1
-    return {"id": new_id, "message": "Вишлист создан"}
+    record = await repo.create_wishlist(
+        {
+            **wishlist.model_dump(),
+            "owner_id": user_id,
+            "created_at": now_utc(),
+        }
+    )
+    return {"id": record["id"], "message": "Вишлист создан"}
 
 
 @app.put("/wishlists/{wishlist_id}/items/{item_id}", response_model=WishItemResponse)
-def update_wishlist_item(wishlist_id: int, item_id: int, item_update: WishItemCreate):
-    if (
-        wishlist_id not in _DB["wishlists"]
-        or item_id not in _DB["wishlists"][wishlist_id]["items"]
-    ):
+async def update_wishlist_item(
+    wishlist_id: int,
+    item_id: int,
+    item_update: WishItemCreate,
+    request: Request,
+    response: Response,
+    repo: Repository = Depends(get_repository),
+):
+    current = await repo.get_wishlist_item(wishlist_id, item_id)
+    if current is None:
         raise ProblemDetail(
             title="Item Not Found", detail="Элемент не найден", status=404
         )
-    item = _DB["wishlists"][wishlist_id]["items"][item_id]
+    expected = if_match_expected(request, current)
     update_data = item_update.model_dump(exclude_unset=True)
-    for field, value in update_data.items():
-        item[field] = value
-    item["updated_at"] = now_utc()
+    update_data["updated_at"] = now_utc()
+    item = await repo.compare_and_set_item(wishlist_id, item_id, expected, update_data)
+    if item is None:
+        await raise_cas_failure(repo, wishlist_id, item_id, expected)
+        raise edit_conflict()
+    events.broker.publish(events.ITEM_UPDATED, wishlist_id, item)
+    response.headers["ETag"] = version_etag(item["version"])
     return item
 
 
 @app.get("/users/{user_id}/wishlists/{wishlist_id}", response_model=Dict)
-def get_user_wishlist(user_id: int, wishlist_id: int):
-    if user_id not in _DB["users"]:
+async def get_user_wishlist(
+    user_id: int,
+    wishlist_id: int,
+    request: Request,
+    response: Response,
+    repo: Repository = Depends(get_repository),
+):
+    if await repo.get_user(user_id) is None:
         raise ProblemDetail(
             title="User Not Found", detail="Пользователь не найден", status=404
         )
-    if wishlist_id not in _DB["wishlists"]:
+    wishlist = await repo.get_wishlist(wishlist_id)
+    if wishlist is None:
         raise ProblemDetail(
             title="Wishlist Not Found", detail="Вишлист не найден", status=404
         )
-    wishlist = _DB["wishlists"][wishlist_id]
     if wishlist["owner_id"] != user_id:
         raise ProblemDetail(
             title="Access Denied",
             detail="Вишлист не принадлежит пользователю",
             status=403,
         )
-    return wishlist
+    etag = version_etag(wishlist["version"])
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+    response.headers["ETag"] = etag
+    items = await repo.list_items(wishlist_id)
+    result = {**wishlist, "items": {item["id"]: item for item in items}}
+    if settings.fast_json:
+        return json_response(ANY_JSON, result, response)
+    return result
 
 
 @app.put(
     "/wishlists/{wishlist_id}/items/{item_id}/reserve", response_model=WishItemResponse
 )
-def reserve_item(wishlist_id: int, item_id: int, reserve_request: ReserveRequest):
-    if (
-        wishlist_id not in _DB["wishlists"]
-        or item_id not in _DB["wishlists"][wishlist_id]["items"]
-    ):
-        raise ProblemDetail(
-            title="Item Not Found", detail="Элемент не найден", status=404
-        )
-    item = _DB["wishlists"][wishlist_id]["items"][item_id]
-    if item["is_reserved"]:
+async def reserve_item(
+    wishlist_id: int,
+    item_id: int,
+    reserve_request: ReserveRequest,
+    request: Request,
+    response: Response,
+    repo: Repository = Depends(get_repository),
+):
+    expected = {"is_reserved": False}
+    expected.update(await if_match_item(request, repo, wishlist_id, item_id))
+    now = now_utc()
+    item = await repo.compare_and_set_item(
+        wishlist_id,
+        item_id,
+        expected,
+        {
+            "is_reserved": True,
+            "reserved_by": reserve_request.reserved_by,
+            "reserved_at": now,
+            "reservation_message": reserve_request.message,
+            "updated_at": now,
+        },
+    )
+    if item is None:
+        await raise_cas_failure(repo, wishlist_id, item_id, expected)
+        metrics.reservation_conflicts.inc("reserve")
         raise ProblemDetail(
             title="Already Reserved", detail="Элемент уже зарезервирован", status=400
         )
-    item["is_reserved"] = True
-    item["reserved_by"] = reserve_request.reserved_by
-    item["reserved_at"] = now_utc()
-    item["reservation_message"] = reserve_request.message
-    item["updated_at"] = now_utc()
+    events.broker.publish(events.ITEM_RESERVED, wishlist_id, item)
+    reservation_expiry.schedule(item)
+    response.headers["ETag"] = version_etag(item["version"])
     return item
 
 
@@ -151,108 +547,192 @@ def reserve_item(wishlist_id: int, item_id: int, reserve_request: ReserveRequest
     "/wishlists/{wishlist_id}/items/{item_id}/unreserve",
     response_model=WishItemResponse,
 )
-def unreserve_item(wishlist_id: int, item_id: int):
-    if (
-        wishlist_id not in _DB["wishlists"]
-        or item_id not in _DB["wishlists"][wishlist_id]["items"]
-    ):
-        raise ProblemDetail(
-            title="Item Not Found", detail="Элемент не найден", status=404
-        )
-    item = _DB["wishlists"][wishlist_id]["items"][item_id]
-    if not item["is_reserved"]:
+async def unreserve_item(
+    wishlist_id: int,
+    item_id: int,
+    request: Request,
+    response: Response,
+    repo: Repository = Depends(get_repository),
+):
+    expected = {"is_reserved": True}
+    expected.update(await if_match_item(request, repo, wishlist_id, item_id))
+    item = await repo.compare_and_set_item(
+        wishlist_id, item_id, expected, unreserve_changes(now_utc())
+    )
+    if item is None:
+        await raise_cas_failure(repo, wishlist_id, item_id, expected)
+        metrics.reservation_conflicts.inc("unreserve")
         raise ProblemDetail(
             title="Not Reserved", detail="Элемент не был зарезервирован", status=400
         )
-    item["is_reserved"] = False
-    item["reserved_by"] = None
-    item["reserved_at"] = None
-    item["reservation_message"] = None
-    item["updated_at"] = now_utc()
+    events.broker.publish(events.ITEM_UNRESERVED, wishlist_id, item)
+    response.headers["ETag"] = version_etag(item["version"])
     return item
 
 
 @app.post("/users", response_model=Dict)
-def create_user(user: UserCreate):
-    for existing_user in _DB["users"].values():
-        if existing_user["username"] == user.username:
-            raise ProblemDetail(
-                title="Username Exists",
-                detail="Имя пользователя уже занято",
-                status=400,
-            )
-        if existing_user["email"] == user.email:
-            raise ProblemDetail(
-                title="Email Exists", detail="Email уже зарегистрирован", status=400
-            )
-    new_id = _DB["next_user_id"]
-    _DB["users"][new_id] = {
-        **user.model_dump(),
-        "id": new_id,
-        "created_at": now_utc(),
-        "wishlists": [],
-    }
-    _DB["next_user_id"] += 1
-    return {"id": new_id, "message": "Пользователь создан"}
-
-
-@app.get("/users/{user_id}/wishlists", response_model=List[Dict])
-def get_user_wishlists(user_id: int):
-    if user_id not in _DB["users"]:
+async def create_user(user: UserCreate, repo: Repository = Depends(get_repository)):
+    if await repo.get_user_by_username(user.username) is not None:
+        raise ProblemDetail(
+            title="Username Exists",
+            detail="Имя пользователя уже занято",
+            status=400,
+        )
+    if await repo.get_user_by_email(user.email) is not None:
+        raise ProblemDetail(
+            title="Email Exists", detail="Email уже зарегистрирован", status=400
+        )
+    record = await repo.create_user(
+        {
+            **user.model_dump(),
+            "password": await hashing_service.hash(user.password),
+            "created_at": now_utc(),
+        }
+    )
+    return {"id": record["id"], "message": "Пользователь создан"}
+
+
+@app.get("/users/{user_id}/wishlists", response_model=List[WishlistSummary])
+async def get_user_wishlists(
+    user_id: int,
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    repo: Repository = Depends(get_repository),
+):
+    if await repo.get_user(user_id) is None:
         raise ProblemDetail(
             title="User Not Found", detail="Пользователь не найден", status=404
         )
-    user_wishlists = []
-    for wishlist_id, wishlist in _DB["wishlists"].items():
-        if wishlist["owner_id"] == user_id:
-            wishlist_summary = {
-                "id": wishlist["id"],
-                "name": wishlist["name"],
-                "description": wishlist["description"],
-                "item_count": len(wishlist["items"]),
-                "is_public": wishlist["is_public"],
-            }
-            user_wishlists.append(wishlist_summary)
-    return user_wishlists
+    wishlists = await repo.list_user_wishlists(user_id, after=after, limit=limit + 1)
+    return paginate(wishlists, limit, response)
+
+
+@app.get("/wishlists/public", response_model=List[WishlistSummary])
+async def get_public_wishlists(
+    response: Response,
+    limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    after: Optional[int] = Query(None, ge=0),
+    repo: Repository = Depends(get_repository),
+):
+    wishlists = await repo.list_public_wishlists(after=after, limit=limit + 1)
+    return paginate(wishlists, limit, response)
+
+
+@app.get("/wishlists", response_model=List[WishlistLookup])
+async def get_wishlists_batch(
+    ids: List[int] = Query(..., min_length=1, max_length=MAX_BATCH_IDS),
+    user_id: Optional[int] = None,
+    repo: Repository = Depends(get_repository),
+):
+    """
+    Сводки вишлистов по списку id. Приватный вишлист виден только владельцу
+    (``user_id``), остальным — статус 403; отсутствующий — 404.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = await repo.get_wishlist_summaries(ids)
+    result = []
+    for wishlist_id in ids:
+        wishlist = found.get(wishlist_id)
+        if wishlist is None:
+            result.append({"id": wishlist_id, "status": 404})
+        elif not wishlist["is_public"] and wishlist["owner_id"] != user_id:
+            result.append({"id": wishlist_id, "status": 403})
+        else:
+            result.append({"id": wishlist_id, "status": 200, "wishlist": wishlist})
+    return result
+
+
+def export_response(
+    repo: Repository, format: str, owner_id: Optional[int] = None
+) -> StreamingResponse:
+    """
+    Выгрузка владельца (``owner_id``) — целиком; общая — только публичные
+    вишлисты и без имён зарезервировавших.
+    """
+    if owner_id is None:
+        batches = export.hide_reservations(
+            repo.export_rows(None, EXPORT_BATCH_SIZE, public_only=True)
+        )
+    else:
+        batches = repo.export_rows(owner_id, EXPORT_BATCH_SIZE)
+    chunks = ndjson_chunks(batches) if format == "ndjson" else csv_chunks(batches)
+    filename = "wishlists" if owner_id is None else f"user-{owner_id}-wishlists"
+    return StreamingResponse(
+        chunks,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+
+@app.get("/export")
+async def export_all(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    repo: Repository = Depends(get_repository),
+):
+    return export_response(repo, format)
+
+
+@app.get("/users/{user_id}/export")
+async def export_user(
+    user_id: int,
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user: int = Depends(get_current_user),
+    repo: Repository = Depends(get_repository),
+):
+    if current_user != user_id:
+        raise ProblemDetail(
+            title="Access Denied",
+            detail="Выгрузка доступна только владельцу",
+            status=403,
+        )
+    if await repo.get_user(user_id) is None:
+        raise ProblemDetail(
+            title="User Not Found", detail="Пользователь не найден", status=404
+        )
+    return export_response(repo, format, user_id)
 
 
 @app.delete("/wishlists/{wishlist_id}/items/{item_id}")
-def delete_wishlist_item(wishlist_id: int, item_id: int):
-    if (
-        wishlist_id not in _DB["wishlists"]
-        or item_id not in _DB["wishlists"][wishlist_id]["items"]
-    ):
-        raise ProblemDetail(
-            title="Item Not Found", detail="Элемент не найден", status=404
-        )
-    deleted_item = _DB["wishlists"][wishlist_id]["items"].pop(item_id)
+async def delete_wishlist_item(
+    wishlist_id: int,
+    item_id: int,
+    request: Request,
+    repo: Repository = Depends(get_repository),
+):
+    expected = await if_match_item(request, repo, wishlist_id, item_id)
+    deleted_item = await repo.delete_item(wishlist_id, item_id, expected)
+    if deleted_item is None:
+        await raise_cas_failure(repo, wishlist_id, item_id, expected)
+        raise edit_conflict()
+    events.broker.publish(events.ITEM_DELETED, wishlist_id, deleted_item)
     return {"message": f"Элемент '{deleted_item['name']}' удален из вишлиста"}
 
 
 @app.delete("/wishlists/{wishlist_id}")
-def delete_wishlist(wishlist_id: int):
-    if wishlist_id not in _DB["wishlists"]:
+async def delete_wishlist(wishlist_id: int, repo: Repository = Depends(get_repository)):
+    deleted_wishlist = await repo.delete_wishlist(wishlist_id)
+    if deleted_wishlist is None:
         raise ProblemDetail(
             title="Wishlist Not Found", detail="Вишлист не найден", status=404
         )
-    deleted_wishlist = _DB["wishlists"].pop(wishlist_id)
+    events.broker.close(wishlist_id)
     return {"message": f"Вишлист '{deleted_wishlist['name']}' удален"}
 
 
 @app.delete("/users/{user_id}")
-def delete_user(user_id: int):
-    if user_id not in _DB["users"]:
+async def delete_user(user_id: int, repo: Repository = Depends(get_repository)):
+    # Вишлисты уходят каскадом — их подписчикам тоже нужен WISHLIST_DELETED
+    wishlist_ids = [
+        wishlist["id"] for wishlist in await repo.list_user_wishlists(user_id)
+    ]
+    deleted_user = await repo.delete_user(user_id)
+    if deleted_user is None:
         raise ProblemDetail(
             title="User Not Found", detail="Пользователь не найден", status=404
         )
-    wishlists_to_delete = [
-        wishlist_id
-        for wishlist_id, wishlist in _DB["wishlists"].items()
-        if wishlist["owner_id"] == user_id
-    ]
-    for wishlist_id in wishlists_to_delete:
-        _DB["wishlists"].pop(wishlist_id)
-    deleted_user = _DB["users"].pop(user_id)
+    for wishlist_id in wishlist_ids:
+        events.broker.close(wishlist_id)
     return {
         "message": f"Пользователь '{deleted_user['username']}' и все его вишлисты удалены"
     }
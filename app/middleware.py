@@ -1,13 +1,64 @@
+import re
 import uuid
+from contextvars import ContextVar
+from typing import Optional
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+CORRELATION_HEADER = "X-Correlation-ID"
 
-class CorrelationIdMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        correlation_id = str(uuid.uuid4())
-        request.state.correlation_id = correlation_id
-        response = await call_next(request)
-        response.headers["X-Correlation-ID"] = correlation_id
-        return response
+# Входящий id переиспользуем, только если он похож на токен (без инъекций в логи)
+_VALID_ID = re.compile(rb"[A-Za-z0-9._:\-]{1,128}")
+_HEADER_KEY = CORRELATION_HEADER.lower().encode("latin-1")
+
+# id текущего запроса для логов (см. app.logging_config)
+correlation_id_var: ContextVar[Optional[str]] = ContextVar(
+    "correlation_id", default=None
+)
+
+
+def new_correlation_id() -> str:
+    return str(uuid.uuid4())
+
+
+class CorrelationIdMiddleware:
+    """
+    Pure-ASGI middleware корреляционного id.
+
+    Берёт ``X-Correlation-ID`` из запроса (или генерирует новый), кладёт его
+    в ``request.state.correlation_id`` и ``correlation_id_var`` (для логов) и
+    добавляет заголовок в ``http.response.start`` — тело ответа проходит без
+    буферизации.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        correlation_id = None
+        for key, value in scope["headers"]:
+            if key == _HEADER_KEY:
+                if _VALID_ID.fullmatch(value):
+                    correlation_id = value.decode("latin-1")
+                break
+        if correlation_id is None:
+            correlation_id = new_correlation_id()
+        scope.setdefault("state", {})["correlation_id"] = correlation_id
+
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                if CORRELATION_HEADER not in headers:
+                    headers.append(CORRELATION_HEADER, correlation_id)
+            await send(message)
+
+        token = correlation_id_var.set(correlation_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            correlation_id_var.reset(token)
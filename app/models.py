@@ -1,6 +1,6 @@
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Annotated, Optional
+from typing import Annotated, Dict, List, Optional
 
 from pydantic import BaseModel, EmailStr, StringConstraints, field_validator
 
@@ -72,6 +72,57 @@ class WishItemResponse(WishItemCreate):
     reserved_by: Optional[str] = None
     created_at: datetime
     updated_at: datetime
+    version: int
+
+
+class SearchHit(WishItemResponse):
+    wishlist_id: int
+    score: int
+
+
+class PriceFacet(BaseModel):
+    min: Decimal
+    max: Optional[Decimal] = None
+    count: int
+
+
+class SearchFacets(BaseModel):
+    category: Dict[str, int]
+    price: List[PriceFacet]
+
+
+class SearchResponse(BaseModel):
+    total: int
+    items: List[SearchHit]
+    facets: SearchFacets
+
+
+class WishlistSummary(BaseModel):
+    id: int
+    owner_id: int
+    name: str
+    description: Optional[str] = None
+    is_public: bool
+    item_count: int
+    reserved_count: int
+    total_price: Decimal
+    min_price: Optional[Decimal] = None
+    max_price: Optional[Decimal] = None
+    updated_at: Optional[datetime] = None
+
+
+class ItemLookup(BaseModel):
+    """Результат пакетного чтения по одному id: ``item`` есть только при 200"""
+
+    id: int
+    status: int
+    item: Optional[WishItemResponse] = None
+
+
+class WishlistLookup(BaseModel):
+    id: int
+    status: int
+    wishlist: Optional[WishlistSummary] = None
 
 
 class ReserveRequest(BaseModel):
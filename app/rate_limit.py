@@ -0,0 +1,329 @@
+import asyncio
+import hashlib
+import logging
+import math
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.config import Settings, settings
+from app.exceptions import ProblemDetail
+
+logger = logging.getLogger(__name__)
+
+# (начало текущего окна, счётчик прошлого окна, счётчик текущего окна)
+Bucket = Tuple[float, int, int]
+
+
+def _roll(bucket: Optional[Bucket], window: float, now: float) -> Bucket:
+    """Сдвигает пару фиксированных окон к моменту ``now``"""
+    start = now - (now % window)
+    if bucket is None:
+        return start, 0, 0
+    bucket_start, prev, curr = bucket
+    if bucket_start == start:
+        return bucket
+    if start - bucket_start == window:
+        return start, curr, 0
+    return start, 0, 0
+
+
+def _retry_after(bucket: Bucket, limit: int, window: float, now: float) -> float:
+    """
+    Оценка скользящего окна: prev * (1 - elapsed / window) + curr.
+
+    Возвращает 0, если лимит не исчерпан, иначе — через сколько секунд
+    оценка опустится ниже лимита.
+    """
+    start, prev, curr = bucket
+    elapsed = now - start
+    if prev * (1 - elapsed / window) + curr < limit:
+        return 0.0
+    if curr < limit:
+        wait = window * (1 - (limit - curr) / prev) - elapsed
+    else:
+        wait = (window - elapsed) + window * (1 - limit / curr)
+    return max(wait, 0.001)
+
+
+class RateLimitStore(ABC):
+    """Хранилище счётчиков скользящего окна"""
+
+    # True, если операции блокируют поток (файлы, сеть)
+    blocking = False
+
+    @abstractmethod
+    def hit(self, key: str, limit: int, window: float, now: float) -> float:
+        """Учитывает попытку; 0 — разрешено, иначе Retry-After в секундах"""
+
+    @abstractmethod
+    def peek(self, key: str, limit: int, window: float, now: float) -> float:
+        """Retry-After для ключа без учёта новой попытки"""
+
+    @abstractmethod
+    def reset(self, key: str) -> None: ...
+
+
+class _Shard:
+    __slots__ = ("lock", "buckets", "window", "next_sweep")
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.buckets: Dict[str, Bucket] = {}
+        self.window = 0.0
+        self.next_sweep = 0.0
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """
+    Счётчики в памяти процесса, разбитые на шарды со своими блокировками.
+
+    Истёкшие корзины вычищаются лениво: шард просматривается не чаще
+    раза за окно, при очередном обращении к нему.
+    """
+
+    def __init__(self, shards: int = 16) -> None:
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _sweep(self, shard: _Shard, window: float, now: float) -> None:
+        shard.window = max(shard.window, window)
+        if now < shard.next_sweep:
+            return
+        horizon = now - 2 * shard.window
+        for key in [k for k, b in shard.buckets.items() if b[0] <= horizon]:
+            del shard.buckets[key]
+        shard.next_sweep = now + shard.window
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> float:
+        shard = self._shard(key)
+        with shard.lock:
+            self._sweep(shard, window, now)
+            bucket = _roll(shard.buckets.get(key), window, now)
+            retry = _retry_after(bucket, limit, window, now)
+            if not retry:
+                bucket = (bucket[0], bucket[1], bucket[2] + 1)
+            shard.buckets[key] = bucket
+            return retry
+
+    def peek(self, key: str, limit: int, window: float, now: float) -> float:
+        shard = self._shard(key)
+        with shard.lock:
+            bucket = _roll(shard.buckets.get(key), window, now)
+            return _retry_after(bucket, limit, window, now)
+
+    def reset(self, key: str) -> None:
+        shard = self._shard(key)
+        with shard.lock:
+            shard.buckets.pop(key, None)
+
+    def __len__(self) -> int:
+        return sum(len(shard.buckets) for shard in self._shards)
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    """
+    Счётчики в общей SQLite-базе (WAL), общие для всех воркеров.
+
+    Каждая попытка — короткая транзакция ``BEGIN IMMEDIATE``; истёкшие
+    корзины удаляются одним DELETE не чаще раза за окно. Окно хранится в
+    строке каждой корзины: ключи с разными окнами (IP — час, аккаунт —
+    15 минут) вычищаются каждый по своему окну.
+    """
+
+    blocking = True
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS rate_limits ("
+        " key TEXT PRIMARY KEY, window_start REAL NOT NULL,"
+        " prev_count INTEGER NOT NULL, curr_count INTEGER NOT NULL,"
+        " window_size REAL)"
+    )
+    SWEEP = (
+        "DELETE FROM rate_limits"
+        " WHERE window_start <= ? - 2 * COALESCE(window_size, ?)"
+    )
+    # Окно корзин из базы до появления window_size: заведомо не меньше любого
+    # лимита ADR-003; при следующей попытке корзина получает своё окно
+    LEGACY_WINDOW = 86400.0
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._local = threading.local()
+        self._next_sweep = 0.0
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute(self.SCHEMA)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(rate_limits)")}
+        if "window_size" not in columns:
+            try:
+                conn.execute("ALTER TABLE rate_limits ADD COLUMN window_size REAL")
+            except sqlite3.OperationalError as exc:
+                # Параллельно стартовавший воркер уже добавил колонку
+                if "duplicate column" not in str(exc):
+                    raise
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5.0, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def _load(self, conn: sqlite3.Connection, key: str) -> Optional[Bucket]:
+        return conn.execute(
+            "SELECT window_start, prev_count, curr_count FROM rate_limits WHERE key = ?",
+            (key,),
+        ).fetchone()
+
+    def hit(self, key: str, limit: int, window: float, now: float) -> float:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if now >= self._next_sweep:
+                conn.execute(self.SWEEP, (now, self.LEGACY_WINDOW))
+                self._next_sweep = now + window
+            bucket = _roll(self._load(conn, key), window, now)
+            retry = _retry_after(bucket, limit, window, now)
+            if not retry:
+                bucket = (bucket[0], bucket[1], bucket[2] + 1)
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limits VALUES (?, ?, ?, ?, ?)",
+                (key, *bucket, window),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retry
+
+    def peek(self, key: str, limit: int, window: float, now: float) -> float:
+        bucket = _roll(self._load(self._connection(), key), window, now)
+        return _retry_after(bucket, limit, window, now)
+
+    def reset(self, key: str) -> None:
+        self._connection().execute("DELETE FROM rate_limits WHERE key = ?", (key,))
+
+
+def anonymize(key: str) -> str:
+    """Короткий хэш ключа для логов (без IP/email в открытом виде)"""
+    return hashlib.sha256(key.encode()).hexdigest()[:12]
+
+
+def too_many_requests(retry_after: float) -> ProblemDetail:
+    return ProblemDetail(
+        title="Too Many Requests",
+        detail="Слишком много попыток, повторите позже",
+        status=429,
+        headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+    )
+
+
+class RateLimiter:
+    """Лимиты ADR-003: запросы к /auth/* по IP и неудачные входы по аккаунту"""
+
+    def __init__(
+        self,
+        store: RateLimitStore,
+        ip_limit: int,
+        ip_window: float,
+        login_failure_limit: int,
+        login_failure_window: float,
+    ) -> None:
+        self.store = store
+        self.ip_limit = ip_limit
+        self.ip_window = ip_window
+        self.login_failure_limit = login_failure_limit
+        self.login_failure_window = login_failure_window
+        self.rejections = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> "RateLimiter":
+        if settings.rate_limit_backend == "sqlite":
+            store: RateLimitStore = SQLiteRateLimitStore(settings.rate_limit_path)
+        else:
+            store = InMemoryRateLimitStore(settings.rate_limit_shards)
+        return cls(
+            store,
+            settings.auth_ip_limit,
+            settings.auth_ip_window,
+            settings.login_failure_limit,
+            settings.login_failure_window,
+        )
+
+    async def _call(self, method, *args) -> float:
+        if self.store.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    def _reject(self, key: str, retry_after: float) -> ProblemDetail:
+        self.rejections += 1
+        logger.warning("rate limit exceeded: key=%s", anonymize(key))
+        return too_many_requests(retry_after)
+
+    async def check_ip(self, ip: str) -> Optional[ProblemDetail]:
+        key = f"ip:{ip}"
+        retry = await self._call(
+            self.store.hit, key, self.ip_limit, self.ip_window, time.time()
+        )
+        return self._reject(key, retry) if retry else None
+
+    @staticmethod
+    def _account_key(username: str) -> str:
+        return f"account:{anonymize(username.lower())}"
+
+    async def check_account(self, username: str) -> None:
+        """Бросает 429, если аккаунт исчерпал лимит неудачных входов"""
+        key = self._account_key(username)
+        retry = await self._call(
+            self.store.peek,
+            key,
+            self.login_failure_limit,
+            self.login_failure_window,
+            time.time(),
+        )
+        if retry:
+            raise self._reject(key, retry)
+
+    async def record_login_failure(self, username: str) -> None:
+        await self._call(
+            self.store.hit,
+            self._account_key(username),
+            self.login_failure_limit,
+            self.login_failure_window,
+            time.time(),
+        )
+
+    async def record_login_success(self, username: str) -> None:
+        await self._call(self.store.reset, self._account_key(username))
+
+
+class RateLimitMiddleware:
+    """Pure-ASGI лимит по IP для путей с заданным префиксом"""
+
+    def __init__(self, app: ASGIApp, limiter: RateLimiter, prefixes: List[str]) -> None:
+        self.app = app
+        self.limiter = limiter
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        client = scope.get("client")
+        problem = await self.limiter.check_ip(client[0] if client else "unknown")
+        if problem is None:
+            await self.app(scope, receive, send)
+            return
+        response = problem.to_response(Request(scope))
+        await response(scope, receive, send)
+
+
+rate_limiter = RateLimiter.from_settings(settings)
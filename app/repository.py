@@ -0,0 +1,459 @@
+import asyncio
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import AsyncIterator, Dict, List, Optional
+
+from app.config import Settings
+from app.database import _DB, InMemoryStore
+from app.persistence import Persistence
+from app.search import SEARCH_PAGE_SIZE, search_result
+
+# Плоская строка выгрузки: вишлист + элемент (поля элемента пусты,
+# если в вишлисте нет элементов)
+EXPORT_COLUMNS = (
+    "owner_id",
+    "wishlist_id",
+    "wishlist_name",
+    "is_public",
+    "item_id",
+    "name",
+    "description",
+    "price",
+    "url",
+    "category",
+    "is_reserved",
+    "reserved_by",
+    "created_at",
+    "updated_at",
+)
+
+
+def export_row(wishlist: dict, item: Optional[dict]) -> dict:
+    row = {
+        "owner_id": wishlist["owner_id"],
+        "wishlist_id": wishlist["id"],
+        "wishlist_name": wishlist["name"],
+        "is_public": wishlist["is_public"],
+        "item_id": None,
+    }
+    for column in EXPORT_COLUMNS[5:]:
+        row[column] = item.get(column) if item is not None else None
+    if item is not None:
+        row["item_id"] = item["id"]
+    return row
+
+
+class Repository(ABC):
+    """
+    Хранилище пользователей, вишлистов и элементов.
+
+    Обработчики в app/main.py и app/auth.py работают только через этот
+    интерфейс, поэтому бэкенд (in-memory, PostgreSQL, SQLite) выбирается
+    настройкой ``db_backend`` без изменения кода эндпоинтов.
+    Записи возвращаются как dict; отсутствие записи — ``None``.
+    """
+
+    # --- users ---
+
+    @abstractmethod
+    async def create_user(self, record: dict) -> dict: ...
+
+    @abstractmethod
+    async def get_user(self, user_id: int) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_user_by_username(self, username: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_user_by_email(self, email: str) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def delete_user(self, user_id: int) -> Optional[dict]:
+        """Удаляет пользователя вместе с его вишлистами и элементами"""
+
+    # --- wishlists ---
+
+    @abstractmethod
+    async def create_wishlist(self, record: dict) -> dict: ...
+
+    @abstractmethod
+    async def get_wishlist(self, wishlist_id: int) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_wishlist_summaries(self, wishlist_ids: List[int]) -> Dict[int, dict]:
+        """Сводки найденных вишлистов: id → сводка; отсутствующих id нет"""
+
+    @abstractmethod
+    async def list_user_wishlists(
+        self, owner_id: int, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Сводки вишлистов пользователя (``models.WishlistSummary``) с id > after"""
+
+    @abstractmethod
+    async def list_public_wishlists(
+        self, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        """Сводки публичных вишлистов всех пользователей с id > after"""
+
+    @abstractmethod
+    async def delete_wishlist(self, wishlist_id: int) -> Optional[dict]: ...
+
+    # --- items ---
+
+    @abstractmethod
+    async def add_item(self, wishlist_id: int, record: dict) -> dict: ...
+
+    @abstractmethod
+    async def add_items(self, wishlist_id: int, records: List[dict]) -> List[dict]:
+        """Атомарно добавляет пачку элементов; возвращает их в порядке вставки"""
+
+    @abstractmethod
+    async def get_item(self, item_id: int) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def get_items(self, item_ids: List[int]) -> Dict[int, dict]:
+        """Найденные элементы: id → запись; отсутствующих id нет"""
+
+    @abstractmethod
+    async def get_wishlist_item(
+        self, wishlist_id: int, item_id: int
+    ) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def list_items(
+        self,
+        wishlist_id: int,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        is_reserved: Optional[bool] = None,
+    ) -> List[dict]:
+        """Элементы вишлиста по возрастанию id (keyset: id > after) с фильтрами"""
+
+    @abstractmethod
+    async def update_item(
+        self, wishlist_id: int, item_id: int, changes: dict
+    ) -> Optional[dict]: ...
+
+    @abstractmethod
+    async def compare_and_set_item(
+        self, wishlist_id: int, item_id: int, expected: dict, changes: dict
+    ) -> Optional[dict]:
+        """
+        Атомарно обновляет элемент, только если его поля равны ``expected``.
+
+        ``None`` — элемента нет или условие не выполнено.
+        """
+
+    @abstractmethod
+    async def delete_item(
+        self, wishlist_id: int, item_id: int, expected: Optional[dict] = None
+    ) -> Optional[dict]:
+        """Удаляет элемент (при ``expected`` — только если поля совпадают)"""
+
+    @abstractmethod
+    async def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = SEARCH_PAGE_SIZE,
+        offset: int = 0,
+    ) -> dict:
+        """
+        Поиск по элементам публичных вишлистов (см. ``app.search``).
+
+        ``{"total", "items", "facets"}``; элементы — по убыванию ``score``.
+        """
+
+    @abstractmethod
+    def export_rows(
+        self,
+        owner_id: Optional[int] = None,
+        batch_size: int = 500,
+        public_only: bool = False,
+    ) -> AsyncIterator[List[dict]]:
+        """
+        Пачки строк ``EXPORT_COLUMNS`` в порядке (wishlist_id, item_id).
+
+        Строки читаются keyset-запросами по ``batch_size``, поэтому память
+        не зависит от объёма данных. ``owner_id=None`` — весь стор
+        (``public_only`` — только публичные вишлисты).
+        """
+
+    @abstractmethod
+    def reserved_items(self, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        """
+        Пачки ``{"id", "wishlist_id", "reserved_at"}`` зарезервированных
+        элементов (для планировщика истечения резервов).
+        """
+
+    @abstractmethod
+    async def counts(self) -> Dict[str, int]:
+        """Число пользователей, вишлистов и элементов (для метрик)"""
+
+    async def close(self) -> None:
+        """Освобождает ресурсы бэкенда (пул соединений и т.п.)"""
+
+
+class InMemoryRepository(Repository):
+    """
+    Репозиторий поверх индексированного InMemoryStore.
+
+    С ``persistence`` каждая мутация возвращается только после того, как её
+    запись в журнале зафиксирована на диске (group commit, см.
+    ``app.persistence``).
+
+    Элементы больших удалённых вишлистов, не снятые с индексов за первый
+    шаг ``InMemoryStore.reclaim``, дочищает фоновая задача — пачками, отдавая
+    управление event loop между ними.
+    """
+
+    def __init__(
+        self, store: InMemoryStore, persistence: Optional[Persistence] = None
+    ) -> None:
+        self.store = store
+        self.persistence = persistence
+        self._reclaimer: Optional[asyncio.Task] = None
+
+    def _reclaim_later(self) -> None:
+        if self.store.reclaim_pending and (
+            self._reclaimer is None or self._reclaimer.done()
+        ):
+            self._reclaimer = asyncio.create_task(self._reclaim())
+
+    async def _reclaim(self) -> None:
+        while self.store.reclaim():
+            await asyncio.sleep(0)
+
+    async def _durable(self, result):
+        if self.persistence is not None:
+            await self.persistence.sync()
+        return result
+
+    async def create_user(self, record: dict) -> dict:
+        return await self._durable(self.store.add_user(record))
+
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        return self.store.get_user(user_id)
+
+    async def get_user_by_username(self, username: str) -> Optional[dict]:
+        return self.store.get_user_by_username(username)
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        return self.store.get_user_by_email(email)
+
+    async def delete_user(self, user_id: int) -> Optional[dict]:
+        if self.store.get_user(user_id) is None:
+            return None
+        user = self.store.delete_user(user_id)
+        self._reclaim_later()
+        return await self._durable(user)
+
+    async def create_wishlist(self, record: dict) -> dict:
+        return await self._durable(self.store.add_wishlist(record))
+
+    async def get_wishlist(self, wishlist_id: int) -> Optional[dict]:
+        return self.store.get_wishlist(wishlist_id)
+
+    async def get_wishlist_summaries(self, wishlist_ids: List[int]) -> Dict[int, dict]:
+        return self.store.summaries(wishlist_ids)
+
+    async def list_user_wishlists(
+        self, owner_id: int, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        return [
+            self.store.summary(wishlist)
+            for wishlist in self.store.wishlists_of(owner_id, after, limit)
+        ]
+
+    async def list_public_wishlists(
+        self, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        return [
+            self.store.summary(wishlist)
+            for wishlist in self.store.public_wishlists(after, limit)
+        ]
+
+    async def delete_wishlist(self, wishlist_id: int) -> Optional[dict]:
+        if self.store.get_wishlist(wishlist_id) is None:
+            return None
+        wishlist = self.store.delete_wishlist(wishlist_id)
+        self._reclaim_later()
+        return await self._durable(wishlist)
+
+    async def add_item(self, wishlist_id: int, record: dict) -> dict:
+        return await self._durable(self.store.add_item(wishlist_id, record))
+
+    async def add_items(self, wishlist_id: int, records: List[dict]) -> List[dict]:
+        return await self._durable(self.store.add_items(wishlist_id, records))
+
+    async def get_item(self, item_id: int) -> Optional[dict]:
+        return self.store.get_item(item_id)
+
+    async def get_items(self, item_ids: List[int]) -> Dict[int, dict]:
+        return self.store.get_items(item_ids)
+
+    async def get_wishlist_item(self, wishlist_id: int, item_id: int) -> Optional[dict]:
+        return self.store.get_wishlist_item(wishlist_id, item_id)
+
+    async def list_items(
+        self,
+        wishlist_id: int,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        is_reserved: Optional[bool] = None,
+    ) -> List[dict]:
+        return self.store.list_items(
+            wishlist_id,
+            after=after,
+            limit=limit,
+            category=category,
+            min_price=min_price,
+            max_price=max_price,
+            is_reserved=is_reserved,
+        )
+
+    async def update_item(
+        self, wishlist_id: int, item_id: int, changes: dict
+    ) -> Optional[dict]:
+        return await self._durable(
+            self.store.compare_and_set_item(wishlist_id, item_id, {}, changes)
+        )
+
+    async def compare_and_set_item(
+        self, wishlist_id: int, item_id: int, expected: dict, changes: dict
+    ) -> Optional[dict]:
+        return await self._durable(
+            self.store.compare_and_set_item(wishlist_id, item_id, expected, changes)
+        )
+
+    async def delete_item(
+        self, wishlist_id: int, item_id: int, expected: Optional[dict] = None
+    ) -> Optional[dict]:
+        return await self._durable(
+            self.store.compare_and_delete_item(wishlist_id, item_id, expected or {})
+        )
+
+    async def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = SEARCH_PAGE_SIZE,
+        offset: int = 0,
+    ) -> dict:
+        return search_result(
+            *self.store.search(query, category, min_price, max_price, limit, offset)
+        )
+
+    async def export_rows(
+        self,
+        owner_id: Optional[int] = None,
+        batch_size: int = 500,
+        public_only: bool = False,
+    ) -> AsyncIterator[List[dict]]:
+        batch: List[dict] = []
+        after_wishlist = None
+        while True:
+            if owner_id is None:
+                wishlists = self.store.wishlists_page(after_wishlist, batch_size)
+            else:
+                wishlists = self.store.wishlists_of(
+                    owner_id, after_wishlist, batch_size
+                )
+            if not wishlists:
+                break
+            for wishlist in wishlists:
+                if public_only and not wishlist["is_public"]:
+                    continue
+                after_item = None
+                empty = True
+                while True:
+                    items = self.store.list_items(
+                        wishlist["id"], after=after_item, limit=batch_size
+                    )
+                    if not items:
+                        break
+                    empty = False
+                    for item in items:
+                        batch.append(export_row(wishlist, item))
+                    after_item = items[-1]["id"]
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+                if empty:
+                    batch.append(export_row(wishlist, None))
+                    if len(batch) >= batch_size:
+                        yield batch
+                        batch = []
+            after_wishlist = wishlists[-1]["id"]
+        if batch:
+            yield batch
+
+    async def reserved_items(self, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        batch: List[dict] = []
+        for item in self.store.reserved_items():
+            batch.append(
+                {
+                    "id": item.id,
+                    "wishlist_id": item.wishlist_id,
+                    "reserved_at": item.get("reserved_at"),
+                }
+            )
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    async def counts(self) -> Dict[str, int]:
+        return self.store.counts()
+
+    async def close(self) -> None:
+        if self._reclaimer is not None:
+            self._reclaimer.cancel()
+        if self.persistence is not None:
+            await self.persistence.close()
+
+
+_repository: Repository = InMemoryRepository(_DB)
+
+
+def get_repository() -> Repository:
+    """FastAPI-зависимость: текущий репозиторий приложения"""
+    return _repository
+
+
+async def init_repository(settings: Settings) -> Repository:
+    """Создаёт репозиторий согласно ``settings.db_backend``"""
+    global _repository
+    if settings.db_backend == "postgres":
+        from app.sql_repository import PostgresRepository
+
+        _repository = await PostgresRepository.connect(settings)
+    elif settings.db_backend == "sqlite":
+        from app.sql_repository import SQLiteRepository
+
+        _repository = await SQLiteRepository.connect(settings)
+    elif settings.persist_dir:
+        persistence = Persistence(
+            _DB, settings.persist_dir, settings.wal_commit_interval
+        )
+        await asyncio.to_thread(persistence.open)
+        persistence.start_snapshots(settings.snapshot_interval)
+        _repository = InMemoryRepository(_DB, persistence)
+    else:
+        _repository = InMemoryRepository(_DB)
+    return _repository
+
+
+async def close_repository() -> None:
+    await _repository.close()
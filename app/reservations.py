@@ -0,0 +1,174 @@
+"""
+Истечение резервов: элемент освобождается через ``reservation_ttl`` секунд
+после ``reserved_at``.
+
+Один фоновый планировщик держит min-кучу сроков (срок, item_id, ...):
+постановка — O(log n), ожидание — до ближайшего срока, без периодического
+обхода элементов. Снятие резерва вручную кучу не трогает: истёкшая запись
+освобождает элемент тем же compare-and-set, что и ``unreserve_item``, с
+условием «всё ещё зарезервирован с тем же ``reserved_at``», поэтому
+устаревшая запись — no-op. Сроки, наступившие одновременно, обрабатываются
+пачками по ``batch_size``. Если снять резерв не удалось (ошибка хранилища),
+срок возвращается в кучу через ``retry_delay`` секунд.
+"""
+
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from app import events
+from app.models import now_utc
+from app.repository import Repository
+
+logger = logging.getLogger(__name__)
+
+EXPIRY_BATCH_SIZE = 256
+# Пауза перед повтором снятия резерва после ошибки хранилища, с
+EXPIRY_RETRY_DELAY = 1.0
+
+# (срок, item_id, wishlist_id, reserved_at) — item_id разрешает равные сроки
+Deadline = Tuple[float, int, int, Optional[datetime]]
+
+
+def unreserve_changes(now: datetime) -> dict:
+    """Изменения элемента при снятии резерва (вручную или по истечении)"""
+    return {
+        "is_reserved": False,
+        "reserved_by": None,
+        "reserved_at": None,
+        "reservation_message": None,
+        "updated_at": now,
+    }
+
+
+def _still_reserved(reserved_at: Optional[datetime]) -> dict:
+    """Условие CAS: резерв тот же, что был поставлен в очередь"""
+    if reserved_at is None:
+        return {"is_reserved": True}
+    return {"is_reserved": True, "reserved_at": reserved_at}
+
+
+class ReservationExpiry:
+    """Планировщик истечения резервов поверх репозитория"""
+
+    def __init__(
+        self,
+        batch_size: int = EXPIRY_BATCH_SIZE,
+        retry_delay: float = EXPIRY_RETRY_DELAY,
+    ) -> None:
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.ttl = 0.0
+        self.expired = 0
+        self._repo: Optional[Repository] = None
+        self._heap: List[Deadline] = []
+        self._changed: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self._task is not None
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    async def start(self, repo: Repository, ttl: float) -> None:
+        """
+        Загружает сроки уже зарезервированных элементов и запускает
+        планировщик. ``ttl <= 0`` — резервы не истекают.
+        """
+        if ttl <= 0:
+            return
+        self._repo, self.ttl = repo, ttl
+        self._heap = []
+        self._changed = asyncio.Event()
+        async for batch in repo.reserved_items():
+            self._heap.extend(map(self._deadline, batch))
+        heapq.heapify(self._heap)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._heap = []
+
+    def _deadline(self, item: dict) -> Deadline:
+        # Резерв без reserved_at (сделан до включения TTL) отсчитывается от запуска
+        reserved_at = item.get("reserved_at")
+        started = time.time() if reserved_at is None else reserved_at.timestamp()
+        return started + self.ttl, item["id"], item["wishlist_id"], reserved_at
+
+    def schedule(self, item: dict) -> None:
+        """Ставит срок только что зарезервированного элемента; O(log n)"""
+        if self._task is None:
+            return
+        deadline = self._deadline(item)
+        heapq.heappush(self._heap, deadline)
+        if self._heap[0] is deadline:
+            self._changed.set()
+
+    def _due(self, now: float) -> List[Deadline]:
+        batch: List[Deadline] = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            batch.append(heapq.heappop(self._heap))
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            if not self._heap:
+                await self._changed.wait()
+                self._changed.clear()
+                continue
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                self._changed.clear()
+                continue
+            await self.expire(self._due(time.time()))
+
+    async def expire(self, batch: List[Deadline]) -> int:
+        """
+        Освобождает элементы пачки, чей резерв не менялся; число снятых.
+
+        Сроки элементов, на которых хранилище вернуло ошибку, ставятся
+        повторно через ``retry_delay`` — остальная пачка не теряется.
+        """
+        changes = unreserve_changes(now_utc())
+        released = await asyncio.gather(
+            *(
+                self._repo.compare_and_set_item(
+                    wishlist_id, item_id, _still_reserved(reserved_at), changes
+                )
+                for _, item_id, wishlist_id, reserved_at in batch
+            ),
+            return_exceptions=True,
+        )
+        count = 0
+        failed: List[BaseException] = []
+        retry_at = time.time() + self.retry_delay
+        for deadline, item in zip(batch, released):
+            if isinstance(item, BaseException):
+                failed.append(item)
+                heapq.heappush(self._heap, (retry_at, *deadline[1:]))
+            elif item is not None:
+                count += 1
+                events.broker.publish(events.ITEM_UNRESERVED, item["wishlist_id"], item)
+        if failed:
+            logger.warning(
+                "Не удалось снять %d истёкших резервов, повтор через %.1f с",
+                len(failed),
+                self.retry_delay,
+                exc_info=failed[0],
+            )
+        self.expired += count
+        return count
+
+
+reservation_expiry = ReservationExpiry()
@@ -0,0 +1,407 @@
+"""
+Поиск элементов публичных вишлистов.
+
+Инвертированный индекс по словам ``name`` и ``description`` плюс индексы
+по категории и цене ведутся инкрементально при каждой мутации элемента
+(см. ``InMemoryStore``). Запрос — все слова должны встретиться в имени или
+описании; ранг — сумма весов полей, где встретилось слово (имя весомее
+описания). Фасеты считаются «дизъюнктивно»: счётчики категорий не учитывают
+фильтр по категории, счётчики цен — фильтр по цене.
+"""
+
+import re
+import threading
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from decimal import Decimal
+from itertools import compress
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+# Страница выдачи по умолчанию, максимум и предел смещения
+SEARCH_PAGE_SIZE = 20
+MAX_SEARCH_PAGE_SIZE = 100
+MAX_SEARCH_OFFSET = 1000
+# Слова запроса сверх этого числа не учитываются
+MAX_QUERY_TERMS = 8
+# Число категорий в фасете (самые частые)
+CATEGORY_FACET_LIMIT = 20
+
+# Веса полей в ранге
+NAME_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+
+# Границы ценовых фасетов: [0, 500), [500, 1000), ..., [10000, ∞)
+PRICE_FACETS = (Decimal(500), Decimal(1000), Decimal(5000), Decimal(10000))
+
+# Поля элемента, изменение которых требует переиндексации
+SEARCH_FIELDS = ("name", "description", "category", "price")
+
+_WORD = re.compile(r"[^\W_]+")
+_EMPTY: FrozenSet[int] = frozenset()
+# Ценовые интервалы в коде фасетов: len(PRICE_FACETS) + 1 интервал и «без цены»
+_NO_PRICE = len(PRICE_FACETS) + 1
+_STRIDE = len(PRICE_FACETS) + 2
+_INFINITY = float("inf")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Слова текста в нижнем регистре, без повторов, в порядке появления"""
+    if not text:
+        return []
+    words = _WORD.findall(text.casefold().replace("ё", "е"))
+    return list(dict.fromkeys(words))
+
+
+def query_terms(query: str) -> List[str]:
+    return tokenize(query)[:MAX_QUERY_TERMS]
+
+
+def price_facets(counts: Dict[int, int]) -> List[dict]:
+    """Счётчики по номеру ценового интервала → список фасетов"""
+    bounds = (Decimal(0), *PRICE_FACETS)
+    return [
+        {
+            "min": low,
+            "max": PRICE_FACETS[bucket] if bucket < len(PRICE_FACETS) else None,
+            "count": counts.get(bucket, 0),
+        }
+        for bucket, low in enumerate(bounds)
+    ]
+
+
+def category_facets(counts: Dict[str, int]) -> Dict[str, int]:
+    """Самые частые категории, по убыванию счётчика"""
+    ranked = sorted(counts.items(), key=lambda pair: (-pair[1], pair[0]))
+    return dict(ranked[:CATEGORY_FACET_LIMIT])
+
+
+def search_result(
+    total: int, items: List[dict], categories: Dict[str, int], prices: Dict[int, int]
+) -> dict:
+    """Ответ поиска, общий для всех бэкендов"""
+    return {
+        "total": total,
+        "items": items,
+        "facets": {
+            "category": category_facets(categories),
+            "price": price_facets(prices),
+        },
+    }
+
+
+class SortedPairs:
+    """
+    Отсортированный список пар ``(ключ, id)`` блоками ограниченного размера.
+
+    Вставка и удаление сдвигают только один блок, а не весь список, поэтому
+    индекс на миллион элементов обновляется за микросекунды.
+    """
+
+    BLOCK_SIZE = 1024
+
+    def __init__(self) -> None:
+        self._blocks: List[list] = []
+        self._maxes: list = []
+
+    def __len__(self) -> int:
+        return sum(len(block) for block in self._blocks)
+
+    def add(self, pair: tuple) -> None:
+        if not self._blocks:
+            self._blocks.append([pair])
+            self._maxes.append(pair)
+            return
+        position = min(bisect_left(self._maxes, pair), len(self._maxes) - 1)
+        block = self._blocks[position]
+        insort(block, pair)
+        self._maxes[position] = block[-1]
+        if len(block) > 2 * self.BLOCK_SIZE:
+            half = self.BLOCK_SIZE
+            self._blocks[position : position + 1] = [block[:half], block[half:]]
+            self._maxes[position : position + 1] = [block[half - 1], block[-1]]
+
+    def remove(self, pair: tuple) -> None:
+        position = bisect_left(self._maxes, pair)
+        if position == len(self._maxes):
+            return
+        block = self._blocks[position]
+        offset = bisect_left(block, pair)
+        if offset < len(block) and block[offset] == pair:
+            del block[offset]
+            if block:
+                self._maxes[position] = block[-1]
+            else:
+                del self._blocks[position]
+                del self._maxes[position]
+
+    def _bounds(self, low, high) -> Tuple[int, int, int, int]:
+        """(блок, смещение) первой пары с ключом >= low и после последней <= high"""
+        first = 0 if low is None else bisect_left(self._maxes, (low,))
+        start = 0
+        if low is not None and first < len(self._blocks):
+            start = bisect_left(self._blocks[first], (low,))
+        last = len(self._blocks) - 1
+        stop = len(self._blocks[-1]) if self._blocks else 0
+        if high is not None:
+            last = min(bisect_right(self._maxes, (high, _INFINITY)), last)
+            if last >= 0:
+                stop = bisect_right(self._blocks[last], (high, _INFINITY))
+        return first, start, last, stop
+
+    def count(self, low=None, high=None) -> int:
+        """Число пар с ключом в ``[low, high]`` (``None`` — без границы)"""
+        first, start, last, stop = self._bounds(low, high)
+        if first > last:
+            return 0
+        if first == last:
+            return max(stop - start, 0)
+        middle = sum(len(block) for block in self._blocks[first + 1 : last])
+        return len(self._blocks[first]) - start + middle + stop
+
+    def ids(self, low=None, high=None) -> Iterator[int]:
+        """id пар с ключом в ``[low, high]`` по возрастанию ключа"""
+        first, start, last, stop = self._bounds(low, high)
+        for position in range(first, last + 1):
+            block = self._blocks[position]
+            begin = start if position == first else 0
+            end = stop if position == last else len(block)
+            for _, item_id in block[begin:end]:
+                yield item_id
+
+
+class SearchIndex:
+    """
+    Индекс элементов публичных вишлистов.
+
+    Списки вхождений — множества id: пересечение в C обходит меньшее из
+    множеств, поэтому стоимость запроса определяется самым редким словом, а
+    не размером стора. Цена хранится ключом ``price_key`` (см.
+    ``app.database``) в ``SortedPairs``; категория и ценовой интервал
+    каждого id упакованы в плотный массив ``codes`` — фасеты считаются
+    проходом ``Counter`` по нему без Python-цикла.
+    """
+
+    def __init__(self, price_key) -> None:
+        # price_key: Decimal → ключ сравнения, совпадающий с StoredItem.price_key
+        self._price_key = price_key
+        self._bounds = [price_key(bound) for bound in PRICE_FACETS]
+        self.names: Dict[str, Set[int]] = {}
+        self.descriptions: Dict[str, Set[int]] = {}
+        self.by_category: Dict[str, Set[int]] = {}
+        self.by_price = SortedPairs()
+        self.prices: Dict[int, object] = {}
+        # id → 1 + номер категории * _STRIDE + ценовой интервал; 0 — нет в индексе
+        self.codes = array("i")
+        self.categories: List[Optional[str]] = [None]
+        self._category_codes: Dict[Optional[str], int] = {None: 0}
+        self.lock = threading.Lock()
+
+    def _code(self, item_id: int) -> int:
+        return self.codes[item_id] if item_id < len(self.codes) else 0
+
+    def _set_code(self, item_id: int, code: int) -> None:
+        if item_id >= len(self.codes):
+            grow = max(item_id + 1 - len(self.codes), len(self.codes))
+            self.codes.frombytes(bytes(grow * self.codes.itemsize))
+        self.codes[item_id] = code
+
+    def _insert(self, item) -> None:
+        item_id = item.id
+        for word in tokenize(item.name):
+            self.names.setdefault(word, set()).add(item_id)
+        for word in tokenize(item.description):
+            self.descriptions.setdefault(word, set()).add(item_id)
+        if item.category is not None:
+            self.by_category.setdefault(item.category, set()).add(item_id)
+        bucket = _NO_PRICE
+        if item.price_units is not None:
+            key = self.prices[item_id] = item.price_key
+            bucket = bisect_right(self._bounds, key)
+            self.by_price.add((key, item_id))
+        category = self._category_codes.get(item.category)
+        if category is None:
+            category = self._category_codes[item.category] = len(self.categories)
+            self.categories.append(item.category)
+        self._set_code(item_id, 1 + category * _STRIDE + bucket)
+
+    def add(self, item) -> None:
+        with self.lock:
+            self._insert(item)
+
+    def extend(self, items: Iterable) -> None:
+        with self.lock:
+            for item in items:
+                self._insert(item)
+
+    def remove(self, item) -> None:
+        """Снимает элемент с индекса (по его текущим, ещё не изменённым полям)"""
+        item_id = item.id
+        with self.lock:
+            code = self._code(item_id)
+            if not code:
+                return
+            self.codes[item_id] = 0
+            for word in tokenize(item.name):
+                _discard(self.names, word, item_id)
+            for word in tokenize(item.description):
+                _discard(self.descriptions, word, item_id)
+            category = self.categories[(code - 1) // _STRIDE]
+            if category is not None:
+                _discard(self.by_category, category, item_id)
+            key = self.prices.pop(item_id, None)
+            if key is not None:
+                self.by_price.remove((key, item_id))
+
+    def _matching(self, terms: List[str]) -> Set[int]:
+        """
+        id, где встретились все слова. Результат может быть множеством самого
+        индекса — вызывающий его не изменяет.
+        """
+        postings = []
+        for term in terms:
+            in_name = self.names.get(term, _EMPTY)
+            in_description = self.descriptions.get(term, _EMPTY)
+            if in_name and in_description:
+                postings.append(in_name | in_description)
+            elif in_name or in_description:
+                postings.append(in_name or in_description)
+            else:
+                return set()
+        if not postings:
+            return set()
+        postings.sort(key=len)
+        matched = postings[0]
+        for ids in postings[1:]:
+            matched = matched & ids
+        return matched
+
+    def _price_range(
+        self, ids: Set[int], min_price: Optional[Decimal], max_price: Optional[Decimal]
+    ) -> Set[int]:
+        low = -_INFINITY if min_price is None else self._price_key(min_price)
+        high = _INFINITY if max_price is None else self._price_key(max_price)
+        if self.by_price.count(low, high) < len(ids):
+            # Диапазон уже выборки: идём по отсортированному ценовому индексу
+            return ids.intersection(self.by_price.ids(low, high))
+
+        # Интервал фасета целиком внутри диапазона отбирается по коду (в C),
+        # пересекающий границу — по ценовому индексу или по цене элемента
+        result: Set[int] = set()
+        inside: Set[int] = set()
+        edge: Set[int] = set()
+        edges = (-_INFINITY, *self._bounds, _INFINITY)
+        for bucket in range(len(edges) - 1):
+            start, stop = edges[bucket], edges[bucket + 1]
+            if stop <= low or start > high:
+                continue
+            codes = {1 + c * _STRIDE + bucket for c in range(len(self.categories))}
+            if low <= start and stop <= high:
+                inside |= codes
+            elif self.by_price.count(max(low, start), min(high, stop)) < len(ids):
+                part = self.by_price.ids(max(low, start), min(high, stop))
+                result |= ids.intersection(part)
+            else:
+                edge |= codes
+        ordered = list(ids)
+        codes = list(map(self.codes.__getitem__, ordered))
+        result.update(compress(ordered, map(inside.__contains__, codes)))
+        if edge:
+            prices = self.prices
+            result.update(
+                item_id
+                for item_id in compress(ordered, map(edge.__contains__, codes))
+                if low <= prices[item_id] <= high
+            )
+        return result
+
+    def search(
+        self,
+        terms: List[str],
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = SEARCH_PAGE_SIZE,
+        offset: int = 0,
+    ) -> Tuple[int, List[Tuple[int, int]], Dict[str, int], Dict[int, int]]:
+        """
+        (всего найдено, [(id, ранг)] страницы, фасет категорий, фасет цен).
+
+        Страница упорядочена по убыванию ранга, при равенстве — по id.
+        """
+        with self.lock:
+            matched = self._matching(terms)
+            in_category = in_price = found = matched
+            if category is not None:
+                in_category = found = matched & self.by_category.get(category, _EMPTY)
+            if min_price is not None or max_price is not None:
+                in_price = self._price_range(matched, min_price, max_price)
+                found = in_category & in_price
+            categories, prices = self._facets(in_category, in_price)
+            page = self._rank(found, terms, offset + limit)[offset:]
+        return len(found), page, categories, prices
+
+    def _facets(
+        self, in_category: Set[int], in_price: Set[int]
+    ) -> Tuple[Dict[str, int], Dict[int, int]]:
+        """
+        Фасет категорий — по выборке без фильтра категории, фасет цен — без
+        фильтра цены. Проход по выборке считает коды ``codes`` (плотный
+        массив по id), без обращений к самим элементам.
+        """
+        code = self.codes.__getitem__
+        by_price = Counter(map(code, in_price))
+        by_category = by_price
+        if in_category is not in_price:
+            by_category = Counter(map(code, in_category))
+        categories: Counter = Counter()
+        for value, count in by_price.items():
+            category = self.categories[(value - 1) // _STRIDE]
+            if category is not None:
+                categories[category] += count
+        prices: Counter = Counter()
+        for value, count in by_category.items():
+            bucket = (value - 1) % _STRIDE
+            if bucket != _NO_PRICE:
+                prices[bucket] += count
+        return categories, prices
+
+    def _rank(self, found: Set[int], terms: List[str], count: int) -> List[tuple]:
+        """Первые ``count`` пар (id, ранг) по убыванию ранга, затем по id"""
+        if len(terms) == 1:
+            # Одно слово: всего три значения ранга, уровни — операции множеств
+            in_name = found & self.names.get(terms[0], _EMPTY)
+            in_description = found & self.descriptions.get(terms[0], _EMPTY)
+            both = in_name & in_description
+            page: List[tuple] = []
+            for score, ids in (
+                (NAME_WEIGHT + DESCRIPTION_WEIGHT, lambda: both),
+                (NAME_WEIGHT, lambda: in_name - both),
+                (DESCRIPTION_WEIGHT, lambda: in_description - both),
+            ):
+                if len(page) >= count:
+                    break
+                page.extend(
+                    (item_id, score) for item_id in sorted(ids())[: count - len(page)]
+                )
+            return page
+
+        # Ранг: Counter.update по множествам и сортировки выполняются в C
+        scores: Counter = Counter()
+        for term in terms:
+            in_name = found & self.names.get(term, _EMPTY)
+            for _ in range(NAME_WEIGHT):
+                scores.update(in_name)
+            in_description = found & self.descriptions.get(term, _EMPTY)
+            for _ in range(DESCRIPTION_WEIGHT):
+                scores.update(in_description)
+        ranked = sorted(sorted(scores), key=scores.__getitem__, reverse=True)
+        return [(item_id, scores[item_id]) for item_id in ranked[:count]]
+
+
+def _discard(index: Dict[str, Set[int]], key: str, item_id: int) -> None:
+    ids = index.get(key)
+    if ids is not None:
+        ids.discard(item_id)
+        if not ids:
+            del index[key]
@@ -0,0 +1,53 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict
+
+
+class ItemRecord(TypedDict):
+    """Поля ``WishItemResponse`` как схема сериализации хранимой записи"""
+
+    name: str
+    description: Optional[str]
+    price: Optional[Decimal]
+    url: Optional[str]
+    category: Optional[str]
+    id: int
+    is_reserved: bool
+    reserved_by: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    version: int
+
+
+class ItemLookupRecord(TypedDict):
+    """Поля ``ItemLookup``"""
+
+    id: int
+    status: int
+    item: Optional[ItemRecord]
+
+
+# Сериализаторы pydantic-core: dict из хранилища → JSON-байты без валидации,
+# лишние ключи записи (wishlist_id, reserved_at, ...) отбрасываются
+ITEM_JSON = TypeAdapter(ItemRecord)
+ITEMS_JSON = TypeAdapter(List[ItemRecord])
+BATCH_JSON = TypeAdapter(List[ItemLookupRecord])
+ANY_JSON = TypeAdapter(Dict[str, Any])
+
+
+def json_response(adapter: TypeAdapter, value: Any, response: Response) -> Response:
+    """
+    Готовый JSON-ответ в обход ``response_model``.
+
+    Заголовки, выставленные обработчиком на ``response`` (ETag, курсор),
+    переносятся в итоговый ответ.
+    """
+    fast = Response(adapter.dump_json(value), media_type="application/json")
+    fast.raw_headers.extend(
+        header for header in response.raw_headers if header[0] != b"content-length"
+    )
+    return fast
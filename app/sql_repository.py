@@ -0,0 +1,732 @@
+import asyncio
+import queue
+import re
+import sqlite3
+from abc import abstractmethod
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence, Tuple
+
+from app import search
+from app.config import Settings
+from app.repository import EXPORT_COLUMNS, Repository
+
+USER_COLUMNS = ("username", "email", "password", "created_at")
+WISHLIST_COLUMNS = ("owner_id", "name", "description", "is_public", "created_at")
+ITEM_COLUMNS = (
+    "name",
+    "description",
+    "price",
+    "url",
+    "category",
+    "is_reserved",
+    "reserved_by",
+    "reserved_at",
+    "reservation_message",
+    "created_at",
+    "updated_at",
+)
+
+# Типы колонок items для массовой вставки через unnest в PostgreSQL
+POSTGRES_ITEM_TYPES = {
+    "name": "text",
+    "description": "text",
+    "price": "numeric",
+    "url": "text",
+    "category": "text",
+    "is_reserved": "boolean",
+    "reserved_by": "text",
+    "reserved_at": "timestamptz",
+    "reservation_message": "text",
+    "created_at": "timestamptz",
+    "updated_at": "timestamptz",
+}
+
+POSTGRES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id BIGSERIAL PRIMARY KEY,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wishlists (
+    id BIGSERIAL PRIMARY KEY,
+    owner_id BIGINT NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    is_public BOOLEAN NOT NULL DEFAULT TRUE,
+    created_at TIMESTAMPTZ NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS wishlists_owner_idx ON wishlists (owner_id, id);
+CREATE INDEX IF NOT EXISTS wishlists_public_idx ON wishlists (is_public, id);
+CREATE TABLE IF NOT EXISTS items (
+    id BIGSERIAL PRIMARY KEY,
+    wishlist_id BIGINT NOT NULL REFERENCES wishlists (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    price NUMERIC,
+    url TEXT,
+    category TEXT,
+    is_reserved BOOLEAN NOT NULL DEFAULT FALSE,
+    reserved_by TEXT,
+    reserved_at TIMESTAMPTZ,
+    reservation_message TEXT,
+    created_at TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    version BIGINT NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS items_wishlist_idx ON items (wishlist_id, id);
+CREATE INDEX IF NOT EXISTS items_category_idx ON items (wishlist_id, category, id);
+CREATE INDEX IF NOT EXISTS items_reserved_idx ON items (wishlist_id, is_reserved, id);
+CREATE INDEX IF NOT EXISTS items_price_idx ON items (wishlist_id, price);
+CREATE OR REPLACE FUNCTION touch_wishlist() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        UPDATE wishlists SET version = version + 1 WHERE id = OLD.wishlist_id;
+    ELSE
+        UPDATE wishlists SET version = version + 1 WHERE id = NEW.wishlist_id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql;
+DROP TRIGGER IF EXISTS items_touch_wishlist ON items;
+CREATE TRIGGER items_touch_wishlist AFTER INSERT OR UPDATE OR DELETE ON items
+    FOR EACH ROW EXECUTE FUNCTION touch_wishlist();
+"""
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    email TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS wishlists (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner_id INTEGER NOT NULL REFERENCES users (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    is_public INTEGER NOT NULL DEFAULT 1,
+    created_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS wishlists_owner_idx ON wishlists (owner_id, id);
+CREATE INDEX IF NOT EXISTS wishlists_public_idx ON wishlists (is_public, id);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    wishlist_id INTEGER NOT NULL REFERENCES wishlists (id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    description TEXT,
+    price TEXT,
+    url TEXT,
+    category TEXT,
+    is_reserved INTEGER NOT NULL DEFAULT 0,
+    reserved_by TEXT,
+    reserved_at TEXT,
+    reservation_message TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS items_wishlist_idx ON items (wishlist_id, id);
+CREATE INDEX IF NOT EXISTS items_category_idx ON items (wishlist_id, category, id);
+CREATE INDEX IF NOT EXISTS items_reserved_idx ON items (wishlist_id, is_reserved, id);
+CREATE INDEX IF NOT EXISTS items_price_idx ON items (wishlist_id, CAST(price AS REAL));
+CREATE TRIGGER IF NOT EXISTS items_insert_touch AFTER INSERT ON items BEGIN
+    UPDATE wishlists SET version = version + 1 WHERE id = NEW.wishlist_id;
+END;
+CREATE TRIGGER IF NOT EXISTS items_update_touch AFTER UPDATE ON items BEGIN
+    UPDATE wishlists SET version = version + 1 WHERE id = NEW.wishlist_id;
+END;
+CREATE TRIGGER IF NOT EXISTS items_delete_touch AFTER DELETE ON items BEGIN
+    UPDATE wishlists SET version = version + 1 WHERE id = OLD.wishlist_id;
+END;
+"""
+
+
+def _placeholders(count: int) -> str:
+    """``$1, $2, ..., $count`` — для VALUES и ``IN (...)``"""
+    return ", ".join(f"${n}" for n in range(1, count + 1))
+
+
+def _insert_sql(table: str, columns: Sequence[str], *extra: str) -> str:
+    names = (*extra, *columns)
+    return (
+        f"INSERT INTO {table} ({', '.join(names)})"
+        f" VALUES ({_placeholders(len(names))}) RETURNING *"
+    )
+
+
+class SqlRepository(Repository):
+    """
+    Общая SQL-реализация репозитория.
+
+    Запросы записаны с плейсхолдерами ``$n`` (диалект PostgreSQL) и
+    являются константами, поэтому драйвер переиспользует подготовленные
+    выражения из своего кэша. Наследники реализуют только доступ к пулу.
+    """
+
+    INSERT_USER = _insert_sql("users", USER_COLUMNS)
+    INSERT_WISHLIST = _insert_sql("wishlists", WISHLIST_COLUMNS)
+    INSERT_ITEM = _insert_sql("items", ITEM_COLUMNS, "wishlist_id")
+    SELECT_USER = "SELECT * FROM users WHERE id = $1"
+    SELECT_USER_BY_USERNAME = "SELECT * FROM users WHERE username = $1"
+    SELECT_USER_BY_EMAIL = "SELECT * FROM users WHERE email = $1"
+    DELETE_USER = "DELETE FROM users WHERE id = $1 RETURNING *"
+    SELECT_WISHLIST = "SELECT * FROM wishlists WHERE id = $1"
+    # Сводки считаются на страницу: каждое поле — подзапрос по индексам items
+    SELECT_SUMMARIES = (
+        "SELECT w.id, w.owner_id, w.name, w.description, w.is_public,"
+        " (SELECT COUNT(*) FROM items i WHERE i.wishlist_id = w.id) AS item_count,"
+        " (SELECT COUNT(*) FROM items i"
+        "  WHERE i.wishlist_id = w.id AND i.is_reserved) AS reserved_count,"
+        " (SELECT COALESCE({price_sum}, 0) FROM items i"
+        "  WHERE i.wishlist_id = w.id) AS total_price,"
+        " (SELECT price FROM items i WHERE i.wishlist_id = w.id"
+        "  AND price IS NOT NULL ORDER BY {price} LIMIT 1) AS min_price,"
+        " (SELECT price FROM items i WHERE i.wishlist_id = w.id"
+        "  AND price IS NOT NULL ORDER BY {price} DESC LIMIT 1) AS max_price,"
+        " COALESCE((SELECT MAX(i.updated_at) FROM items i"
+        "  WHERE i.wishlist_id = w.id), w.created_at) AS updated_at"
+        " FROM wishlists w WHERE {where} ORDER BY w.id"
+    )
+    DELETE_WISHLIST = "DELETE FROM wishlists WHERE id = $1 RETURNING *"
+    SELECT_ITEM = "SELECT * FROM items WHERE id = $1"
+    SELECT_WISHLIST_ITEM = "SELECT * FROM items WHERE id = $1 AND wishlist_id = $2"
+    # Keyset по (wishlist_id, item_id); item_id = 0 у вишлиста без элементов
+    SELECT_EXPORT = (
+        "SELECT w.owner_id, w.id AS wishlist_id, w.name AS wishlist_name,"
+        " w.is_public, COALESCE(i.id, 0) AS item_id, i.name, i.description,"
+        " i.price, i.url, i.category, i.is_reserved, i.reserved_by,"
+        " i.created_at, i.updated_at"
+        " FROM wishlists w LEFT JOIN items i ON i.wishlist_id = w.id"
+        " WHERE (w.id > $1 OR (w.id = $1 AND COALESCE(i.id, 0) > $2)){owner}"
+        " ORDER BY w.id, item_id LIMIT $3"
+    )
+    SELECT_EXPORT_ALL = SELECT_EXPORT.format(owner="")
+    SELECT_EXPORT_OWNER = SELECT_EXPORT.format(owner=" AND w.owner_id = $4")
+    SELECT_EXPORT_PUBLIC = SELECT_EXPORT.format(owner=" AND w.is_public = $4")
+    SELECT_RESERVED = (
+        "SELECT id, wishlist_id, reserved_at FROM items"
+        " WHERE is_reserved AND id > $1 ORDER BY id LIMIT $2"
+    )
+    SELECT_COUNTS = (
+        "SELECT (SELECT COUNT(*) FROM users) AS users,"
+        " (SELECT COUNT(*) FROM wishlists) AS wishlists,"
+        " (SELECT COUNT(*) FROM items) AS items"
+    )
+    # Выражение цены в фильтрах (должно совпадать с индексом items_price_idx)
+    PRICE_EXPR = "price"
+    # Точная сумма цен вишлиста
+    PRICE_SUM = "SUM(price)"
+    # Слово запроса встречается в колонке целым словом, без учёта регистра
+    TERM_MATCH = "{column} ~* ('\\m' || ${n} || '\\M')"
+    SEARCH_FROM = "FROM items i JOIN wishlists w ON w.id = i.wishlist_id"
+
+    @abstractmethod
+    async def _fetchrow(self, sql: str, *args: Any) -> Optional[dict]:
+        """Первая строка результата как dict или ``None``"""
+
+    @abstractmethod
+    async def _fetch(self, sql: str, *args: Any) -> List[dict]:
+        """Все строки результата как dict"""
+
+    async def create_user(self, record: dict) -> dict:
+        return await self._fetchrow(
+            self.INSERT_USER, *(record.get(c) for c in USER_COLUMNS)
+        )
+
+    async def get_user(self, user_id: int) -> Optional[dict]:
+        return await self._fetchrow(self.SELECT_USER, user_id)
+
+    async def get_user_by_username(self, username: str) -> Optional[dict]:
+        return await self._fetchrow(self.SELECT_USER_BY_USERNAME, username)
+
+    async def get_user_by_email(self, email: str) -> Optional[dict]:
+        return await self._fetchrow(self.SELECT_USER_BY_EMAIL, email)
+
+    async def delete_user(self, user_id: int) -> Optional[dict]:
+        return await self._fetchrow(self.DELETE_USER, user_id)
+
+    async def create_wishlist(self, record: dict) -> dict:
+        return await self._fetchrow(
+            self.INSERT_WISHLIST, *(record.get(c) for c in WISHLIST_COLUMNS)
+        )
+
+    async def get_wishlist(self, wishlist_id: int) -> Optional[dict]:
+        return await self._fetchrow(self.SELECT_WISHLIST, wishlist_id)
+
+    def _summaries_sql(self, where: str) -> str:
+        return self.SELECT_SUMMARIES.format(
+            price_sum=self.PRICE_SUM, price=self.PRICE_EXPR, where=where
+        )
+
+    async def get_wishlist_summaries(self, wishlist_ids: List[int]) -> Dict[int, dict]:
+        if not wishlist_ids:
+            return {}
+        sql = self._summaries_sql(f"w.id IN ({_placeholders(len(wishlist_ids))})")
+        return {row["id"]: row for row in await self._fetch(sql, *wishlist_ids)}
+
+    async def list_user_wishlists(
+        self, owner_id: int, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        sql, args = self._paged(
+            self._summaries_sql("w.owner_id = $1 AND w.id > $2"),
+            [owner_id, after or 0],
+            limit,
+        )
+        return await self._fetch(sql, *args)
+
+    async def list_public_wishlists(
+        self, after: Optional[int] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        sql, args = self._paged(
+            self._summaries_sql("w.is_public = $1 AND w.id > $2"),
+            [True, after or 0],
+            limit,
+        )
+        return await self._fetch(sql, *args)
+
+    async def delete_wishlist(self, wishlist_id: int) -> Optional[dict]:
+        return await self._fetchrow(self.DELETE_WISHLIST, wishlist_id)
+
+    async def add_item(self, wishlist_id: int, record: dict) -> dict:
+        return await self._fetchrow(
+            self.INSERT_ITEM, wishlist_id, *(record.get(c) for c in ITEM_COLUMNS)
+        )
+
+    async def get_item(self, item_id: int) -> Optional[dict]:
+        return await self._fetchrow(self.SELECT_ITEM, item_id)
+
+    async def get_items(self, item_ids: List[int]) -> Dict[int, dict]:
+        if not item_ids:
+            return {}
+        sql = f"SELECT * FROM items WHERE id IN ({_placeholders(len(item_ids))})"
+        return {row["id"]: row for row in await self._fetch(sql, *item_ids)}
+
+    async def get_wishlist_item(self, wishlist_id: int, item_id: int) -> Optional[dict]:
+        return await self._fetchrow(self.SELECT_WISHLIST_ITEM, item_id, wishlist_id)
+
+    async def list_items(
+        self,
+        wishlist_id: int,
+        after: Optional[int] = None,
+        limit: Optional[int] = None,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        is_reserved: Optional[bool] = None,
+    ) -> List[dict]:
+        conditions = ["wishlist_id = $1", "id > $2"]
+        args: List[Any] = [wishlist_id, after or 0]
+        for condition, value in (
+            ("category = ${}", category),
+            (f"{self.PRICE_EXPR} >= ${{}}", min_price),
+            (f"{self.PRICE_EXPR} <= ${{}}", max_price),
+            ("is_reserved = ${}", is_reserved),
+        ):
+            if value is not None:
+                args.append(value)
+                conditions.append(condition.format(len(args)))
+        sql = f"SELECT * FROM items WHERE {' AND '.join(conditions)} ORDER BY id"
+        sql, args = self._paged(sql, args, limit)
+        return await self._fetch(sql, *args)
+
+    async def export_rows(
+        self,
+        owner_id: Optional[int] = None,
+        batch_size: int = 500,
+        public_only: bool = False,
+    ) -> AsyncIterator[List[dict]]:
+        if owner_id is not None:
+            sql, extra = self.SELECT_EXPORT_OWNER, (owner_id,)
+        elif public_only:
+            sql, extra = self.SELECT_EXPORT_PUBLIC, (True,)
+        else:
+            sql, extra = self.SELECT_EXPORT_ALL, ()
+        after_wishlist, after_item = 0, 0
+        while True:
+            rows = await self._fetch(
+                sql, after_wishlist, after_item, batch_size, *extra
+            )
+            if not rows:
+                return
+            after_wishlist, after_item = rows[-1]["wishlist_id"], rows[-1]["item_id"]
+            for row in rows:
+                if not row["item_id"]:
+                    row["item_id"] = None
+            yield [{column: row[column] for column in EXPORT_COLUMNS} for row in rows]
+
+    async def reserved_items(self, batch_size: int = 500) -> AsyncIterator[List[dict]]:
+        after = 0
+        while True:
+            rows = await self._fetch(self.SELECT_RESERVED, after, batch_size)
+            if not rows:
+                return
+            after = rows[-1]["id"]
+            yield rows
+
+    async def counts(self) -> Dict[str, int]:
+        return dict(await self._fetchrow(self.SELECT_COUNTS))
+
+    def _search_where(
+        self, terms: List[str], filters: Sequence[Tuple[str, Any]]
+    ) -> Tuple[str, str, List[Any]]:
+        """(условие WHERE, выражение ранга, параметры) по словам и фильтрам"""
+        args: List[Any] = [True]
+        conditions = ["w.is_public = $1"]
+        scores = []
+        for term in terms:
+            args.append(term)
+            name = self.TERM_MATCH.format(column="i.name", n=len(args))
+            description = self.TERM_MATCH.format(column="i.description", n=len(args))
+            conditions.append(f"({name} OR {description})")
+            scores.append(
+                f"CASE WHEN {name} THEN {search.NAME_WEIGHT} ELSE 0 END"
+                f" + CASE WHEN {description} THEN {search.DESCRIPTION_WEIGHT} ELSE 0 END"
+            )
+        for condition, value in filters:
+            if value is not None:
+                args.append(value)
+                conditions.append(condition.format(len(args)))
+        return " AND ".join(conditions), " + ".join(scores), args
+
+    async def search(
+        self,
+        query: str,
+        category: Optional[str] = None,
+        min_price: Optional[Decimal] = None,
+        max_price: Optional[Decimal] = None,
+        limit: int = search.SEARCH_PAGE_SIZE,
+        offset: int = 0,
+    ) -> dict:
+        # Полный просмотр публичных элементов: запасной путь без индекса
+        terms = search.query_terms(query)
+        if not terms:
+            return search.search_result(0, [], {}, {})
+        by_category = ("i.category = ${}", category)
+        by_price = [
+            (f"{self.PRICE_EXPR} >= ${{}}", min_price),
+            (f"{self.PRICE_EXPR} <= ${{}}", max_price),
+        ]
+
+        where, score, args = self._search_where(terms, [by_category, *by_price])
+        items = await self._fetch(
+            f"SELECT i.*, {score} AS score {self.SEARCH_FROM} WHERE {where}"
+            f" ORDER BY score DESC, i.id LIMIT ${len(args) + 1} OFFSET ${len(args) + 2}",
+            *args,
+            limit,
+            offset,
+        )
+        total = await self._fetchrow(
+            f"SELECT COUNT(*) AS total {self.SEARCH_FROM} WHERE {where}", *args
+        )
+
+        where, _, args = self._search_where(terms, by_price)
+        categories = await self._fetch(
+            f"SELECT i.category, COUNT(*) AS count {self.SEARCH_FROM}"
+            f" WHERE {where} AND i.category IS NOT NULL GROUP BY i.category",
+            *args,
+        )
+
+        where, _, args = self._search_where(terms, [by_category])
+        buckets = " ".join(
+            f"WHEN {self.PRICE_EXPR} < {bound} THEN {bucket}"
+            for bucket, bound in enumerate(search.PRICE_FACETS)
+        )
+        prices = await self._fetch(
+            f"SELECT CASE {buckets} ELSE {len(search.PRICE_FACETS)} END AS bucket,"
+            f" COUNT(*) AS count {self.SEARCH_FROM}"
+            f" WHERE {where} AND i.price IS NOT NULL GROUP BY bucket",
+            *args,
+        )
+        return search.search_result(
+            total["total"],
+            items,
+            {row["category"]: row["count"] for row in categories},
+            {row["bucket"]: row["count"] for row in prices},
+        )
+
+    @staticmethod
+    def _paged(
+        sql: str, args: List[Any], limit: Optional[int]
+    ) -> Tuple[str, List[Any]]:
+        if limit is None:
+            return sql, args
+        return f"{sql} LIMIT ${len(args) + 1}", [*args, limit]
+
+    async def update_item(
+        self, wishlist_id: int, item_id: int, changes: dict
+    ) -> Optional[dict]:
+        return await self.compare_and_set_item(wishlist_id, item_id, {}, changes)
+
+    async def compare_and_set_item(
+        self, wishlist_id: int, item_id: int, expected: dict, changes: dict
+    ) -> Optional[dict]:
+        # Условие проверяется в WHERE того же UPDATE — атомарно на стороне БД
+        columns = [c for c in ITEM_COLUMNS if c in changes]
+        if not columns:
+            return await self.get_wishlist_item(wishlist_id, item_id)
+        assignments = ", ".join(f"{c} = ${i}" for i, c in enumerate(columns, start=3))
+        where, conditions = self._item_conditions(expected, 3 + len(columns))
+        sql = (
+            f"UPDATE items SET {assignments}, version = version + 1"
+            f" WHERE id = $1 AND wishlist_id = $2{where} RETURNING *"
+        )
+        return await self._fetchrow(
+            sql, item_id, wishlist_id, *(changes[c] for c in columns), *conditions
+        )
+
+    async def delete_item(
+        self, wishlist_id: int, item_id: int, expected: Optional[dict] = None
+    ) -> Optional[dict]:
+        where, conditions = self._item_conditions(expected or {}, 3)
+        sql = f"DELETE FROM items WHERE id = $1 AND wishlist_id = $2{where} RETURNING *"
+        return await self._fetchrow(sql, item_id, wishlist_id, *conditions)
+
+    @staticmethod
+    def _item_conditions(expected: dict, start: int) -> Tuple[str, List[Any]]:
+        columns = [c for c in (*ITEM_COLUMNS, "version") if c in expected]
+        where = "".join(f" AND {c} = ${i}" for i, c in enumerate(columns, start=start))
+        return where, [expected[c] for c in columns]
+
+
+class PostgresRepository(SqlRepository):
+    """PostgreSQL через пул asyncpg (кэш подготовленных выражений на соединение)"""
+
+    # Пачка элементов вставляется одним выражением: по массиву на колонку
+    INSERT_ITEMS = (
+        f"INSERT INTO items (wishlist_id, {', '.join(ITEM_COLUMNS)})"
+        " SELECT $1, * FROM unnest("
+        + ", ".join(
+            f"${i}::{POSTGRES_ITEM_TYPES[c]}[]"
+            for i, c in enumerate(ITEM_COLUMNS, start=2)
+        )
+        + ") RETURNING *"
+    )
+
+    def __init__(self, pool: Any, acquire_timeout: float) -> None:
+        self._pool = pool
+        self._acquire_timeout = acquire_timeout
+
+    @classmethod
+    async def connect(cls, settings: Settings) -> "PostgresRepository":
+        import asyncpg
+
+        pool = await asyncpg.create_pool(
+            host=settings.db_host,
+            port=settings.db_port,
+            user=settings.db_user,
+            password=settings.db_password,
+            database=settings.db_name,
+            min_size=settings.db_pool_min_size,
+            max_size=settings.db_pool_max_size,
+            timeout=settings.db_pool_timeout,
+            command_timeout=settings.db_command_timeout,
+            statement_cache_size=settings.db_statement_cache_size,
+        )
+        async with pool.acquire(timeout=settings.db_pool_timeout) as conn:
+            await conn.execute(POSTGRES_SCHEMA)
+        return cls(pool, settings.db_pool_timeout)
+
+    async def _fetchrow(self, sql: str, *args: Any) -> Optional[dict]:
+        async with self._pool.acquire(timeout=self._acquire_timeout) as conn:
+            row = await conn.fetchrow(sql, *args)
+        return dict(row) if row is not None else None
+
+    async def _fetch(self, sql: str, *args: Any) -> List[dict]:
+        async with self._pool.acquire(timeout=self._acquire_timeout) as conn:
+            rows = await conn.fetch(sql, *args)
+        return [dict(row) for row in rows]
+
+    async def add_items(self, wishlist_id: int, records: List[dict]) -> List[dict]:
+        if not records:
+            return []
+        rows = await self._fetch(
+            self.INSERT_ITEMS,
+            wishlist_id,
+            *([record.get(c) for record in records] for c in ITEM_COLUMNS),
+        )
+        return sorted(rows, key=lambda row: row["id"])
+
+    async def close(self) -> None:
+        await self._pool.close()
+
+
+_PLACEHOLDER = re.compile(r"\$(\d+)")
+_DECIMAL_COLUMNS = {"price", "total_price", "min_price", "max_price"}
+_DATETIME_COLUMNS = {"created_at", "updated_at", "reserved_at"}
+_BOOL_COLUMNS = {"is_public", "is_reserved"}
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _search_match(text: Optional[str], term: str) -> int:
+    return int(term in search.tokenize(text))
+
+
+class _DecimalSum:
+    """Агрегат SQLite: точная сумма цен, хранящихся текстом"""
+
+    def __init__(self) -> None:
+        self.total = Decimal(0)
+
+    def step(self, value: Optional[str]) -> None:
+        if value is not None:
+            self.total += Decimal(value)
+
+    def finalize(self) -> str:
+        return str(self.total)
+
+
+def _decode(row: sqlite3.Row) -> dict:
+    record = dict(row)
+    for key, value in record.items():
+        if value is None:
+            continue
+        if key in _DECIMAL_COLUMNS:
+            record[key] = Decimal(value)
+        elif key in _DATETIME_COLUMNS:
+            record[key] = datetime.fromisoformat(value)
+        elif key in _BOOL_COLUMNS:
+            record[key] = bool(value)
+    return record
+
+
+class SQLiteRepository(SqlRepository):
+    """
+    SQLite через пул соединений stdlib ``sqlite3``.
+
+    Вызовы драйвера выполняются в потоках (``asyncio.to_thread``), чтобы не
+    блокировать event loop; ``cached_statements`` (``db_statement_cache_size``,
+    как и у PostgreSQL) держит подготовленные выражения. Используется как
+    локальная замена PostgreSQL.
+
+    База в режиме WAL: несколько воркеров uvicorn работают с одним файлом,
+    чтения не ждут записи, а записи сериализуются блокировкой SQLite
+    (ожидание — ``busy timeout``). Id выдаёт AUTOINCREMENT под той же
+    блокировкой, поэтому они уникальны во всех процессах.
+    """
+
+    # Цена хранится текстом (точный Decimal), сравнивается как число
+    PRICE_EXPR = "CAST(price AS REAL)"
+    # Слова — тем же токенизатором, что и у in-memory индекса
+    TERM_MATCH = "search_match({column}, ${n})"
+    PRICE_SUM = "decimal_sum(price)"
+
+    def __init__(
+        self,
+        path: str,
+        pool_size: int,
+        acquire_timeout: float,
+        statement_cache_size: int = 256,
+    ) -> None:
+        self._path = path
+        self._acquire_timeout = acquire_timeout
+        self._statement_cache_size = statement_cache_size
+        self._sql: Dict[str, str] = {}
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(self._open())
+        conn = self._pool.get()
+        try:
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.executescript(SQLITE_SCHEMA)
+        finally:
+            self._pool.put(conn)
+
+    @classmethod
+    async def connect(cls, settings: Settings) -> "SQLiteRepository":
+        return await asyncio.to_thread(
+            cls,
+            settings.db_path,
+            settings.db_pool_max_size,
+            settings.db_pool_timeout,
+            settings.db_statement_cache_size,
+        )
+
+    def _open(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self._path,
+            timeout=self._acquire_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=self._statement_cache_size,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA foreign_keys = ON")
+        conn.create_function("search_match", 2, _search_match, deterministic=True)
+        conn.create_aggregate("decimal_sum", 1, _DecimalSum)
+        return conn
+
+    def _translate(self, sql: str) -> str:
+        translated = self._sql.get(sql)
+        if translated is None:
+            translated = self._sql[sql] = _PLACEHOLDER.sub(r"?\1", sql)
+        return translated
+
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get(timeout=self._acquire_timeout)
+        except queue.Empty:
+            raise TimeoutError("SQLite pool acquire timed out")
+
+    def _run(self, sql: str, args: Sequence[Any], many: bool) -> Any:
+        conn = self._acquire()
+        try:
+            rows = conn.execute(
+                self._translate(sql), [_encode(a) for a in args]
+            ).fetchall()
+            if many:
+                return [_decode(row) for row in rows]
+            return _decode(rows[0]) if rows else None
+        finally:
+            self._pool.put(conn)
+
+    async def _fetchrow(self, sql: str, *args: Any) -> Optional[dict]:
+        return await asyncio.to_thread(self._run, sql, args, False)
+
+    async def _fetch(self, sql: str, *args: Any) -> List[dict]:
+        return await asyncio.to_thread(self._run, sql, args, True)
+
+    def _insert_items(self, wishlist_id: int, records: List[dict]) -> List[dict]:
+        # Одна транзакция на соединении пула: либо вся пачка, либо ничего
+        sql = self._translate(self.INSERT_ITEM)
+        conn = self._acquire()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = [
+                    _decode(
+                        conn.execute(
+                            sql,
+                            [wishlist_id, *(_encode(r.get(c)) for c in ITEM_COLUMNS)],
+                        ).fetchone()
+                    )
+                    for r in records
+                ]
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+            return rows
+        finally:
+            self._pool.put(conn)
+
+    async def add_items(self, wishlist_id: int, records: List[dict]) -> List[dict]:
+        if not records:
+            return []
+        return await asyncio.to_thread(self._insert_items, wishlist_id, records)
+
+    async def close(self) -> None:
+        while not self._pool.empty():
+            self._pool.get_nowait().close()
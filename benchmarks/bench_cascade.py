@@ -0,0 +1,107 @@
+"""
+Каскадное удаление «тяжёлого» пользователя из in-memory стора.
+
+Пользователь владеет ``--items`` элементами в ``--wishlists`` публичных
+вишлистах (все в поисковом индексе), рядом — фоновые пользователи. Замеряется
+время самого ``delete_user`` (то, что ждёт запрос), самая длинная пауза
+event loop при фоновой дочистке шагами ``reclaim`` и её полное время.
+Печатает JSON.
+
+    python benchmarks/bench_cascade.py --items 100000 --wishlists 100
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from app.database import InMemoryStore  # noqa: E402
+from app.models import now_utc  # noqa: E402
+
+WORDS = ("книга", "набор", "кружка", "плед", "лампа", "игра", "чай", "шарф")
+
+
+def add_user(store, name, wishlists, items):
+    now = now_utc()
+    user = store.add_user({"username": name, "email": f"{name}@example.com"})
+    per_wishlist = max(items // wishlists, 1)
+    for w in range(wishlists):
+        wishlist = store.add_wishlist(
+            {"owner_id": user["id"], "name": f"WL {w}", "created_at": now}
+        )
+        store.add_items(
+            wishlist["id"],
+            [
+                {
+                    "name": f"{WORDS[n % len(WORDS)]} {n}",
+                    "price": f"{n % 500}.99",
+                    "category": WORDS[n % 3],
+                    "is_reserved": False,
+                    "created_at": now,
+                }
+                for n in range(per_wishlist)
+            ],
+        )
+    return user
+
+
+def build(args):
+    store = InMemoryStore()
+    for n in range(args.others):
+        add_user(store, f"other{n}", 10, 1000)
+    user = add_user(store, "power", args.wishlists, args.items)
+    return store, user
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("--wishlists", type=int, default=100)
+    parser.add_argument("--others", type=int, default=100)
+    parser.add_argument("-o", "--output", help="записать JSON в файл")
+    args = parser.parse_args()
+
+    store, user = build(args)
+    started = time.perf_counter()
+    store.delete_user(user["id"])
+    request_ms = (time.perf_counter() - started) * 1000
+    pending = store.reclaim_pending
+
+    pauses = []
+    started = time.perf_counter()
+    while True:
+        step = time.perf_counter()
+        if not store.reclaim():
+            break
+        pauses.append(time.perf_counter() - step)
+    reclaim_ms = (time.perf_counter() - started) * 1000
+
+    result = {
+        "benchmark": "cascade",
+        "python": platform.python_version(),
+        "items": args.items,
+        "wishlists": args.wishlists,
+        "store_items": store.counts()["items"],
+        "delete_user_ms": round(request_ms, 3),
+        "deferred_items": pending,
+        "reclaim_steps": len(pauses),
+        "max_pause_ms": round(max(pauses, default=0) * 1000, 3),
+        "reclaim_total_ms": round(reclaim_ms, 3),
+    }
+    text = json.dumps(result, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
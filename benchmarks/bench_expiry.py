@@ -0,0 +1,153 @@
+"""
+Бенчмарк планировщика истечения резервов на больших сторах.
+
+Стор наполняется ``--items`` элементами, ``--reserved`` из них
+резервируются со сроками, разнесёнными по часу. Замеряются постановка
+срока (``schedule``), загрузка сроков при старте, ожидание без наступивших
+сроков и снятие истёкших резервов пачками. Печатает JSON.
+
+    python benchmarks/bench_expiry.py --items 1000000 --reserved 200000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from app.database import InMemoryStore  # noqa: E402
+from app.models import now_utc  # noqa: E402
+from app.repository import InMemoryRepository  # noqa: E402
+from app.reservations import ReservationExpiry  # noqa: E402
+
+ITEMS_PER_WISHLIST = 1000
+TTL = 3600.0
+
+
+def seed(store, items):
+    now = now_utc()
+    ids = []
+    for start in range(0, items, ITEMS_PER_WISHLIST):
+        wishlist = store.add_wishlist({"owner_id": 1, "name": "WL", "created_at": now})
+        records = [
+            {"name": f"Item {n}", "is_reserved": False, "created_at": now}
+            for n in range(start, min(start + ITEMS_PER_WISHLIST, items))
+        ]
+        ids.extend(
+            (wishlist["id"], item["id"])
+            for item in store.add_items(wishlist["id"], records)
+        )
+    return ids
+
+
+def reserve(store, targets, rng):
+    """Резервы со ``reserved_at`` в прошлом — сроки равномерно по ``TTL``"""
+    now = now_utc()
+    reserved = []
+    for wishlist_id, item_id in targets:
+        reserved_at = now - timedelta(seconds=rng.uniform(0, TTL))
+        reserved.append(
+            store.compare_and_set_item(
+                wishlist_id,
+                item_id,
+                {"is_reserved": False},
+                {"is_reserved": True, "reserved_by": "b", "reserved_at": reserved_at},
+            )
+        )
+    return reserved
+
+
+async def measure(store, reserved, expire_count):
+    repo = InMemoryRepository(store)
+    result = {}
+
+    # Загрузка уже поставленных резервов при старте (без обхода всех элементов)
+    expiry = ReservationExpiry()
+    started = time.perf_counter()
+    await expiry.start(repo, TTL)
+    result["startup_load_s"] = round(time.perf_counter() - started, 3)
+    await expiry.stop()
+
+    # Постановка по одному, как из reserve_item
+    expiry = ReservationExpiry()
+    await expiry.start(repo, TTL * 1000)
+    expiry._heap.clear()
+    started = time.perf_counter()
+    for item in reserved:
+        expiry.schedule(item)
+    elapsed = time.perf_counter() - started
+    result["schedule_us"] = round(elapsed / len(reserved) * 1e6, 3)
+    result["deadlines"] = len(expiry)
+    # Пока сроки не наступили, планировщик спит
+    cpu = time.process_time()
+    await asyncio.sleep(0.5)
+    result["idle_cpu_ms_per_s"] = round((time.process_time() - cpu) * 2000, 3)
+    await expiry.stop()
+
+    # Снятие пачками: «сейчас» — момент, когда истекли первые expire_count сроков
+    expiry = ReservationExpiry()
+    await expiry.start(repo, TTL * 1000)
+    expiry._task.cancel()
+    expiry.ttl = TTL
+    expiry._heap.clear()
+    for item in reserved:
+        expiry.schedule(item)
+    now = sorted(deadline for deadline, *_ in expiry._heap)[expire_count - 1]
+    started = time.perf_counter()
+    while expiry.expired < expire_count:
+        batch = expiry._due(now)
+        if not batch:
+            break
+        await expiry.expire(batch)
+    elapsed = time.perf_counter() - started
+    result["expired"] = expiry.expired
+    result["expire_items_per_s"] = round(expiry.expired / elapsed)
+    await expiry.stop()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("--reserved", type=int, default=200000)
+    parser.add_argument("--expire", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="записать JSON в файл")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    store = InMemoryStore()
+    started = time.perf_counter()
+    ids = seed(store, args.items)
+    reserved = reserve(store, rng.sample(ids, args.reserved), rng)
+    seed_seconds = round(time.perf_counter() - started, 2)
+
+    result = {
+        "benchmark": "expiry",
+        "python": platform.python_version(),
+        "items": args.items,
+        "reserved": args.reserved,
+        "seed_s": seed_seconds,
+        **asyncio.run(measure(store, reserved, min(args.expire, args.reserved))),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+    }
+    text = json.dumps(result, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+Микробенчмарки горячих обработчиков при разных размерах стора.
+
+Для каждого размера (число элементов; по 100 элементов в вишлисте и по 10
+вишлистов у пользователя) стор наполняется напрямую, а запросы идут через
+ASGI-приложение целиком (middleware, валидация, сериализация) без сети.
+Печатает JSON с ops/s и p50/p95/p99 по каждому обработчику — его можно
+сохранить и сравнить с другим коммитом через ``benchmarks/compare.py``.
+
+    python benchmarks/bench_handlers.py --sizes 1000 10000 100000 1000000
+    python benchmarks/bench_handlers.py -n 500 --argon-requests 10 -o before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.database import InMemoryStore  # noqa: E402
+from app.hashing import hash_password  # noqa: E402
+from app.hashing_service import hashing_service  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import now_utc  # noqa: E402
+from app.rate_limit import rate_limiter  # noqa: E402
+from app.repository import InMemoryRepository, get_repository  # noqa: E402
+
+ITEMS_PER_WISHLIST = 100
+WISHLISTS_PER_USER = 10
+# Элементов в одном пакетном чтении (страница дашборда)
+BATCH_IDS = 50
+PASSWORD = "benchmark-password"
+
+# Лог на каждый запрос и лимит /auth/* исказили бы замер
+logging.getLogger("httpx").setLevel(logging.WARNING)
+rate_limiter.ip_limit = 10**9
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(timings):
+    return {
+        "requests": len(timings),
+        "ops_per_s": round(len(timings) / sum(timings)),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def seed(store, size, password_hash):
+    """Наполняет стор; возвращает (id пользователей, id элементов)"""
+    now = now_utc()
+    wishlists = max(size // ITEMS_PER_WISHLIST, 1)
+    user_ids, item_ids = [], []
+    for w in range(wishlists):
+        if w % WISHLISTS_PER_USER == 0:
+            n = len(user_ids)
+            user = store.add_user(
+                {
+                    "username": f"user{n}",
+                    "email": f"user{n}@example.com",
+                    "password": password_hash,
+                    "created_at": now,
+                    "wishlists": [],
+                }
+            )
+            user_ids.append(user["id"])
+        wishlist = store.add_wishlist(
+            {
+                "owner_id": user_ids[-1],
+                "name": f"WL {w}",
+                "description": None,
+                "is_public": True,
+                "created_at": now,
+            }
+        )
+        count = min(ITEMS_PER_WISHLIST, size - w * ITEMS_PER_WISHLIST)
+        items = store.add_items(
+            wishlist["id"],
+            [
+                {
+                    "name": f"Item {n}",
+                    "description": "Описание элемента",
+                    "price": Decimal(n % 10000) + Decimal("0.99"),
+                    "url": None,
+                    "category": "Книги",
+                    "is_reserved": False,
+                    "reserved_by": None,
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for n in range(max(count, 0))
+            ],
+        )
+        item_ids.extend((wishlist["id"], item["id"]) for item in items)
+    return user_ids, item_ids
+
+
+async def timed(make, count):
+    """``make()`` → (ещё не запущенная корутина запроса, ожидаемый статус)"""
+    timings = []
+    for _ in range(count):
+        request, expected = make()
+        started = time.perf_counter()
+        response = await request
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == expected, response.text
+    return timings
+
+
+async def run_size(size, n, argon_n, password_hash, seed_rng):
+    store = InMemoryStore()
+    started = time.perf_counter()
+    user_ids, item_ids = seed(store, size, password_hash)
+    seed_seconds = round(time.perf_counter() - started, 2)
+    app.dependency_overrides[get_repository] = lambda: InMemoryRepository(store)
+    rng = random.Random(seed_rng)
+    results = {}
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+
+            def get_item():
+                _, item_id = rng.choice(item_ids)
+                return client.get(f"/wishlist/{item_id}"), 200
+
+            def items_batch():
+                ids = [
+                    item_id
+                    for _, item_id in rng.sample(
+                        item_ids, min(BATCH_IDS, len(item_ids))
+                    )
+                ]
+                return client.get("/items", params={"ids": ids}), 200
+
+            def user_wishlists():
+                return client.get(f"/users/{rng.choice(user_ids)}/wishlists"), 200
+
+            wishlist_ids = sorted({wishlist_id for wishlist_id, _ in item_ids})
+
+            def public_feed():
+                after = rng.choice(wishlist_ids) - 1
+                url = "/wishlists/public"
+                return client.get(url, params={"after": after, "limit": 20}), 200
+
+            async def warm_and_measure(name, make, count):
+                await timed(make, min(count, 5))
+                results[name] = summarize(await timed(make, count))
+
+            await warm_and_measure("get_wishlist_item", get_item, n)
+            await warm_and_measure("get_items_batch", items_batch, n)
+            await warm_and_measure("get_user_wishlists", user_wishlists, n)
+            await warm_and_measure("get_public_wishlists", public_feed, n)
+
+            # Резервирование — каждый раз свободный элемент
+            free = rng.sample(item_ids, min(n + 5, len(item_ids)))
+
+            def reserve():
+                wishlist_id, item_id = free.pop()
+                url = f"/wishlists/{wishlist_id}/items/{item_id}/reserve"
+                return client.put(url, json={"reserved_by": "bench"}), 200
+
+            await warm_and_measure("reserve_item", reserve, len(free) - 5)
+
+            # Argon2: запросов меньше — каждый стоит сотни миллисекунд
+            created = iter(range(10**9))
+
+            def create_user():
+                n = next(created)
+                body = {
+                    "username": f"new{n}",
+                    "email": f"new{n}@example.com",
+                    "password": PASSWORD,
+                }
+                return client.post("/users", json=body), 200
+
+            def login():
+                data = {
+                    "username": f"user{rng.randrange(len(user_ids))}",
+                    "password": PASSWORD,
+                }
+                return client.post("/auth/login", data=data), 200
+
+            await warm_and_measure("create_user", create_user, argon_n)
+            await warm_and_measure("login", login, argon_n)
+    finally:
+        app.dependency_overrides.clear()
+    return {"items": size, "users": len(user_ids), "seed_s": seed_seconds, **results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("-n", "--requests", type=int, default=1000)
+    parser.add_argument("--argon-requests", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="записать JSON в файл")
+    args = parser.parse_args()
+
+    password_hash = hash_password(PASSWORD)
+    result = {
+        "benchmark": "handlers",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "requests": args.requests,
+        "argon_requests": args.argon_requests,
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes:
+            result["sizes"][str(size)] = asyncio.run(
+                run_size(
+                    size, args.requests, args.argon_requests, password_hash, args.seed
+                )
+            )
+    finally:
+        hashing_service.shutdown()
+    text = json.dumps(result, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
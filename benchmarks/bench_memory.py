@@ -0,0 +1,108 @@
+"""
+Память на элемент вишлиста: dict-записи vs компактные ``StoredItem``.
+
+Через tracemalloc меряет прирост памяти на N элементов для трёх вариантов:
+
+- ``dict_records`` — записи-словари, как их хранил стор раньше
+  (``**item.model_dump()`` + Decimal + datetime с таймзоной);
+- ``slotted_records`` — те же данные в ``StoredItem``;
+- ``store`` — ``InMemoryStore.add_items`` целиком, с индексами.
+
+    python benchmarks/bench_memory.py -n 1000000
+"""
+
+import argparse
+import gc
+import json
+import sys
+import tracemalloc
+from datetime import timedelta
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.database import InMemoryStore, StoredItem  # noqa: E402
+from app.models import now_utc  # noqa: E402
+
+CATEGORIES = ["Книги", "Техника", "Игры", "Одежда", None]
+
+
+def make_record(n, base):
+    # Строки собираются заново, как после разбора JSON каждого запроса;
+    # created_at и updated_at — один объект, как в add_to_wishlist
+    created = base + timedelta(seconds=n)
+    return {
+        "name": f"Item {n}",
+        "description": None,
+        "price": Decimal(f"{n % 10000}.{n % 100:02d}"),
+        "url": None,
+        "category": None if n % 5 == 4 else "".join(CATEGORIES[n % 5]),
+        "is_reserved": False,
+        "reserved_by": None,
+        "created_at": created,
+        "updated_at": created,
+    }
+
+
+def dict_records(n, base):
+    items = {}
+    for item_id in range(1, n + 1):
+        record = make_record(item_id, base)
+        record["id"] = item_id
+        record["wishlist_id"] = 1
+        record["version"] = item_id
+        items[item_id] = record
+    return items
+
+
+def slotted_records(n, base):
+    return {
+        item_id: StoredItem(item_id, 1, item_id, make_record(item_id, base))
+        for item_id in range(1, n + 1)
+    }
+
+
+def store(n, base):
+    result = InMemoryStore()
+    wishlist = result.add_wishlist({"name": "WL", "owner_id": 1})
+    chunk = 10000
+    for start in range(0, n, chunk):
+        # add_items возвращает dict-копии — сразу отпускаем их
+        result.add_items(
+            wishlist["id"],
+            [make_record(i, base) for i in range(start, min(start + chunk, n))],
+        )
+    return result
+
+
+def measure(build, n, base):
+    gc.collect()
+    tracemalloc.start()
+    kept = build(n, base)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return round(current / n, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--items", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    base = now_utc()
+    result = {"items": args.items, "bytes_per_item": {}}
+    for build in (dict_records, slotted_records, store):
+        result["bytes_per_item"][build.__name__] = measure(build, args.items, base)
+    sizes = result["bytes_per_item"]
+    result["saving"] = round(1 - sizes["slotted_records"] / sizes["dict_records"], 3)
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Микробенчмарк middleware корреляционного id.
+
+Сравнивает прежнюю реализацию на ``BaseHTTPMiddleware`` с pure-ASGI
+``CorrelationIdMiddleware``: ASGI-приложение вызывается напрямую, без сети
+и HTTP-клиента, и печатается JSON с запросами в секунду.
+
+    python benchmarks/bench_middleware.py -n 20000
+    python benchmarks/bench_middleware.py --route /stream
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from starlette.applications import Starlette  # noqa: E402
+from starlette.middleware.base import BaseHTTPMiddleware  # noqa: E402
+from starlette.requests import Request  # noqa: E402
+from starlette.responses import PlainTextResponse, StreamingResponse  # noqa: E402
+from starlette.routing import Route  # noqa: E402
+
+from app.middleware import CorrelationIdMiddleware  # noqa: E402
+
+
+class BaseHTTPCorrelationIdMiddleware(BaseHTTPMiddleware):
+    """Реализация до перехода на pure ASGI — для сравнения"""
+
+    async def dispatch(self, request: Request, call_next):
+        correlation_id = str(uuid.uuid4())
+        request.state.correlation_id = correlation_id
+        response = await call_next(request)
+        response.headers["X-Correlation-ID"] = correlation_id
+        return response
+
+
+async def plain(request):
+    return PlainTextResponse("ok")
+
+
+async def stream(request):
+    async def chunks():
+        for _ in range(10):
+            yield b"x" * 1024
+
+    return StreamingResponse(chunks())
+
+
+def build(middleware):
+    inner = Starlette(routes=[Route("/plain", plain), Route("/stream", stream)])
+    return middleware(inner)
+
+
+async def drive(app, path, n):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+
+    disconnect = asyncio.Event()  # как у сервера: после тела — ждём разрыва
+
+    def receiver():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+
+        async def receive():
+            if messages:
+                return messages.pop()
+            await disconnect.wait()
+            return {"type": "http.disconnect"}
+
+        return receive
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for _ in range(n):
+        await app(dict(scope), receiver(), send)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--requests", type=int, default=20000)
+    parser.add_argument("--route", choices=["/plain", "/stream"], default="/plain")
+    args = parser.parse_args()
+
+    results = {}
+    for name, middleware in (
+        ("base_http", BaseHTTPCorrelationIdMiddleware),
+        ("pure_asgi", CorrelationIdMiddleware),
+    ):
+        app = build(middleware)
+        asyncio.run(drive(app, args.route, min(args.requests, 500)))  # прогрев
+        elapsed = asyncio.run(drive(app, args.route, args.requests))
+        results[name] = round(args.requests / elapsed)
+    print(
+        json.dumps(
+            {
+                "route": args.route,
+                "requests": args.requests,
+                "rps": results,
+                "speedup": round(results["pure_asgi"] / results["base_http"], 2),
+            }
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+Время восстановления in-memory стора с диска.
+
+Наполняет стор N элементами при включённом журнале, затем меряет два
+варианта старта: воспроизведение только журнала и загрузку снимка (после
+снимка журнал пуст). Печатает JSON с секундами на миллион записей и
+размерами файлов.
+
+    python benchmarks/bench_recovery.py -n 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from app.database import InMemoryStore  # noqa: E402
+from app.models import now_utc  # noqa: E402
+from app.persistence import SNAPSHOT_FILE, Persistence  # noqa: E402
+
+CATEGORIES = ["Книги", "Техника", "Игры", "Одежда", None]
+
+
+def fill(store, count):
+    now = now_utc()
+    user = store.add_user(
+        {"username": "bench", "email": "bench@example.com", "password": "x"}
+    )
+    wishlist = store.add_wishlist({"owner_id": user["id"], "name": "WL"})
+    chunk = 10000
+    for start in range(0, count, chunk):
+        store.add_items(
+            wishlist["id"],
+            [
+                {
+                    "name": f"Item {n}",
+                    "description": "Описание элемента",
+                    "price": Decimal(n % 10000) + Decimal("0.99"),
+                    "url": f"https://example.com/items/{n}",
+                    "category": CATEGORIES[n % 5],
+                    "created_at": now,
+                    "updated_at": now,
+                }
+                for n in range(start, min(start + chunk, count))
+            ],
+        )
+
+
+def size_of(directory):
+    return sum(path.stat().st_size for path in directory.iterdir())
+
+
+def recover(directory):
+    """Открывает стор из каталога; возвращает (persistence, секунды)"""
+    persistence = Persistence(InMemoryStore(), directory)
+    started = time.perf_counter()
+    persistence.open()
+    return persistence, time.perf_counter() - started
+
+
+def per_million(seconds, records):
+    return round(seconds * 1_000_000 / records, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-n", "--items", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as name:
+        directory = Path(name)
+        persistence = Persistence(InMemoryStore(), directory).open()
+        started = time.perf_counter()
+        fill(persistence.store, args.items)
+        persistence.wal.flush()
+        write_seconds = time.perf_counter() - started
+        asyncio.run(persistence.close(snapshot=False))
+        wal_bytes = size_of(directory)
+
+        persistence, wal_total = recover(directory)
+        wal_stats = persistence.stats
+        assert len(persistence.store.wishlists[1]["items"]) == args.items
+        # Финальный снимок; журнал после него пуст
+        asyncio.run(persistence.close())
+        snapshot_bytes = (directory / SNAPSHOT_FILE).stat().st_size
+
+        persistence, snapshot_total = recover(directory)
+        snapshot_stats = persistence.stats
+        assert len(persistence.store.wishlists[1]["items"]) == args.items
+        assert snapshot_stats.wal_records == 0
+        asyncio.run(persistence.close(snapshot=False))
+
+    print(
+        json.dumps(
+            {
+                "items": args.items,
+                "fill_with_wal_s_per_million": per_million(write_seconds, args.items),
+                "wal_replay_s_per_million": per_million(
+                    wal_total, wal_stats.wal_records
+                ),
+                "snapshot_load_s_per_million": per_million(
+                    snapshot_total, snapshot_stats.snapshot_records
+                ),
+                "wal_bytes": wal_bytes,
+                "snapshot_bytes": snapshot_bytes,
+            }
+        )
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
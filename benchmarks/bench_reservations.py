@@ -0,0 +1,156 @@
+"""
+Конкурентный бенчмарк резервирования (NFR-06).
+
+Запускает N параллельных попыток зарезервировать один элемент и печатает
+JSON с числом успехов, конфликтов и перцентилями задержки.
+
+    python benchmarks/bench_reservations.py --mode threads -n 100
+    python benchmarks/bench_reservations.py --mode asgi --backend sqlite -n 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.database import InMemoryStore  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import now_utc  # noqa: E402
+from app.repository import InMemoryRepository, get_repository  # noqa: E402
+from app.sql_repository import SQLiteRepository  # noqa: E402
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(mode, n, outcomes, latencies, elapsed):
+    return {
+        "mode": mode,
+        "parallel": n,
+        "successes": sum(outcomes),
+        "conflicts": n - sum(outcomes),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "elapsed_s": round(elapsed, 4),
+    }
+
+
+def run_threads(n):
+    """N потоков одновременно вызывают compare_and_set_item на хранилище"""
+    store = InMemoryStore()
+    wishlist = store.add_wishlist({"name": "WL", "owner_id": 1})
+    item = store.add_item(wishlist["id"], {"name": "Item", "is_reserved": False})
+    barrier = threading.Barrier(n)
+
+    def attempt(k):
+        barrier.wait()
+        started = time.perf_counter()
+        result = store.compare_and_set_item(
+            wishlist["id"],
+            item["id"],
+            {"is_reserved": False},
+            {"is_reserved": True, "reserved_by": f"user{k}"},
+        )
+        return result is not None, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=n) as pool:
+        results = list(pool.map(attempt, range(n)))
+    elapsed = time.perf_counter() - started
+    return summarize(
+        "threads", n, [ok for ok, _ in results], [t for _, t in results], elapsed
+    )
+
+
+async def run_asgi(n, backend):
+    """N одновременных PUT .../reserve через ASGI-приложение"""
+    tmpdir = tempfile.TemporaryDirectory()
+    if backend == "sqlite":
+        repository = SQLiteRepository(os.path.join(tmpdir.name, "bench.db"), 8, 10.0)
+    else:
+        repository = InMemoryRepository(InMemoryStore())
+    app.dependency_overrides[get_repository] = lambda: repository
+
+    user = await repository.create_user(
+        {
+            "username": "bench",
+            "email": "bench@example.com",
+            "password": "x",
+            "created_at": now_utc(),
+        }
+    )
+    wishlist = await repository.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    item = await repository.add_item(
+        wishlist["id"],
+        {
+            "name": "Item",
+            "is_reserved": False,
+            "created_at": now_utc(),
+            "updated_at": now_utc(),
+        },
+    )
+    url = f"/wishlists/{wishlist['id']}/items/{item['id']}/reserve"
+
+    async def attempt(client, k):
+        started = time.perf_counter()
+        response = await client.put(url, json={"reserved_by": f"user{k}"})
+        return response.status_code == 200, time.perf_counter() - started
+
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            started = time.perf_counter()
+            results = await asyncio.gather(*(attempt(client, k) for k in range(n)))
+            elapsed = time.perf_counter() - started
+    finally:
+        app.dependency_overrides.clear()
+        await repository.close()
+        tmpdir.cleanup()
+    return summarize(
+        f"asgi-{backend}",
+        n,
+        [ok for ok, _ in results],
+        [t for _, t in results],
+        elapsed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--mode", choices=["threads", "asgi"], default="threads")
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("-n", "--parallel", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.mode == "threads":
+        result = run_threads(args.parallel)
+    else:
+        result = asyncio.run(run_asgi(args.parallel, args.backend))
+    print(json.dumps(result, ensure_ascii=False))
+    return 0 if result["successes"] == 1 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
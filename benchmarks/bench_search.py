@@ -0,0 +1,195 @@
+"""
+Бенчмарк поискового индекса (``/search``) на больших сторах.
+
+Стор наполняется напрямую элементами со словами из синтетического словаря
+с распределением Ципфа (частые слова встречаются в тысячах элементов,
+редкие — в единицах). Замеряются запросы разной селективности, запросы с
+фильтрами и цена инкрементального обновления индекса. Печатает JSON.
+
+    python benchmarks/bench_search.py --items 1000000
+    python benchmarks/bench_search.py --items 100000 -n 200 -o search.json
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import resource
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from app.database import InMemoryStore  # noqa: E402
+from app.models import now_utc  # noqa: E402
+
+VOCABULARY = 20000
+CATEGORIES = ["Книги", "Техника", "Посуда", "Одежда", "Игры", "Спорт", "Дом", "Хобби"]
+ITEMS_PER_WISHLIST = 1000
+SYLLABLES = ["ка", "ро", "ми", "ла", "то", "ну", "се", "ва", "пи", "до", "ре", "зу"]
+
+# Классы запросов: диапазон рангов слов словаря и число слов
+QUERIES = {
+    "rare_term": ((2000, VOCABULARY), 1),
+    "medium_term": ((200, 2000), 1),
+    "common_term": ((20, 200), 1),
+    "two_terms": ((20, 2000), 2),
+}
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(timings, matched=None):
+    result = {
+        "requests": len(timings),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+    }
+    if matched is not None:
+        result["mean_matched"] = round(sum(matched) / len(matched))
+    return result
+
+
+def make_words(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words, key=lambda word: rng.random())
+
+
+def seed(store, items, words, rng):
+    ranks = range(1, len(words) + 1)
+    cumulative = list(itertools.accumulate(1 / rank for rank in ranks))
+    now = now_utc()
+    wishlist, batch = None, []
+    for n in range(items):
+        if n % ITEMS_PER_WISHLIST == 0:
+            if wishlist is not None:
+                store.add_items(wishlist["id"], batch)
+            wishlist = store.add_wishlist(
+                {"owner_id": 1, "name": f"WL {n}", "is_public": True, "created_at": now}
+            )
+            batch = []
+        batch.append(
+            {
+                "name": " ".join(rng.choices(words, cum_weights=cumulative, k=3)),
+                "description": " ".join(
+                    rng.choices(words, cum_weights=cumulative, k=6)
+                ),
+                "price": Decimal(int(10 ** rng.uniform(1.5, 4.7))),
+                "category": rng.choices(CATEGORIES, range(len(CATEGORIES), 0, -1))[0],
+                "is_reserved": False,
+                "created_at": now,
+                "updated_at": now,
+            }
+        )
+    store.add_items(wishlist["id"], batch)
+    return wishlist["id"]
+
+
+def measure_queries(store, words, n, rng):
+    results = {}
+    for name, ((low, high), count) in QUERIES.items():
+        timings, matched = [], []
+        for _ in range(n):
+            query = " ".join(rng.choice(words[low:high]) for _ in range(count))
+            started = time.perf_counter()
+            total, _, _, _ = store.search(query)
+            timings.append(time.perf_counter() - started)
+            matched.append(total)
+        results[name] = summarize(timings, matched)
+
+    timings, matched = [], []
+    for _ in range(n):
+        started = time.perf_counter()
+        total, _, _, _ = store.search(
+            rng.choice(words[20:200]),
+            category=rng.choice(CATEGORIES),
+            min_price=Decimal(500),
+            max_price=Decimal(5000),
+        )
+        timings.append(time.perf_counter() - started)
+        matched.append(total)
+    results["common_term_filtered"] = summarize(timings, matched)
+    return results
+
+
+def measure_updates(store, wishlist_id, words, n, rng):
+    """Инкрементальное обновление индекса: добавление, правка, удаление"""
+    now = now_utc()
+    added, updated, deleted = [], [], []
+    for _ in range(n):
+        record = {
+            "name": " ".join(rng.choices(words, k=3)),
+            "description": " ".join(rng.choices(words, k=6)),
+            "price": Decimal(rng.randint(50, 50000)),
+            "category": rng.choice(CATEGORIES),
+            "is_reserved": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        started = time.perf_counter()
+        item = store.add_item(wishlist_id, record)
+        added.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        store.update_item(
+            wishlist_id, item["id"], {"name": " ".join(rng.choices(words, k=3))}
+        )
+        updated.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        store.delete_item(wishlist_id, item["id"])
+        deleted.append(time.perf_counter() - started)
+    return {
+        "add_item": summarize(added),
+        "update_item": summarize(updated),
+        "delete_item": summarize(deleted),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000000)
+    parser.add_argument("-n", "--requests", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="записать JSON в файл")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    words = make_words(rng)
+    store = InMemoryStore()
+    started = time.perf_counter()
+    wishlist_id = seed(store, args.items, words, rng)
+    seed_seconds = round(time.perf_counter() - started, 2)
+
+    result = {
+        "benchmark": "search",
+        "python": platform.python_version(),
+        "items": args.items,
+        "vocabulary": VOCABULARY,
+        "seed_s": seed_seconds,
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024),
+        "queries": measure_queries(store, words, args.requests, rng),
+        "updates": measure_updates(store, wishlist_id, words, args.requests, rng),
+    }
+    text = json.dumps(result, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
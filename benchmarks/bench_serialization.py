@@ -0,0 +1,132 @@
+"""
+Бенчмарк чтения вишлиста из 1000 элементов: обычный путь vs FAST_JSON.
+
+Обычный путь — валидация ``List[WishItemResponse]`` + jsonable + stdlib json;
+быстрый — сериализация хранимых записей pydantic-core без валидации.
+Печатает JSON со временем на запрос (p50) для обоих режимов.
+
+    python benchmarks/bench_serialization.py --items 1000 -n 200
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from decimal import Decimal
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+os.environ.setdefault("JWT_SECRET", "benchmark")
+
+from httpx import ASGITransport, AsyncClient  # noqa: E402
+
+from app.config import settings  # noqa: E402
+from app.database import InMemoryStore  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import now_utc  # noqa: E402
+from app.repository import InMemoryRepository, get_repository  # noqa: E402
+
+# setup_logging() в app.main включает INFO — лог на каждый запрос исказит замер
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+async def seed(repository, count):
+    user = await repository.create_user(
+        {
+            "username": "bench",
+            "email": "bench@example.com",
+            "password": "x",
+            "created_at": now_utc(),
+        }
+    )
+    wishlist = await repository.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    now = now_utc()
+    await repository.add_items(
+        wishlist["id"],
+        [
+            {
+                "name": f"Item {n}",
+                "description": "Описание элемента",
+                "price": Decimal(n) + Decimal("0.99"),
+                "url": f"https://example.com/items/{n}",
+                "category": "Книги",
+                "is_reserved": False,
+                "reserved_by": None,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for n in range(count)
+        ],
+    )
+    return wishlist["id"]
+
+
+async def measure(client, url, params, n):
+    timings = []
+    for _ in range(n):
+        started = time.perf_counter()
+        response = await client.get(url, params=params)
+        timings.append(time.perf_counter() - started)
+        assert response.status_code == 200
+    return timings
+
+
+async def run(count, n):
+    repository = InMemoryRepository(InMemoryStore())
+    app.dependency_overrides[get_repository] = lambda: repository
+    wishlist_id = await seed(repository, count)
+    url = f"/wishlists/{wishlist_id}/items"
+    params = {"limit": count}
+    results = {}
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://bench") as client:
+            for mode, fast in (("default", False), ("fast_json", True)):
+                settings.fast_json = fast
+                await measure(client, url, params, 5)  # прогрев
+                timings = await measure(client, url, params, n)
+                results[mode] = {
+                    "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+                    "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+                }
+    finally:
+        settings.fast_json = False
+        app.dependency_overrides.clear()
+    return {
+        "items": count,
+        "requests": n,
+        **results,
+        "speedup_p50": round(
+            results["default"]["p50_ms"] / results["fast_json"]["p50_ms"], 2
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("-n", "--requests", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.items, args.requests)), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
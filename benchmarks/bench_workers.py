@@ -0,0 +1,121 @@
+"""
+Масштабирование пропускной способности по числу воркеров uvicorn.
+
+Для каждого значения ``--workers`` поднимает сервер на общей SQLite-базе
+(``load.start_server``) и нагружает его ``--drivers`` параллельными
+процессами ``load.py --url``, чтобы клиент сам не упирался в одно ядро.
+Печатает JSON: суммарные rps, худший p99 и ускорение относительно первого
+значения. Осмысленно на машине, где ядер не меньше, чем воркеров плюс
+драйверов.
+
+    python benchmarks/bench_workers.py --workers 1 2 4 8 --drivers 4
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+from load import free_port, git_commit, start_server
+
+HERE = Path(__file__).resolve().parent
+
+
+def wait_ready(url, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("Сервер не поднялся")
+
+
+def measure(workers, args):
+    with tempfile.TemporaryDirectory() as data_dir:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        server = start_server(port, "sqlite", workers, data_dir)
+        try:
+            wait_ready(url)
+            drivers = [
+                subprocess.Popen(
+                    [
+                        sys.executable,
+                        str(HERE / "load.py"),
+                        "--url",
+                        url,
+                        "--items",
+                        str(args.items),
+                        "--concurrency",
+                        str(args.concurrency),
+                        "--duration",
+                        str(args.duration),
+                        "--seed",
+                        str(args.seed + n),
+                    ],
+                    stdout=subprocess.PIPE,
+                    text=True,
+                )
+                for n in range(args.drivers)
+            ]
+            results = [json.loads(driver.communicate()[0]) for driver in drivers]
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+    totals = [result["total"] for result in results]
+    return {
+        "workers": workers,
+        "rps": round(sum(total.get("rps", 0) for total in totals), 1),
+        "errors": sum(total["errors"] for total in totals),
+        "p50_ms": max(total.get("p50_ms", 0) for total in totals),
+        "p99_ms": max(total.get("p99_ms", 0) for total in totals),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("-w", "--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--drivers", type=int, default=4)
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("-d", "--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="записать JSON в файл")
+    args = parser.parse_args()
+
+    rows = [measure(workers, args) for workers in args.workers]
+    for row in rows:
+        row["speedup"] = (
+            round(row["rps"] / rows[0]["rps"], 2) if rows[0]["rps"] else None
+        )
+
+    result = {
+        "benchmark": "workers",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "backend": "sqlite",
+        "drivers": args.drivers,
+        "items": args.items,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "results": rows,
+    }
+    text = json.dumps(result, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""
+Сравнение двух JSON-результатов бенчмарков (например, двух коммитов).
+
+Сопоставляет одинаковые пути в обоих файлах: задержки (``*_ms``, ``*_us``,
+``*_s``) считаются ухудшением при росте, пропускная способность (``rps``,
+``ops_per_s``) — при падении. Печатает JSON со всеми изменениями и
+регрессиями сверх ``--threshold``; код выхода 1, если регрессии есть.
+
+    python benchmarks/compare.py before.json after.json --threshold 0.15
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+HIGHER_IS_BETTER = ("rps", "ops_per_s")
+LOWER_IS_BETTER = ("_ms", "_us", "_s")
+# Параметры прогона и время наполнения — не метрики скорости
+IGNORED = ("seed_s", "duration_s")
+
+
+def flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for key, nested in value.items():
+            yield from flatten(nested, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix, value
+
+
+def direction(path):
+    """+1 — чем больше, тем лучше; -1 — наоборот; 0 — не метрика скорости"""
+    name = path.rsplit(".", 1)[-1]
+    if name in HIGHER_IS_BETTER:
+        return 1
+    if name.endswith(LOWER_IS_BETTER) and name not in IGNORED:
+        return -1
+    return 0
+
+
+def compare(before, after, threshold):
+    old = dict(flatten(before))
+    changes, regressions = {}, []
+    for path, new_value in flatten(after):
+        sign = direction(path)
+        old_value = old.get(path)
+        if sign == 0 or not old_value:
+            continue
+        change = (new_value - old_value) / old_value
+        changes[path] = round(change, 4)
+        if change * sign < -threshold:
+            regressions.append(path)
+    return changes, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("before", type=Path)
+    parser.add_argument("after", type=Path)
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    before = json.loads(args.before.read_text(encoding="utf-8"))
+    after = json.loads(args.after.read_text(encoding="utf-8"))
+    changes, regressions = compare(before, after, args.threshold)
+    print(
+        json.dumps(
+            {
+                "before": before.get("commit"),
+                "after": after.get("commit"),
+                "threshold": args.threshold,
+                "regressions": regressions,
+                "changes": changes,
+            },
+            ensure_ascii=False,
+        )
+    )
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
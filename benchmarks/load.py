@@ -0,0 +1,276 @@
+"""
+HTTP-нагрузка на локально запущенный uvicorn.
+
+Поднимает ``uvicorn app.main:app`` на свободном порту (memory-бэкенд или
+``--backend sqlite`` во временном каталоге, ``--workers`` процессов),
+наполняет его через API (пользователь, вишлисты, bulk-импорт элементов) и
+``--duration`` секунд гоняет смесь запросов ``--concurrency`` клиентами.
+Печатает JSON с пропускной способностью и p50/p95/p99 — общими и по типам
+запросов; ``--url`` позволяет нагрузить уже запущенный сервер.
+
+    python benchmarks/load.py --items 100000 --concurrency 32 --duration 30
+    python benchmarks/load.py --backend sqlite --workers 4
+    python benchmarks/load.py -o after.json
+    python benchmarks/compare.py before.json after.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parents[1]
+
+PASSWORD = "benchmark-password"
+# Один bulk-запрос на вишлист (не больше MAX_IMPORT_ITEMS)
+ITEMS_PER_WISHLIST = 1000
+
+# Доли запросов в смеси: чтение преобладает, как у витрины вишлистов
+MIX = (
+    ("get_wishlist_item", 50),
+    ("list_items", 25),
+    ("get_user_wishlists", 15),
+    ("reserve_item", 10),
+)
+
+
+def percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * q), len(ordered) - 1)]
+
+
+def summarize(timings, errors, duration):
+    if not timings:
+        return {"requests": 0, "errors": errors}
+    return {
+        "requests": len(timings),
+        "errors": errors,
+        "rps": round(len(timings) / duration, 1),
+        "p50_ms": round(percentile(timings, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(timings, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(port, backend="memory", workers=1, data_dir=None):
+    env = {
+        **os.environ,
+        "JWT_SECRET": os.environ.get("JWT_SECRET", "benchmark"),
+        "DB_BACKEND": backend,
+        "LOG_LEVEL": "WARNING",
+        "AUTH_IP_LIMIT": str(10**9),
+        "WEB_CONCURRENCY": str(workers),
+    }
+    if backend == "sqlite":
+        # Общие для всех воркеров база и лимитер
+        env["DB_PATH"] = os.path.join(data_dir, "load.db")
+        env["RATE_LIMIT_BACKEND"] = "sqlite"
+        env["RATE_LIMIT_PATH"] = os.path.join(data_dir, "rate_limits.db")
+    return subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app.main:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--no-access-log",
+            "--log-level",
+            "warning",
+        ],
+        cwd=ROOT,
+        env=env,
+    )
+
+
+async def wait_ready(client, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get("/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError("Сервер не поднялся")
+
+
+async def seed(client, items):
+    """Пользователь, вишлисты по ITEMS_PER_WISHLIST и bulk-импорт элементов"""
+    suffix = random.randrange(10**9)
+    response = await client.post(
+        "/users",
+        json={
+            "username": f"load{suffix}",
+            "email": f"load{suffix}@example.com",
+            "password": PASSWORD,
+        },
+    )
+    response.raise_for_status()
+    user_id = response.json()["id"]
+    item_ids = []
+    for start in range(0, items, ITEMS_PER_WISHLIST):
+        response = await client.post(
+            "/wishlists", params={"user_id": user_id}, json={"name": f"WL {start}"}
+        )
+        response.raise_for_status()
+        wishlist_id = response.json()["id"]
+        batch = [
+            {"name": f"Item {n}", "price": "9.99", "category": "Книги"}
+            for n in range(start, min(start + ITEMS_PER_WISHLIST, items))
+        ]
+        response = await client.post(f"/wishlists/{wishlist_id}/items/bulk", json=batch)
+        response.raise_for_status()
+        item_ids.extend((wishlist_id, i) for i in response.json()["item_ids"])
+    return user_id, item_ids
+
+
+async def drive(client, user_id, item_ids, concurrency, duration, rng):
+    names = [name for name, _ in MIX]
+    weights = [weight for _, weight in MIX]
+    free = item_ids[:]
+    rng.shuffle(free)
+    timings = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    deadline = time.perf_counter() + duration
+
+    def request(name):
+        if name == "reserve_item" and free:
+            wishlist_id, item_id = free.pop()
+            url = f"/wishlists/{wishlist_id}/items/{item_id}/reserve"
+            return client.put(url, json={"reserved_by": "load"})
+        wishlist_id, item_id = rng.choice(item_ids)
+        if name == "list_items":
+            return client.get(f"/wishlists/{wishlist_id}/items", params={"limit": 20})
+        if name == "get_user_wishlists":
+            return client.get(f"/users/{user_id}/wishlists")
+        return client.get(f"/wishlist/{item_id}")
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            name = rng.choices(names, weights)[0]
+            if name == "reserve_item" and not free:
+                name = "get_wishlist_item"
+            started = time.perf_counter()
+            try:
+                response = await request(name)
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            if ok:
+                timings[name].append(time.perf_counter() - started)
+            else:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    every = [t for samples in timings.values() for t in samples]
+    return {
+        "total": summarize(every, sum(errors.values()), elapsed),
+        "requests": {
+            name: summarize(timings[name], errors[name], elapsed) for name in names
+        },
+    }
+
+
+async def run(args):
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=30.0
+    ) as client:
+        await wait_ready(client)
+        started = time.perf_counter()
+        user_id, item_ids = await seed(client, args.items)
+        seed_seconds = round(time.perf_counter() - started, 2)
+        # Короткий прогрев: соединения пула, кэши
+        await drive(client, user_id, item_ids[: len(item_ids) // 2], 4, 1.0, rng)
+        result = await drive(
+            client,
+            user_id,
+            item_ids[len(item_ids) // 2 :],
+            args.concurrency,
+            args.duration,
+            rng,
+        )
+    return {"seed_s": seed_seconds, **result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, default=100000)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=30.0)
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("-w", "--workers", type=int, default=1)
+    parser.add_argument("--url", help="нагружать уже запущенный сервер")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("-o", "--output", help="записать JSON в файл")
+    args = parser.parse_args()
+
+    server = None
+    data_dir = tempfile.TemporaryDirectory()
+    if args.url is None:
+        port = free_port()
+        args.url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.backend, args.workers, data_dir.name)
+    try:
+        measured = asyncio.run(run(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+        data_dir.cleanup()
+
+    result = {
+        "benchmark": "load",
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "backend": args.backend,
+        "workers": args.workers,
+        "items": args.items,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        **measured,
+    }
+    text = json.dumps(result, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+    print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,6 +2,73 @@
 import sys
 from pathlib import Path
 
+import pytest
+from httpx import ASGITransport, AsyncClient
+
 ROOT = Path(__file__).resolve().parents[1]  # корень репозитория
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+from app.database import InMemoryStore  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import now_utc  # noqa: E402
+from app.repository import InMemoryRepository, get_repository  # noqa: E402
+from app.sql_repository import SQLiteRepository  # noqa: E402
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+async def repository(request, tmp_path):
+    """Репозиторий на каждом бэкенде, подставленный в приложение"""
+    if request.param == "memory":
+        repo = InMemoryRepository(InMemoryStore())
+    else:
+        repo = SQLiteRepository(str(tmp_path / "test.db"), 2, 1.0)
+    app.dependency_overrides[get_repository] = lambda: repo
+    yield repo
+    app.dependency_overrides.clear()
+    await repo.close()
+
+
+@pytest.fixture
+async def client(repository):
+    """Асинхронный клиент приложения поверх ``repository``"""
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+def make_wishlist(repository):
+    """
+    Фабрика данных прямо в репозитории: вишлист пользователя ``owner``
+    (создаётся при первом обращении) и его элементы. Возвращает
+    (вишлист, элементы); в записях элементов достаточно ``name``.
+    """
+
+    async def make(owner="owner", name="WL", items=(), is_public=True):
+        now = now_utc()
+        user = await repository.get_user_by_username(owner)
+        if user is None:
+            user = await repository.create_user(
+                {
+                    "username": owner,
+                    "email": f"{owner}@example.com",
+                    "password": "x",
+                    "created_at": now,
+                }
+            )
+        wishlist = await repository.create_wishlist(
+            {
+                "owner_id": user["id"],
+                "name": name,
+                "is_public": is_public,
+                "created_at": now,
+            }
+        )
+        records = [
+            {"is_reserved": False, "created_at": now, "updated_at": now, **item}
+            for item in items
+        ]
+        return wishlist, await repository.add_items(wishlist["id"], records)
+
+    return make
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+from app.config import settings
+from app.main import MAX_BATCH_IDS
+
+
+async def test_items_batch_marks_missing_ids(client, make_wishlist, monkeypatch):
+    wishlist, items = await make_wishlist(
+        "dash", items=[{"name": "Книга", "price": Decimal("10.50")}, {"name": "Плед"}]
+    )
+    wl_id, ids = wishlist["id"], [item["id"] for item in items]
+    await client.delete(f"/wishlists/{wl_id}/items/{ids[1]}")
+
+    params = {"ids": [ids[1], ids[0], 999, ids[0]]}
+    for fast_json in (False, True):
+        monkeypatch.setattr(settings, "fast_json", fast_json)
+        r = await client.get("/items", params=params)
+        assert r.status_code == 200
+        body = r.json()
+        # Порядок запроса, повторы схлопнуты
+        assert [(entry["id"], entry["status"]) for entry in body] == [
+            (ids[1], 404),
+            (ids[0], 200),
+            (999, 404),
+        ]
+        assert body[0]["item"] is None
+        single = (await client.get(f"/wishlist/{ids[0]}")).json()
+        assert body[1]["item"] == single
+
+
+async def test_wishlists_batch_respects_privacy(client, make_wishlist):
+    wishlist, _ = await make_wishlist(
+        "owner", "Открытый", items=[{"name": "A", "price": Decimal("5")}]
+    )
+    owner, public = wishlist["owner_id"], wishlist["id"]
+    private = (await make_wishlist("owner", "Закрытый", is_public=False))[0]["id"]
+
+    r = await client.get("/wishlists", params={"ids": [public, private, 999]})
+    assert [(e["id"], e["status"]) for e in r.json()] == [
+        (public, 200),
+        (private, 403),
+        (999, 404),
+    ]
+    summary = r.json()[0]["wishlist"]
+    assert summary["item_count"] == 1 and summary["total_price"] == "5"
+
+    r = await client.get("/wishlists", params={"ids": [private], "user_id": owner})
+    assert r.json()[0]["status"] == 200
+    assert r.json()[0]["wishlist"]["name"] == "Закрытый"
+
+
+async def test_batch_size_is_limited(client):
+    r = await client.get("/items", params={"ids": list(range(1, MAX_BATCH_IDS + 2))})
+    assert r.status_code == 422
+    assert (await client.get("/items")).status_code == 422
@@ -0,0 +1,133 @@
+import json
+
+import pytest
+
+from app import bulk_import
+from app.models import now_utc
+from app.repository import InMemoryRepository
+
+
+@pytest.fixture
+async def wishlist_id(make_wishlist):
+    wishlist, _ = await make_wishlist("importer")
+    return wishlist["id"]
+
+
+async def test_json_array_import(client, wishlist_id, monkeypatch):
+    monkeypatch.setattr(bulk_import, "IMPORT_BATCH_SIZE", 3)
+    rows = [{"name": f"Item {n}", "price": n, "category": "Книги"} for n in range(8)]
+    r = await client.post(f"/wishlists/{wishlist_id}/items/bulk", json=rows)
+    assert r.status_code == 200
+    body = r.json()
+    assert body["imported"] == 8
+    assert body["errors"] == []
+    ids = body["item_ids"]
+    assert ids == list(range(ids[0], ids[0] + 8))
+
+    r = await client.get(
+        f"/wishlists/{wishlist_id}/items",
+        params={"category": "Книги", "min_price": 6},
+    )
+    assert [item["name"] for item in r.json()] == ["Item 6", "Item 7"]
+
+
+async def test_per_row_errors(client, wishlist_id, monkeypatch):
+    monkeypatch.setattr(bulk_import, "IMPORT_BATCH_SIZE", 2)
+    rows = [
+        {"name": "Ok 1"},
+        {"name": "Bad", "price": -1},
+        {"price": 5},
+        {"name": "Ok 2"},
+        "not an object",
+    ]
+    r = await client.post(f"/wishlists/{wishlist_id}/items/bulk", json=rows)
+    body = r.json()
+    assert body["imported"] == 2
+    assert [error["row"] for error in body["errors"]] == [1, 2, 4]
+    assert body["errors"][1]["loc"] == ["name"]
+
+    r = await client.get(f"/wishlists/{wishlist_id}/items")
+    assert [item["name"] for item in r.json()] == ["Ok 1", "Ok 2"]
+
+
+async def test_ndjson_import(client, wishlist_id):
+    lines = [json.dumps({"name": "A"}), "{broken", "", json.dumps({"name": "B"})]
+    r = await client.post(
+        f"/wishlists/{wishlist_id}/items/bulk",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    body = r.json()
+    assert body["imported"] == 2
+    assert [error["row"] for error in body["errors"]] == [1]
+
+
+async def test_import_rejections(client, wishlist_id, monkeypatch):
+    url = f"/wishlists/{wishlist_id}/items/bulk"
+    r = await client.post(url, json={"name": "not a list"})
+    assert r.status_code == 400
+
+    r = await client.post(
+        url, content=b"[", headers={"Content-Type": "application/json"}
+    )
+    assert r.status_code == 400
+
+    r = await client.post("/wishlists/999/items/bulk", json=[])
+    assert r.status_code == 404
+
+    monkeypatch.setattr(bulk_import, "MAX_IMPORT_ITEMS", 2)
+    r = await client.post(url, json=[{"name": "x"}] * 3)
+    assert r.status_code == 413
+    r = await client.post(
+        url,
+        content=b'{"name": "x"}\n' * 3 + b"not json\n" * 1000,
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    assert r.status_code == 413
+
+
+async def test_import_body_is_limited(client, wishlist_id, monkeypatch):
+    url = f"/wishlists/{wishlist_id}/items/bulk"
+    monkeypatch.setattr(bulk_import, "MAX_IMPORT_BYTES", 64)
+    r = await client.post(url, json=[{"name": "x" * 100}])
+    assert r.status_code == 413
+
+    async def chunks():
+        # Без Content-Length: лимит срабатывает при чтении потока
+        for _ in range(10):
+            yield b'{"name": "x"}\n'
+
+    r = await client.post(
+        url, content=chunks(), headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert "content-length" not in r.request.headers
+    assert r.status_code == 413
+
+    r = await client.post(url, json=[{"name": "x"}])
+    assert r.status_code == 200
+
+
+async def test_add_items_is_atomic(repository, wishlist_id):
+    if isinstance(repository, InMemoryRepository):
+        pytest.skip("в память попадают только провалидированные записи")
+    now = now_utc()
+    before = await repository.list_items(wishlist_id)
+    with pytest.raises(Exception):
+        await repository.add_items(
+            wishlist_id,
+            [
+                {
+                    "name": "ok",
+                    "is_reserved": False,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+                {
+                    "name": None,
+                    "is_reserved": False,
+                    "created_at": now,
+                    "updated_at": now,
+                },
+            ],
+        )
+    assert await repository.list_items(wishlist_id) == before
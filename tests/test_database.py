@@ -0,0 +1,198 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from app.database import RECLAIM_CHUNK, InMemoryStore
+from app.repository import InMemoryRepository
+
+
+def make_store():
+    store = InMemoryStore()
+    user = store.add_user({"username": "alice", "email": "alice@example.com"})
+    wishlist = store.add_wishlist({"name": "WL", "owner_id": user["id"]})
+    item = store.add_item(wishlist["id"], {"name": "Книга"})
+    return store, user, wishlist, item
+
+
+def test_user_indexes():
+    store, user, _, _ = make_store()
+    assert store.get_user_by_username("alice") is user
+    assert store.get_user_by_email("alice@example.com") is user
+
+    store.update_user(user["id"], {"username": "alice2", "email": "a2@example.com"})
+    assert store.get_user_by_username("alice") is None
+    assert store.get_user_by_email("alice@example.com") is None
+    assert store.get_user_by_username("alice2") is user
+    assert store.get_user_by_email("a2@example.com") is user
+
+
+def test_item_index():
+    store, _, wishlist, item = make_store()
+    assert store.get_item(item["id"]) == item
+    assert store.get_wishlist_item(wishlist["id"], item["id"]) == item
+    assert store.get_wishlist_item(wishlist["id"] + 1, item["id"]) is None
+
+    store.delete_item(wishlist["id"], item["id"])
+    assert store.get_item(item["id"]) is None
+
+
+def test_owner_index():
+    store, user, wishlist, _ = make_store()
+    second = store.add_wishlist({"name": "WL2", "owner_id": user["id"]})
+    assert [w["id"] for w in store.wishlists_of(user["id"])] == [
+        wishlist["id"],
+        second["id"],
+    ]
+
+    store.delete_wishlist(wishlist["id"])
+    assert [w["id"] for w in store.wishlists_of(user["id"])] == [second["id"]]
+    # Список владельца и есть user["wishlists"]
+    assert user["wishlists"] == [second["id"]]
+    store.delete_wishlist(second["id"])
+    third = store.add_wishlist({"name": "WL3", "owner_id": user["id"]})
+    assert user["wishlists"] == [third["id"]]
+
+
+def test_delete_user_cascades():
+    store, user, wishlist, item = make_store()
+    store.delete_user(user["id"])
+
+    assert store.get_user_by_username("alice") is None
+    assert store.get_wishlist(wishlist["id"]) is None
+    assert store.get_item(item["id"]) is None
+    assert store.wishlists_of(user["id"]) == []
+
+
+def big_wishlist(store, user, count):
+    wishlist = store.add_wishlist(
+        {"name": "Big", "owner_id": user["id"], "is_public": True}
+    )
+    store.add_items(wishlist["id"], [{"name": f"Плед {n}"} for n in range(count)])
+    return wishlist
+
+
+def test_large_cascade_is_reclaimed_in_chunks():
+    store, user, small, item = make_store()
+    big = big_wishlist(store, user, RECLAIM_CHUNK * 2 + 10)
+    big_items = store.list_items(big["id"])
+    other = store.add_user({"username": "bob", "email": "bob@example.com"})
+    kept = big_wishlist(store, other, 5)
+
+    store.delete_user(user["id"])
+    # Запрос снял с индексов один шаг, остальное ждёт фоновой дочистки
+    assert store.reclaim_pending == len(big_items) + 1 - RECLAIM_CHUNK
+    assert store.counts()["items"] == 5
+    assert store.get_item(big_items[-1]["id"]) is None
+    assert store.get_wishlist_item(big["id"], big_items[-1]["id"]) is None
+    assert store.get_item(item["id"]) is None
+    assert store.get_wishlist(small["id"]) is None
+    total, found, _, _ = store.search("плед")
+    assert [i["wishlist_id"] for i in found] == [kept["id"]] * len(found)
+
+    assert store.reclaim() == RECLAIM_CHUNK
+    while store.reclaim():
+        pass
+    assert store.reclaim_pending == 0
+    assert store.search("плед")[0] == 5
+    assert store.counts()["items"] == 5
+
+
+async def test_repository_reclaims_in_background():
+    store = InMemoryStore()
+    repo = InMemoryRepository(store)
+    user = store.add_user({"username": "alice", "email": "alice@example.com"})
+    wishlist = big_wishlist(store, user, RECLAIM_CHUNK * 3)
+
+    await repo.delete_wishlist(wishlist["id"])
+    assert store.reclaim_pending == RECLAIM_CHUNK * 2
+    for _ in range(100):
+        if not store.reclaim_pending:
+            break
+        await asyncio.sleep(0)
+    assert store.reclaim_pending == 0
+    assert store.search("плед")[0] == 0
+    await repo.close()
+
+
+def test_stored_item_round_trip():
+    store, _, wishlist, _ = make_store()
+    created = datetime(2025, 1, 2, 3, 4, 5, 678901, tzinfo=timezone(timedelta(hours=3)))
+    prices = ["10.5", "10.50", "1E+2", "0.0000001", None]
+    items = [
+        store.add_item(
+            wishlist["id"],
+            {
+                "name": f"Item {n}",
+                "price": None if price is None else Decimal(price),
+                "category": "".join(["Кни", "ги"]),
+                "created_at": created,
+                "updated_at": created,
+            },
+        )
+        for n, price in enumerate(prices)
+    ]
+    for item, price in zip(items, prices):
+        stored = store.get_item(item["id"])
+        assert stored == item
+        # Восстанавливается тот же Decimal, включая число знаков
+        assert str(stored["price"]) == str(price and Decimal(price))
+        assert stored["created_at"] == created
+        assert stored["category"] is items[0]["category"]
+
+
+def test_price_filter_mixed_scales():
+    store, _, wishlist, _ = make_store()
+    for price in ["9.999", "10", "10.0000001", "10.5", "1E+2"]:
+        store.add_item(wishlist["id"], {"name": price, "price": Decimal(price)})
+
+    def names(**filters):
+        return [i["name"] for i in store.list_items(wishlist["id"], **filters)]
+
+    assert names(min_price=Decimal("10")) == ["10", "10.0000001", "10.5", "1E+2"]
+    assert names(min_price=Decimal("10.00000005"), max_price=Decimal("10.5")) == [
+        "10.0000001",
+        "10.5",
+    ]
+    assert names(max_price=Decimal("9.9999")) == ["9.999"]
+
+
+def test_price_pages_match_full_scan():
+    store, _, wishlist, _ = make_store()
+    for n in range(300):
+        store.add_item(
+            wishlist["id"],
+            {
+                "name": f"Item {n}",
+                "price": None if n % 7 == 0 else Decimal((n * 37) % 100),
+                "category": "Книги" if n % 3 else None,
+                "is_reserved": n % 4 == 0,
+            },
+        )
+    every = store.list_items(wishlist["id"])
+
+    def expected(after, limit, min_price, max_price, **filters):
+        rows = [
+            i
+            for i in every
+            if i["id"] > after
+            and i["price"] is not None
+            and min_price <= i["price"] <= max_price
+            and all(i[field] == value for field, value in filters.items())
+        ]
+        return [i["id"] for i in rows[:limit]]
+
+    # Узкий диапазон (ведущий — by_price) и широкий (ведущий — список id)
+    for low, high in [(40, 41), (0, 99), (10, 60)]:
+        for filters in [{}, {"category": "Книги"}, {"is_reserved": False}]:
+            for after, limit in [(0, 5), (150, 20), (0, None)]:
+                page = store.list_items(
+                    wishlist["id"],
+                    after=after,
+                    limit=limit,
+                    min_price=Decimal(low),
+                    max_price=Decimal(high),
+                    **filters,
+                )
+                assert [i["id"] for i in page] == expected(
+                    after, limit, low, high, **filters
+                )
@@ -0,0 +1,105 @@
+import pytest
+
+
+@pytest.fixture
+async def item(make_wishlist):
+    _, (item,) = await make_wishlist("etag", items=[{"name": "Item"}])
+    return item
+
+
+async def test_item_conditional_get(client, item):
+    url = f"/wishlist/{item['id']}"
+    r = await client.get(url)
+    etag = r.headers["ETag"]
+    assert r.json()["version"] == item["version"]
+
+    r = await client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["ETag"] == etag
+    assert r.content == b""
+
+    await client.put(
+        f"/wishlists/{item['wishlist_id']}/items/{item['id']}/reserve",
+        json={"reserved_by": "A"},
+    )
+    r = await client.get(url, headers={"If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+    assert r.json()["is_reserved"] is True
+
+
+async def test_listing_etag_tracks_item_changes(client, item):
+    url = f"/wishlists/{item['wishlist_id']}/items"
+    r = await client.get(url)
+    etag = r.headers["ETag"]
+    assert (await client.get(url, headers={"If-None-Match": etag})).status_code == 304
+
+    # Другие параметры выборки — другой ETag
+    r = await client.get(url, params={"limit": 1})
+    assert r.headers["ETag"] != etag
+
+    for change in (
+        lambda: client.post(url, json={"name": "New"}),
+        lambda: client.put(f"{url}/{item['id']}", json={"name": "Renamed"}),
+        lambda: client.delete(f"{url}/{item['id']}"),
+    ):
+        assert (await change()).status_code == 200
+        r = await client.get(url, headers={"If-None-Match": etag})
+        assert r.status_code == 200
+        assert r.headers["ETag"] != etag
+        etag = r.headers["ETag"]
+
+
+async def test_if_match_on_put(client, item):
+    url = f"/wishlists/{item['wishlist_id']}/items/{item['id']}"
+    etag = (await client.get(f"/wishlist/{item['id']}")).headers["ETag"]
+
+    r = await client.put(url, json={"name": "First"}, headers={"If-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["ETag"] != etag
+
+    r = await client.put(url, json={"name": "Second"}, headers={"If-Match": etag})
+    assert r.status_code == 412
+    r = await client.get(f"/wishlist/{item['id']}")
+    assert r.json()["name"] == "First"
+
+    r = await client.put(url, json={"name": "Any"}, headers={"If-Match": "*"})
+    assert r.status_code == 200
+
+
+async def test_if_match_on_reserve_and_delete(client, item):
+    url = f"/wishlists/{item['wishlist_id']}/items/{item['id']}"
+    etag = (await client.get(f"/wishlist/{item['id']}")).headers["ETag"]
+    await client.put(url, json={"name": "Changed"})
+
+    r = await client.put(
+        f"{url}/reserve", json={"reserved_by": "A"}, headers={"If-Match": etag}
+    )
+    assert r.status_code == 412
+
+    r = await client.delete(url, headers={"If-Match": etag})
+    assert r.status_code == 412
+
+    fresh = (await client.get(f"/wishlist/{item['id']}")).headers["ETag"]
+    r = await client.delete(url, headers={"If-Match": f"W/{fresh}"})
+    assert r.status_code == 412
+    r = await client.delete(url, headers={"If-Match": fresh})
+    assert r.status_code == 200
+    r = await client.delete(url, headers={"If-Match": fresh})
+    assert r.status_code == 404
+
+
+async def test_lost_race_is_a_conflict(client, item, repository, monkeypatch):
+    # CAS отказал, хотя элемент на месте и версия та же — гонка с другим запросом
+    async def lost(*args):
+        return None
+
+    monkeypatch.setattr(repository, "compare_and_set_item", lost)
+    monkeypatch.setattr(repository, "delete_item", lost)
+    url = f"/wishlists/{item['wishlist_id']}/items/{item['id']}"
+    etag = (await client.get(f"/wishlist/{item['id']}")).headers["ETag"]
+
+    r = await client.put(url, json={"name": "New"}, headers={"If-Match": etag})
+    assert r.status_code == 409
+    r = await client.delete(url)
+    assert r.status_code == 409
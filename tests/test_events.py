@@ -0,0 +1,137 @@
+import asyncio
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app import events
+from app.database import InMemoryStore
+from app.main import app
+from app.repository import InMemoryRepository, get_repository
+
+
+def parse(body):
+    frames = [frame for frame in body.split("\n\n") if frame.startswith("event:")]
+    return [json.loads(frame.split("data: ", 1)[1]) for frame in frames]
+
+
+async def test_subscription_coalesces_per_item():
+    broker = events.EventBroker(queue_size=10)
+    subscription = broker.subscribe(1)
+    broker.publish(events.ITEM_ADDED, 1, {"id": 1, "name": "a"})
+    broker.publish(events.ITEM_ADDED, 1, {"id": 2, "name": "b"})
+    broker.publish(events.ITEM_RESERVED, 1, {"id": 1, "name": "a"})
+    broker.publish(events.ITEM_ADDED, 2, {"id": 3, "name": "c"})  # чужой вишлист
+
+    batch = await subscription.get(0.1)
+    assert [(e["type"], e["item_id"]) for e in batch] == [
+        (events.ITEM_ADDED, 2),
+        (events.ITEM_RESERVED, 1),
+    ]
+    assert broker.coalesced == 1
+    assert await subscription.get(0.01) == []
+
+    broker.unsubscribe(subscription)
+    assert broker.subscribers() == 0
+
+
+async def test_slow_subscriber_gets_resync():
+    broker = events.EventBroker(queue_size=3)
+    slow = broker.subscribe(1)
+    for item_id in range(100):
+        broker.publish(events.ITEM_ADDED, 1, {"id": item_id})
+    # Очередь не растёт сверх лимита: всё заменено одним resync
+    assert await slow.get(0.1) == [{"type": events.RESYNC, "wishlist_id": 1}]
+    assert broker.overflows == 1
+
+    broker.publish(events.ITEM_DELETED, 1, {"id": 5})
+    broker.close(1)
+    batch = await slow.get(0.1)
+    assert [e["type"] for e in batch] == [events.ITEM_DELETED, events.WISHLIST_DELETED]
+    assert batch[0]["item"] is None
+    assert slow.closed and await slow.get(0.1) == []
+
+
+async def test_stream_heartbeat_and_unsubscribe():
+    broker = events.EventBroker(queue_size=10)
+    stream = events.event_stream(broker, 7, heartbeat=0.01)
+    assert await stream.__anext__() == ": subscribed\n\n"
+    assert broker.subscribers(7) == 1
+    assert await stream.__anext__() == ": ping\n\n"
+    await stream.aclose()
+    assert broker.subscribers(7) == 0
+
+
+@pytest.fixture
+async def client():
+    repository = InMemoryRepository(InMemoryStore())
+    app.dependency_overrides[get_repository] = lambda: repository
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    app.dependency_overrides.clear()
+
+
+async def test_wishlist_event_stream(client):
+    r = await client.post(
+        "/users",
+        json={"username": "fan", "email": "fan@example.com", "password": "secret123"},
+    )
+    r = await client.post(
+        "/wishlists", params={"user_id": r.json()["id"]}, json={"name": "WL"}
+    )
+    wl_id = r.json()["id"]
+    url = f"/wishlists/{wl_id}/items"
+    first = (await client.post(url, json={"name": "Книга", "price": 5})).json()["id"]
+
+    stream = asyncio.create_task(client.get(f"/wishlists/{wl_id}/events"))
+    while events.broker.subscribers(wl_id) == 0:
+        await asyncio.sleep(0.01)
+
+    await client.put(f"{url}/{first}/reserve", json={"reserved_by": "Друг"})
+    second = (await client.post(url, json={"name": "Кружка"})).json()["id"]
+    await client.put(f"{url}/{second}", json={"name": "Большая кружка"})
+    await client.delete(f"{url}/{second}")
+    await client.delete(f"/wishlists/{wl_id}")
+
+    r = await asyncio.wait_for(stream, 5)
+    assert r.headers["content-type"].startswith(events.MEDIA_TYPE)
+    received = [(e["type"], e["item_id"]) for e in parse(r.text)]
+    # Медленный читатель мог получить свёрнутые события, но итог тот же
+    assert received[-1] == (events.WISHLIST_DELETED, None)
+    assert (events.ITEM_RESERVED, first) in received
+    assert [e for e in received if e[1] == second][-1] == (events.ITEM_DELETED, second)
+    assert events.broker.subscribers(wl_id) == 0
+
+
+async def test_user_deletion_ends_streams(client):
+    r = await client.post(
+        "/users",
+        json={"username": "gone", "email": "gone@example.com", "password": "secret123"},
+    )
+    user_id = r.json()["id"]
+    wl_ids = [
+        (
+            await client.post(
+                "/wishlists", params={"user_id": user_id}, json={"name": name}
+            )
+        ).json()["id"]
+        for name in ("A", "B")
+    ]
+    streams = [
+        asyncio.create_task(client.get(f"/wishlists/{wl_id}/events"))
+        for wl_id in wl_ids
+    ]
+    while events.broker.subscribers() < len(wl_ids):
+        await asyncio.sleep(0.01)
+
+    assert (await client.delete(f"/users/{user_id}")).status_code == 200
+    for stream in streams:
+        r = await asyncio.wait_for(stream, 5)
+        assert parse(r.text)[-1]["type"] == events.WISHLIST_DELETED
+    assert events.broker.subscribers() == 0
+
+
+async def test_event_stream_unknown_wishlist(client):
+    r = await client.get("/wishlists/999/events")
+    assert r.status_code == 404
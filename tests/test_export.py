@@ -0,0 +1,126 @@
+import csv
+import io
+import json
+from decimal import Decimal
+
+import pytest
+
+from app import main
+from app.auth import create_access_token
+from app.repository import EXPORT_COLUMNS
+
+
+def auth(user_id):
+    token = create_access_token({"sub": str(user_id)})
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def make_export_wishlist(make_wishlist):
+    """Вишлист с ``items`` одинаковыми элементами «<имя>-<n>» по 10.50"""
+
+    async def make(owner, name, items=0, is_public=True):
+        records = [
+            {"name": f"{name}-{n}", "price": Decimal("10.50")} for n in range(items)
+        ]
+        wishlist, _ = await make_wishlist(owner, name, records, is_public)
+        return wishlist
+
+    return make
+
+
+def ndjson(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_ndjson_export(client, make_export_wishlist):
+    full = await make_export_wishlist("alice", "WL", items=2)
+    empty = await make_export_wishlist("alice", "Empty")
+
+    r = await client.get("/export")
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert "attachment" in r.headers["content-disposition"]
+
+    rows = ndjson(r)
+    assert [(row["wishlist_id"], row["name"]) for row in rows] == [
+        (full["id"], "WL-0"),
+        (full["id"], "WL-1"),
+        (empty["id"], None),
+    ]
+    assert rows[0]["price"] == "10.50"
+    assert rows[2]["item_id"] is None
+    assert list(rows[0]) == list(EXPORT_COLUMNS)
+
+
+async def test_csv_export(client, make_export_wishlist):
+    await make_export_wishlist("bob", "WL", items=3)
+
+    r = await client.get("/export", params={"format": "csv"})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+
+    rows = list(csv.reader(io.StringIO(r.text)))
+    assert rows[0] == list(EXPORT_COLUMNS)
+    assert [row[EXPORT_COLUMNS.index("name")] for row in rows[1:]] == [
+        "WL-0",
+        "WL-1",
+        "WL-2",
+    ]
+
+
+async def test_user_export_filters_and_batches(
+    client, make_export_wishlist, monkeypatch
+):
+    monkeypatch.setattr(main, "EXPORT_BATCH_SIZE", 2)
+    first = await make_export_wishlist("alice", "A1", items=3)
+    await make_export_wishlist("bob", "B1", items=2)
+    second = await make_export_wishlist("alice", "A2", items=2)
+    alice = first["owner_id"]
+
+    r = await client.get(f"/users/{alice}/export", headers=auth(alice))
+    rows = ndjson(r)
+    assert {row["owner_id"] for row in rows} == {alice}
+    assert [row["wishlist_id"] for row in rows] == [first["id"]] * 3 + [
+        second["id"]
+    ] * 2
+    assert len({row["item_id"] for row in rows}) == 5
+
+    r = await client.get("/export", params={"format": "csv"})
+    assert len(r.text.splitlines()) == 1 + 7
+
+
+async def test_export_errors(client):
+    r = await client.get("/users/999/export", headers=auth(999))
+    assert r.status_code == 404
+
+    r = await client.get("/export", params={"format": "xml"})
+    assert r.status_code == 422
+
+    r = await client.get("/export", params={"format": "csv"})
+    assert r.text.splitlines() == [",".join(EXPORT_COLUMNS)]
+
+
+async def test_export_hides_private_data(client, repository, make_export_wishlist):
+    bob = (await make_export_wishlist("bob", "Bob", is_public=False))["owner_id"]
+    public = await make_export_wishlist("alice", "Public", items=1)
+    private = await make_export_wishlist("alice", "Private", items=1, is_public=False)
+    alice = public["owner_id"]
+    item = (await repository.list_items(public["id"]))[0]
+    await repository.update_item(
+        public["id"], item["id"], {"is_reserved": True, "reserved_by": "Друг"}
+    )
+
+    # Общая выгрузка: только публичные вишлисты, без имени зарезервировавшего
+    rows = ndjson(await client.get("/export"))
+    assert [row["wishlist_id"] for row in rows] == [public["id"]]
+    assert rows[0]["is_reserved"] is True
+    assert rows[0]["reserved_by"] is None
+
+    url = f"/users/{alice}/export"
+    assert (await client.get(url)).status_code == 401
+    assert (await client.get(url, headers=auth(bob))).status_code == 403
+
+    rows = ndjson(await client.get(url, headers=auth(alice)))
+    assert [row["wishlist_id"] for row in rows] == [public["id"], private["id"]]
+    assert rows[0]["reserved_by"] == "Друг"
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+
+from app.exceptions import ProblemDetail
+from app.hashing_service import HashingService
+
+
+@pytest.mark.asyncio
+async def test_hash_and_verify_in_pool():
+    service = HashingService(max_workers=1, max_queue=4, queue_timeout=30)
+    try:
+        hashed = await service.hash("secret123")
+        assert hashed.startswith("$argon2id$")
+        assert await service.verify("secret123", hashed) is True
+        assert await service.verify("wrong", hashed) is False
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_saturated_pool_returns_503():
+    service = HashingService(max_workers=1, max_queue=0, queue_timeout=30)
+    try:
+        busy = asyncio.ensure_future(service._submit(time.sleep, 1))
+        await asyncio.sleep(0)
+        assert service.stats()["in_flight"] == 1
+
+        with pytest.raises(ProblemDetail) as exc:
+            await service._submit(time.sleep, 0)
+        assert exc.value.status == 503
+        assert "Retry-After" in exc.value.headers
+        await busy
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_returns_503():
+    service = HashingService(max_workers=1, max_queue=1, queue_timeout=0.2)
+    try:
+        with pytest.raises(ProblemDetail) as exc:
+            await asyncio.gather(
+                service._submit(time.sleep, 1), service._submit(time.sleep, 1)
+            )
+        assert exc.value.status == 503
+    finally:
+        service.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_deadline_covers_only_queue_wait():
+    service = HashingService(max_workers=1, max_queue=1, queue_timeout=0.3)
+    try:
+        # Прогрев: первый вызов поднимает процесс пула
+        await service._submit(time.sleep, 0)
+        # Допущенный хеш дольше queue_timeout всё равно завершается, а
+        # ожидающий получает слот, как только тот освобождается
+        assert await service._submit(time.sleep, 0.5) is None
+        results = await asyncio.gather(
+            service._submit(time.sleep, 0.2), service._submit(time.sleep, 0.2)
+        )
+        assert results == [None, None]
+        assert service.stats()["in_flight"] == 0
+        assert service.stats()["queued"] == 0
+    finally:
+        service.shutdown()
@@ -0,0 +1,152 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.database import InMemoryStore
+from app.idempotency import IdempotencyCache, IdempotencyMiddleware, StoredResponse
+from app.main import app
+from app.repository import InMemoryRepository, get_repository
+
+
+@pytest.fixture
+def client():
+    repository = InMemoryRepository(InMemoryStore())
+    app.dependency_overrides[get_repository] = lambda: repository
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def user_id(client):
+    r = client.post(
+        "/users",
+        json={"username": "mobile", "email": "m@example.com", "password": "secret123"},
+    )
+    return r.json()["id"]
+
+
+def key():
+    return {"Idempotency-Key": str(uuid.uuid4())}
+
+
+def test_retried_post_creates_one_wishlist(client, user_id):
+    headers = key()
+    first = client.post(
+        "/wishlists", params={"user_id": user_id}, json={"name": "WL"}, headers=headers
+    )
+    retry = client.post(
+        "/wishlists", params={"user_id": user_id}, json={"name": "WL"}, headers=headers
+    )
+    assert retry.status_code == first.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert "Idempotent-Replayed" not in first.headers
+    assert retry.headers["X-Correlation-ID"] != first.headers["X-Correlation-ID"]
+    assert len(client.get(f"/users/{user_id}/wishlists").json()) == 1
+
+    # Без ключа — обычное поведение
+    client.post("/wishlists", params={"user_id": user_id}, json={"name": "WL"})
+    assert len(client.get(f"/users/{user_id}/wishlists").json()) == 2
+
+
+def test_retried_reserve_replays_success(client, user_id):
+    wl_id = client.post(
+        "/wishlists", params={"user_id": user_id}, json={"name": "WL"}
+    ).json()["id"]
+    item_id = client.post(
+        f"/wishlists/{wl_id}/items", json={"name": "Книга"}, headers=key()
+    ).json()["id"]
+    url = f"/wishlists/{wl_id}/items/{item_id}/reserve"
+    headers = key()
+    first = client.put(url, json={"reserved_by": "Друг"}, headers=headers)
+    retry = client.put(url, json={"reserved_by": "Друг"}, headers=headers)
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    # Новый ключ — новый запрос, элемент уже занят
+    assert (
+        client.put(url, json={"reserved_by": "Друг"}, headers=key()).status_code == 400
+    )
+
+
+def test_key_reuse_and_validation(client, user_id):
+    headers = key()
+    params = {"user_id": user_id}
+    client.post("/wishlists", params=params, json={"name": "A"}, headers=headers)
+    r = client.post("/wishlists", params=params, json={"name": "B"}, headers=headers)
+    assert r.status_code == 422
+    assert r.json()["title"] == "Idempotency Key Reused"
+
+    # Тот же ключ у другого клиента — независимый запрос
+    other = {**headers, "Authorization": "Bearer other"}
+    r = client.post("/wishlists", params=params, json={"name": "B"}, headers=other)
+    assert r.status_code == 200 and "Idempotent-Replayed" not in r.headers
+
+    r = client.post(
+        "/wishlists",
+        params=params,
+        json={"name": "C"},
+        headers={"Idempotency-Key": "x" * 256},
+    )
+    assert r.status_code == 400
+
+
+def counting_app(cache, status=200, delay=0.0):
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.body())
+        await asyncio.sleep(delay)
+        return JSONResponse({"call": len(calls)}, status_code=status)
+
+    inner = Starlette(routes=[Route("/", handler, methods=["POST"])])
+    return IdempotencyMiddleware(inner, cache=cache, max_body=1024), calls
+
+
+async def test_concurrent_retries_wait_for_first():
+    cache = IdempotencyCache(max_size=10, ttl=60, wait_timeout=5)
+    asgi, calls = counting_app(cache, delay=0.05)
+    transport = ASGITransport(app=asgi)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = key()
+        responses = await asyncio.gather(
+            *(client.post("/", content=b"body", headers=headers) for _ in range(5))
+        )
+    assert calls == [b"body"]
+    assert {r.json()["call"] for r in responses} == {1}
+    assert cache.stored == 1 and cache.waited == 4
+
+
+async def test_server_errors_are_not_stored():
+    cache = IdempotencyCache(max_size=10, ttl=60, wait_timeout=5)
+    asgi, calls = counting_app(cache, status=503)
+    transport = ASGITransport(app=asgi)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        headers = key()
+        await client.post("/", headers=headers)
+        r = await client.post("/", headers=headers)
+    assert r.json()["call"] == 2 and len(calls) == 2
+    assert len(cache) == 0
+
+
+def test_cache_is_bounded_and_expires(monkeypatch):
+    cache = IdempotencyCache(max_size=2, ttl=10, wait_timeout=5)
+    response = StoredResponse(200, [], b"{}")
+    for name in (b"a", b"b", b"c"):
+        state, entry = cache.begin(("ip:1", name), b"f")
+        assert state == cache.NEW
+        cache.finish(("ip:1", name), entry, response)
+    assert len(cache) == 2
+    # Самый давний вытеснен, остальные отдаются повтором
+    assert cache.begin(("ip:1", b"c"), b"f")[0] == cache.REPLAY
+    assert cache.begin(("ip:1", b"a"), b"f")[0] == cache.NEW
+
+    now = time.monotonic()
+    monkeypatch.setattr("app.idempotency.time.monotonic", lambda: now + 11)
+    assert cache.begin(("ip:1", b"c"), b"f")[0] == cache.NEW
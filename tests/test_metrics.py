@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import metrics
+from app.main import app
+from app.models import now_utc
+
+
+@pytest.fixture
+def client(repository):
+    return TestClient(app)
+
+
+def test_counter_sums_thread_shards():
+    counter = metrics.Counter("test_total", "test", ("kind",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("a")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counter.inc("b", amount=2)
+    assert counter.values() == {("a",): 4000, ("b",): 2}
+    assert 'test_total{kind="a"} 4000' in counter.render()
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_seconds", "test", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, "x")
+    lines = histogram.render()
+    assert 'test_seconds_bucket{op="x",le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{op="x",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{op="x",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{op="x"} 4' in lines
+    assert 'test_seconds_sum{op="x"} 4.25' in lines
+
+
+def test_metrics_endpoint(client, repository):
+    assert client.get("/health").status_code == 200
+    assert client.get("/wishlists/999/items").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    # Метка — шаблон маршрута, а не путь с id
+    assert (
+        'http_requests_total{method="GET",route="/wishlists/{wishlist_id}/items",'
+        'status="404"}' in body
+    )
+    assert (
+        'http_request_duration_seconds_bucket{method="GET",route="/health",le="+Inf"}'
+        in body
+    )
+    assert 'store_records{kind="items"} 0' in body
+    assert "rate_limit_rejections_total " in body
+    assert 'argon2_tasks{state="queued"} 0' in body
+    assert 'token_cache_requests_total{result="hit"}' in body
+    assert "log_records_dropped_total 0" in body
+
+
+async def test_reservation_conflicts_counted(client, repository):
+    user = await repository.create_user(
+        {
+            "username": "m",
+            "email": "m@example.com",
+            "password": "x",
+            "created_at": now_utc(),
+        }
+    )
+    wishlist = await repository.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    item = await repository.add_item(
+        wishlist["id"],
+        {
+            "name": "A",
+            "is_reserved": False,
+            "created_at": now_utc(),
+            "updated_at": now_utc(),
+        },
+    )
+    before = metrics.reservation_conflicts.values().get(("reserve",), 0)
+    url = f"/wishlists/{wishlist['id']}/items/{item['id']}/reserve"
+    assert client.put(url, json={"reserved_by": "A"}).status_code == 200
+    assert client.put(url, json={"reserved_by": "B"}).status_code == 400
+    assert metrics.reservation_conflicts.values()[("reserve",)] == before + 1
+    assert 'store_records{kind="items"} 1' in client.get("/metrics").text
@@ -0,0 +1,53 @@
+import uuid
+
+from fastapi.testclient import TestClient
+from starlette.applications import Starlette
+from starlette.responses import PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from app.main import app
+from app.middleware import CorrelationIdMiddleware
+
+client = TestClient(app)
+
+
+def test_generates_correlation_id():
+    r = client.get("/health")
+    uuid.UUID(r.headers["X-Correlation-ID"])
+
+
+def test_reuses_incoming_id_in_problem_detail():
+    r = client.get("/wishlists/999/items", headers={"X-Correlation-ID": "req-42"})
+    assert r.status_code == 404
+    assert r.headers["X-Correlation-ID"] == "req-42"
+    assert r.json()["correlation_id"] == "req-42"
+    assert r.headers.get_list("X-Correlation-ID") == ["req-42"]
+
+
+def test_rejects_unsafe_incoming_id():
+    r = client.get("/health", headers={"X-Correlation-ID": "bad id\twith spaces"})
+    uuid.UUID(r.headers["X-Correlation-ID"])
+
+    r = client.get("/health", headers={"X-Correlation-ID": "x" * 200})
+    uuid.UUID(r.headers["X-Correlation-ID"])
+
+
+def test_streaming_chunks_pass_through():
+    async def chunks():
+        for n in range(3):
+            yield f"{n}\n"
+
+    async def stream(request):
+        return StreamingResponse(chunks())
+
+    async def state(request):
+        return PlainTextResponse(request.state.correlation_id)
+
+    inner = Starlette(routes=[Route("/stream", stream), Route("/state", state)])
+    with TestClient(CorrelationIdMiddleware(inner)) as test_client:
+        r = test_client.get("/stream", headers={"X-Correlation-ID": "abc"})
+        assert r.text == "0\n1\n2\n"
+        assert r.headers["X-Correlation-ID"] == "abc"
+
+        r = test_client.get("/state")
+        assert r.text == r.headers["X-Correlation-ID"]
@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.database import InMemoryStore
+from app.main import app
+from app.models import now_utc
+from app.repository import InMemoryRepository, get_repository
+from app.sql_repository import SQLiteRepository
+
+PARALLEL = 100
+
+
+def test_compare_and_set_single_winner_threads():
+    store = InMemoryStore()
+    wishlist = store.add_wishlist({"name": "WL", "owner_id": 1})
+    item = store.add_item(wishlist["id"], {"name": "Item", "is_reserved": False})
+    barrier = threading.Barrier(PARALLEL)
+
+    def attempt(n):
+        barrier.wait()
+        return store.compare_and_set_item(
+            wishlist["id"],
+            item["id"],
+            {"is_reserved": False},
+            {"is_reserved": True, "reserved_by": f"user{n}"},
+        )
+
+    with ThreadPoolExecutor(max_workers=PARALLEL) as pool:
+        results = list(pool.map(attempt, range(PARALLEL)))
+
+    winners = [r for r in results if r is not None]
+    assert len(winners) == 1
+    assert store.get_item(item["id"])["reserved_by"] == winners[0]["reserved_by"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("backend", ["memory", "sqlite"])
+async def test_parallel_reserve_requests_single_success(backend, tmp_path):
+    if backend == "memory":
+        repository = InMemoryRepository(InMemoryStore())
+    else:
+        repository = SQLiteRepository(str(tmp_path / "race.db"), 4, 5.0)
+    app.dependency_overrides[get_repository] = lambda: repository
+    try:
+        user = await repository.create_user(
+            {
+                "username": "race",
+                "email": "race@example.com",
+                "password": "x",
+                "created_at": now_utc(),
+            }
+        )
+        wishlist = await repository.create_wishlist(
+            {
+                "owner_id": user["id"],
+                "name": "WL",
+                "is_public": True,
+                "created_at": now_utc(),
+            }
+        )
+        item = await repository.add_item(
+            wishlist["id"],
+            {
+                "name": "Item",
+                "is_reserved": False,
+                "created_at": now_utc(),
+                "updated_at": now_utc(),
+            },
+        )
+        url = f"/wishlists/{wishlist['id']}/items/{item['id']}/reserve"
+
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *(
+                    client.put(url, json={"reserved_by": f"user{n}"})
+                    for n in range(PARALLEL)
+                )
+            )
+    finally:
+        app.dependency_overrides.clear()
+        await repository.close()
+
+    statuses = [r.status_code for r in responses]
+    assert statuses.count(200) == 1
+    assert statuses.count(400) == PARALLEL - 1
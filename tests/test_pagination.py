@@ -0,0 +1,102 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+ITEMS = [
+    {"name": "Книга 1", "price": 100, "category": "Книги"},
+    {"name": "Наушники", "price": 5000, "category": "Техника"},
+    {"name": "Книга 2", "price": 300, "category": "Книги"},
+    {"name": "Кружка", "price": 250},
+    {"name": "Книга 3", "price": 900, "category": "Книги"},
+]
+
+
+@pytest.fixture
+def client(repository):
+    return TestClient(app)
+
+
+@pytest.fixture
+def wishlist(client):
+    r = client.post(
+        "/users",
+        json={
+            "username": "pager",
+            "email": "pager@example.com",
+            "password": "secret123",
+        },
+    )
+    user_id = r.json()["id"]
+    r = client.post("/wishlists", params={"user_id": user_id}, json={"name": "WL"})
+    wl_id = r.json()["id"]
+    ids = [client.post(f"/wishlists/{wl_id}/items", json=i).json()["id"] for i in ITEMS]
+    client.put(f"/wishlists/{wl_id}/items/{ids[2]}/reserve", json={"reserved_by": "A"})
+    return user_id, wl_id, ids
+
+
+def names(response):
+    return [item["name"] for item in response.json()]
+
+
+def test_keyset_pages(client, wishlist):
+    _, wl_id, ids = wishlist
+    r = client.get(f"/wishlists/{wl_id}/items", params={"limit": 2})
+    assert [i["id"] for i in r.json()] == ids[:2]
+    cursor = r.headers["X-Next-Cursor"]
+
+    r = client.get(f"/wishlists/{wl_id}/items", params={"limit": 2, "after": cursor})
+    assert [i["id"] for i in r.json()] == ids[2:4]
+
+    r = client.get(
+        f"/wishlists/{wl_id}/items",
+        params={"limit": 2, "after": r.headers["X-Next-Cursor"]},
+    )
+    assert [i["id"] for i in r.json()] == ids[4:]
+    assert "X-Next-Cursor" not in r.headers
+
+
+def test_filters(client, wishlist):
+    _, wl_id, _ = wishlist
+    url = f"/wishlists/{wl_id}/items"
+
+    r = client.get(url, params={"category": "Книги"})
+    assert names(r) == ["Книга 1", "Книга 2", "Книга 3"]
+
+    r = client.get(url, params={"min_price": 250, "max_price": 900})
+    assert names(r) == ["Книга 2", "Кружка", "Книга 3"]
+
+    r = client.get(url, params={"category": "Книги", "is_reserved": False})
+    assert names(r) == ["Книга 1", "Книга 3"]
+
+    r = client.get(url, params={"is_reserved": True, "max_price": 1000})
+    assert names(r) == ["Книга 2"]
+
+
+def test_filters_follow_updates(client, wishlist):
+    _, wl_id, ids = wishlist
+    url = f"/wishlists/{wl_id}/items"
+    client.put(f"{url}/{ids[3]}", json={"name": "Кружка", "category": "Книги"})
+    client.delete(f"{url}/{ids[0]}")
+    client.put(f"{url}/{ids[2]}/unreserve")
+
+    r = client.get(url, params={"category": "Книги", "is_reserved": False})
+    assert names(r) == ["Книга 2", "Кружка", "Книга 3"]
+
+
+def test_user_wishlists_pages(client, wishlist):
+    user_id, wl_id, _ = wishlist
+    second = client.post(
+        "/wishlists", params={"user_id": user_id}, json={"name": "WL2"}
+    ).json()["id"]
+
+    r = client.get(f"/users/{user_id}/wishlists", params={"limit": 1})
+    assert [w["id"] for w in r.json()] == [wl_id]
+    assert r.json()[0]["item_count"] == len(ITEMS)
+
+    r = client.get(
+        f"/users/{user_id}/wishlists",
+        params={"limit": 1, "after": r.headers["X-Next-Cursor"]},
+    )
+    assert [w["id"] for w in r.json()] == [second]
+    assert "X-Next-Cursor" not in r.headers
@@ -0,0 +1,234 @@
+import asyncio
+import os
+from decimal import Decimal
+
+import pytest
+
+from app.database import InMemoryStore, StoredItem
+from app.models import now_utc
+from app.persistence import (
+    SNAPSHOT_FILE,
+    Persistence,
+    decode_item,
+    encode_item,
+    list_segments,
+    segment_path,
+)
+from app.repository import InMemoryRepository
+
+
+def item_record(n, **changes):
+    now = now_utc()
+    return {
+        "name": f"Item {n}",
+        "description": None if n % 2 else "Описание",
+        "price": Decimal(n) + Decimal("0.99"),
+        "url": None,
+        "category": "Книги" if n % 3 else None,
+        "is_reserved": False,
+        "reserved_by": None,
+        "created_at": now,
+        "updated_at": now,
+        **changes,
+    }
+
+
+async def open_repository(directory):
+    store = InMemoryStore()
+    persistence = Persistence(store, directory, commit_interval=0.001)
+    await asyncio.to_thread(persistence.open)
+    return InMemoryRepository(store, persistence)
+
+
+async def seed(repo):
+    user = await repo.create_user(
+        {
+            "username": "wal",
+            "email": "wal@example.com",
+            "password": "x",
+            "created_at": now_utc(),
+            "wishlists": [],
+        }
+    )
+    wishlist = await repo.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    items = await repo.add_items(wishlist["id"], [item_record(n) for n in range(5)])
+    await repo.add_item(wishlist["id"], item_record(5, price=None))
+    await repo.compare_and_set_item(
+        wishlist["id"],
+        items[0]["id"],
+        {"is_reserved": False},
+        {"is_reserved": True, "reserved_by": "Аня", "reserved_at": now_utc()},
+    )
+    await repo.delete_item(wishlist["id"], items[1]["id"])
+    other = await repo.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "Tmp",
+            "is_public": False,
+            "created_at": now_utc(),
+        }
+    )
+    await repo.add_item(other["id"], item_record(9))
+    await repo.delete_wishlist(other["id"])
+    return user, wishlist
+
+
+def state(store):
+    return {
+        "users": {
+            user_id: {k: v for k, v in user.items()}
+            for user_id, user in store.users.items()
+        },
+        "wishlists": {
+            wishlist_id: (
+                {k: v for k, v in wishlist.items() if k != "items"},
+                store.list_items(wishlist_id),
+            )
+            for wishlist_id, wishlist in store.wishlists.items()
+        },
+        "next": (store.next_user_id, store.next_wishlist_id, store.next_item_id),
+    }
+
+
+async def test_wal_replay_restores_state(tmp_path):
+    repo = await open_repository(tmp_path)
+    _, wishlist = await seed(repo)
+    expected = state(repo.store)
+    await repo.persistence.close(snapshot=False)
+
+    restored = await open_repository(tmp_path)
+    assert state(restored.store) == expected
+    assert restored.persistence.stats.wal_records > 0
+    assert (
+        restored.store.list_items(wishlist["id"], is_reserved=True)[0]["reserved_by"]
+        == "Аня"
+    )
+
+    # Счётчики id и версий продолжаются после восстановления
+    item = await restored.add_item(wishlist["id"], item_record(7))
+    assert item["id"] == expected["next"][2]
+    assert (
+        restored.store.get_wishlist(wishlist["id"])["version"]
+        > expected["wishlists"][wishlist["id"]][0]["version"]
+    )
+    await restored.close()
+
+
+async def test_snapshot_plus_tail(tmp_path):
+    repo = await open_repository(tmp_path)
+    _, wishlist = await seed(repo)
+    await repo.persistence.snapshot()
+    items = await repo.list_items(wishlist["id"])
+    await repo.update_item(wishlist["id"], items[-1]["id"], {"name": "После снимка"})
+    await repo.add_item(wishlist["id"], item_record(8))
+    expected = state(repo.store)
+    await repo.persistence.close(snapshot=False)
+
+    assert (tmp_path / SNAPSHOT_FILE).exists()
+    assert len(list_segments(tmp_path)) == 1  # сегменты до снимка удалены
+
+    restored = await open_repository(tmp_path)
+    assert state(restored.store) == expected
+    assert restored.persistence.stats.snapshot_records > 0
+    assert restored.persistence.stats.wal_records == 2
+    # Поисковый индекс перестроен по восстановленным элементам
+    total, found, _, _ = restored.store.search("снимка")
+    assert total == 1 and found[0]["id"] == items[-1]["id"]
+    # Сводка вишлиста тоже пересчитана
+    before = repo.store.summary(repo.store.get_wishlist(wishlist["id"]))
+    after = restored.store.summary(restored.store.get_wishlist(wishlist["id"]))
+    assert after == before
+    await restored.close()
+
+
+async def test_torn_tail_is_truncated(tmp_path):
+    repo = await open_repository(tmp_path)
+    _, wishlist = await seed(repo)
+    expected = state(repo.store)
+    await repo.add_item(wishlist["id"], item_record(8))
+    await repo.persistence.close(snapshot=False)
+
+    # Сбой посреди записи последнего кадра
+    path = segment_path(tmp_path, list_segments(tmp_path)[-1])
+    size = path.stat().st_size
+    with open(path, "r+b") as file:
+        file.truncate(size - 3)
+
+    restored = await open_repository(tmp_path)
+    assert state(restored.store) == expected
+    assert restored.persistence.stats.truncated_bytes > 0
+    assert path.stat().st_size < size - 3
+
+    # После отрезания хвоста журнал снова пригоден для записи и чтения
+    await restored.add_item(wishlist["id"], item_record(8))
+    expected = state(restored.store)
+    await restored.persistence.close(snapshot=False)
+    again = await open_repository(tmp_path)
+    assert state(again.store) == expected
+    await again.close()
+
+
+async def test_group_commit_batches_fsync(tmp_path):
+    repo = await open_repository(tmp_path)
+    _, wishlist = await seed(repo)
+    before = repo.persistence.wal.fsyncs
+    await asyncio.gather(
+        *(repo.add_item(wishlist["id"], item_record(n)) for n in range(200))
+    )
+    assert repo.persistence.wal.fsyncs - before < 20
+    await repo.close()
+
+
+async def test_failed_write_fails_waiters(tmp_path, monkeypatch):
+    repo = await open_repository(tmp_path)
+    _, wishlist = await seed(repo)
+    fsync = os.fsync
+    failures = [OSError("EIO")]
+
+    def broken(fd):
+        # Кадры уже в файле, но fsync группы не прошёл
+        if failures:
+            raise failures.pop()
+        fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", broken)
+    with pytest.raises(OSError):
+        await repo.add_item(wishlist["id"], item_record(1))
+    # Потерянные кадры не подтверждаются следующими фиксациями
+    with pytest.raises(OSError):
+        await repo.persistence.sync()
+
+    await repo.add_item(wishlist["id"], item_record(2))
+    await repo.persistence.close(snapshot=False)
+
+    # Хвост несостоявшейся группы отрезан, кадры после сбоя восстанавливаются
+    restored = await open_repository(tmp_path)
+    assert restored.persistence.stats.truncated_bytes == 0
+    names = {item["name"] for item in restored.store.list_items(wishlist["id"])}
+    assert "Item 2" in names and "Item 1" not in names
+    await restored.close()
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {},
+        {"price": None, "created_at": None, "updated_at": None},
+        {"price": Decimal("1E+30"), "category": None},
+        {"price": Decimal("123456789012345678901234.5")},
+        {"is_reserved": True, "reserved_by": "B", "reserved_at": now_utc()},
+    ],
+)
+def test_item_encoding_round_trip(changes):
+    item = StoredItem(3, 2, 11, item_record(4, **changes))
+    decoded, wishlist_version = decode_item(encode_item(item, 12))
+    assert wishlist_version == 12
+    assert decoded.to_dict() == item.to_dict()
+    assert decoded.price_key == item.price_key
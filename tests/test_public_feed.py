@@ -0,0 +1,141 @@
+import random
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.database import InMemoryStore
+from app.main import app
+from app.models import now_utc
+
+
+@pytest.fixture
+def client(repository):
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_id(client):
+    r = client.post(
+        "/users",
+        json={
+            "username": "feeder",
+            "email": "feeder@example.com",
+            "password": "secret123",
+        },
+    )
+    return r.json()["id"]
+
+
+def create_wishlist(client, user_id, name, is_public=True):
+    r = client.post(
+        "/wishlists",
+        params={"user_id": user_id},
+        json={"name": name, "is_public": is_public},
+    )
+    return r.json()["id"]
+
+
+def brute_force_summary(items):
+    prices = [item.price for item in items if item.price is not None]
+    return {
+        "item_count": len(items),
+        "reserved_count": sum(item.is_reserved for item in items),
+        "total_price": sum(prices, Decimal(0)),
+        "min_price": min(prices, default=None),
+        "max_price": max(prices, default=None),
+    }
+
+
+def test_summary_follows_item_changes(client, user_id):
+    wl_id = create_wishlist(client, user_id, "WL")
+    url = f"/wishlists/{wl_id}/items"
+
+    def summary():
+        r = client.get(f"/users/{user_id}/wishlists")
+        assert r.status_code == 200
+        return r.json()[0]
+
+    empty = summary()
+    assert empty["item_count"] == 0 and empty["total_price"] == "0"
+    assert empty["min_price"] is None and empty["max_price"] is None
+
+    ids = [
+        client.post(url, json={"name": name, "price": price}).json()["id"]
+        for name, price in [("A", "10.50"), ("B", "3"), ("C", None)]
+    ]
+    client.put(f"{url}/{ids[0]}/reserve", json={"reserved_by": "Друг"})
+    body = summary()
+    assert body["item_count"] == 3
+    assert body["reserved_count"] == 1
+    assert Decimal(body["total_price"]) == Decimal("13.50")
+    assert (body["min_price"], body["max_price"]) == ("3", "10.50")
+    assert body["updated_at"] >= empty["updated_at"]
+
+    client.put(f"{url}/{ids[2]}", json={"name": "C", "price": 100})
+    client.delete(f"{url}/{ids[1]}")
+    body = summary()
+    assert body["item_count"] == 2
+    assert Decimal(body["total_price"]) == Decimal("110.50")
+    assert (body["min_price"], body["max_price"]) == ("10.50", "100")
+
+
+def test_public_feed_pages(client, user_id):
+    first = create_wishlist(client, user_id, "Первый")
+    create_wishlist(client, user_id, "Скрытый", is_public=False)
+    second = create_wishlist(client, user_id, "Второй")
+    client.post(f"/wishlists/{second}/items", json={"name": "Книга", "price": 5})
+
+    r = client.get("/wishlists/public", params={"limit": 1})
+    assert r.status_code == 200
+    assert [w["id"] for w in r.json()] == [first]
+
+    r = client.get(
+        "/wishlists/public", params={"limit": 1, "after": r.headers["X-Next-Cursor"]}
+    )
+    assert [w["name"] for w in r.json()] == ["Второй"]
+    assert r.json()[0]["owner_id"] == user_id
+    assert r.json()[0]["item_count"] == 1
+    assert "X-Next-Cursor" not in r.headers
+
+    client.delete(f"/wishlists/{first}")
+    assert [w["id"] for w in client.get("/wishlists/public").json()] == [second]
+
+
+def test_store_summaries_match_brute_force():
+    rng = random.Random(3)
+    store = InMemoryStore()
+    wishlists = [
+        store.add_wishlist({"owner_id": 1, "name": f"WL {n}", "created_at": now_utc()})
+        for n in range(3)
+    ]
+
+    def record():
+        now = now_utc()
+        price = rng.choice([None, Decimal(rng.randrange(1, 10000)) / 100])
+        return {"name": "x", "price": price, "created_at": now, "updated_at": now}
+
+    live = []
+    for _ in range(300):
+        wl_id = rng.choice(wishlists)["id"]
+        action = rng.random()
+        if action < 0.4 or not live:
+            live.append((wl_id, store.add_item(wl_id, record())["id"]))
+        elif action < 0.5:
+            batch = store.add_items(wl_id, [record() for _ in range(5)])
+            live.extend((wl_id, item["id"]) for item in batch)
+        elif action < 0.8:
+            wl_id, item_id = rng.choice(live)
+            changes = rng.choice(
+                [{"price": record()["price"]}, {"is_reserved": rng.random() < 0.5}]
+            )
+            store.update_item(wl_id, item_id, {**changes, "updated_at": now_utc()})
+        else:
+            store.delete_item(*live.pop(rng.randrange(len(live))))
+
+    for wishlist in wishlists:
+        items = list(wishlist["items"].values())
+        expected = brute_force_summary(items)
+        summary = store.summary(wishlist)
+        assert {key: summary[key] for key in expected} == expected
+        assert summary["updated_at"] >= max(item.get("updated_at") for item in items)
@@ -0,0 +1,104 @@
+import sqlite3
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.rate_limit import InMemoryRateLimitStore, SQLiteRateLimitStore, rate_limiter
+
+client = TestClient(app)
+
+
+def test_sliding_window_counter():
+    store = InMemoryRateLimitStore(shards=4)
+    for _ in range(3):
+        assert store.hit("ip:1", 3, 60, now=120) == 0
+    retry = store.hit("ip:1", 3, 60, now=130)
+    assert retry > 0
+
+    # В следующем окне прошлые попытки учитываются с убывающим весом
+    assert store.hit("ip:1", 3, 60, now=180) > 0
+    assert store.hit("ip:1", 3, 60, now=235) == 0
+
+
+def test_expired_buckets_are_swept():
+    store = InMemoryRateLimitStore(shards=1)
+    for ip in range(100):
+        store.hit(f"ip:{ip}", 10, 60, now=0)
+    assert len(store) == 100
+
+    store.hit("ip:new", 10, 60, now=1000)
+    assert len(store) == 1
+
+
+def test_sqlite_store_is_shared(tmp_path):
+    path = str(tmp_path / "limits.db")
+    worker_a = SQLiteRateLimitStore(path)
+    worker_b = SQLiteRateLimitStore(path)
+
+    assert worker_a.hit("ip:1", 2, 60, now=0) == 0
+    assert worker_b.hit("ip:1", 2, 60, now=1) == 0
+    assert worker_a.hit("ip:1", 2, 60, now=2) > 0
+    assert worker_b.peek("ip:1", 2, 60, now=2) > 0
+
+
+def test_sqlite_sweep_keeps_longer_windows(tmp_path):
+    store = SQLiteRateLimitStore(str(tmp_path / "limits.db"))
+    store.hit("acct:stale", 5, 900, now=0)
+    for now in (1, 2):
+        assert store.hit("ip:1", 2, 3600, now=now) == 0
+    retry = store.peek("ip:1", 2, 3600, now=1900)
+    assert retry > 0
+
+    # Очистка по окну аккаунта не трогает часовую корзину IP
+    store.hit("acct:fresh", 5, 900, now=1900)
+    assert store.peek("ip:1", 2, 3600, now=1900) == retry
+    keys = {
+        row[0] for row in store._connection().execute("SELECT key FROM rate_limits")
+    }
+    assert keys == {"ip:1", "acct:fresh"}
+
+
+def test_sqlite_store_upgrades_old_table(tmp_path):
+    path = str(tmp_path / "limits.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute(
+            "CREATE TABLE rate_limits (key TEXT PRIMARY KEY, window_start REAL NOT NULL,"
+            " prev_count INTEGER NOT NULL, curr_count INTEGER NOT NULL)"
+        )
+        conn.execute("INSERT INTO rate_limits VALUES ('ip:1', 0, 0, 2)")
+    store = SQLiteRateLimitStore(path)
+    assert store.peek("ip:1", 2, 3600, now=1) > 0
+    store.hit("acct:1", 5, 900, now=1900)
+    assert store.peek("ip:1", 2, 3600, now=1900) > 0
+
+
+@pytest.fixture
+def fresh_limiter(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "store", InMemoryRateLimitStore())
+    return rate_limiter
+
+
+def test_ip_limit_returns_429(fresh_limiter, monkeypatch):
+    monkeypatch.setattr(fresh_limiter, "ip_limit", 2)
+    for _ in range(2):
+        r = client.post("/auth/login", data={"username": "nobody", "password": "x"})
+        assert r.status_code == 401
+
+    r = client.post("/auth/login", data={"username": "nobody", "password": "x"})
+    assert r.status_code == 429
+    assert r.json()["title"] == "Too Many Requests"
+    assert int(r.headers["Retry-After"]) >= 1
+
+    # Остальные эндпоинты не ограничиваются
+    assert client.get("/health").status_code == 200
+
+
+def test_account_lockout_after_failed_logins(fresh_limiter):
+    for _ in range(5):
+        r = client.post("/auth/login", data={"username": "victim", "password": "bad"})
+        assert r.status_code == 401
+
+    r = client.post("/auth/login", data={"username": "victim", "password": "bad"})
+    assert r.status_code == 429
+    assert "Retry-After" in r.headers
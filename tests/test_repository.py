@@ -0,0 +1,152 @@
+import os
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.config import Settings
+from app.database import InMemoryStore
+from app.main import app
+from app.models import now_utc
+from app.repository import InMemoryRepository, get_repository
+from app.sql_repository import PostgresRepository, SQLiteRepository, SqlRepository
+
+BACKENDS = ["memory", "sqlite"]
+if os.getenv("TEST_POSTGRES"):
+    BACKENDS.append("postgres")
+
+
+@pytest.fixture(params=BACKENDS)
+async def repo(request, tmp_path):
+    if request.param == "memory":
+        repository = InMemoryRepository(InMemoryStore())
+    elif request.param == "sqlite":
+        repository = SQLiteRepository(str(tmp_path / "test.db"), 2, 1.0)
+    else:
+        repository = await PostgresRepository.connect(Settings())
+        await repository._fetch("TRUNCATE users RESTART IDENTITY CASCADE")
+    yield repository
+    await repository.close()
+
+
+def user_record(name):
+    return {
+        "username": name,
+        "email": f"{name}@example.com",
+        "password": "secret123",
+        "created_at": now_utc(),
+    }
+
+
+def item_record(name, price=None):
+    now = now_utc()
+    return {
+        "name": name,
+        "description": None,
+        "price": price,
+        "url": None,
+        "category": "Книги",
+        "is_reserved": False,
+        "reserved_by": None,
+        "created_at": now,
+        "updated_at": now,
+    }
+
+
+@pytest.mark.asyncio
+async def test_user_crud(repo):
+    user = await repo.create_user(user_record("alice"))
+    assert (await repo.get_user(user["id"]))["username"] == "alice"
+    assert (await repo.get_user_by_username("alice"))["id"] == user["id"]
+    assert (await repo.get_user_by_email("alice@example.com"))["id"] == user["id"]
+
+    assert (await repo.delete_user(user["id"]))["username"] == "alice"
+    assert await repo.get_user(user["id"]) is None
+    assert await repo.delete_user(user["id"]) is None
+
+
+@pytest.mark.asyncio
+async def test_items_and_cascade(repo):
+    user = await repo.create_user(user_record("bob"))
+    wishlist = await repo.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "description": None,
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    item = await repo.add_item(wishlist["id"], item_record("Книга", Decimal("10.50")))
+    assert item["wishlist_id"] == wishlist["id"]
+    assert (await repo.get_item(item["id"]))["price"] == Decimal("10.50")
+    assert await repo.get_wishlist_item(wishlist["id"] + 1, item["id"]) is None
+
+    updated = await repo.update_item(wishlist["id"], item["id"], {"name": "Новое"})
+    assert updated["name"] == "Новое"
+    assert [i["id"] for i in await repo.list_items(wishlist["id"])] == [item["id"]]
+
+    summaries = await repo.list_user_wishlists(user["id"])
+    assert summaries[0]["item_count"] == 1
+    assert summaries[0]["is_public"] is True
+
+    await repo.delete_user(user["id"])
+    assert await repo.get_wishlist(wishlist["id"]) is None
+    assert await repo.get_item(item["id"]) is None
+
+
+def test_api_on_sqlite_backend(tmp_path):
+    repository = SQLiteRepository(str(tmp_path / "api.db"), 2, 1.0)
+    app.dependency_overrides[get_repository] = lambda: repository
+    try:
+        client = TestClient(app)
+        r = client.post(
+            "/users",
+            json={
+                "username": "sql",
+                "email": "sql@example.com",
+                "password": "secret123",
+            },
+        )
+        assert r.status_code == 200
+        user_id = r.json()["id"]
+
+        r = client.post("/wishlists", params={"user_id": user_id}, json={"name": "WL"})
+        wl_id = r.json()["id"]
+
+        r = client.post(f"/wishlists/{wl_id}/items", json={"name": "Книга", "price": 5})
+        assert r.status_code == 200
+        item_id = r.json()["id"]
+
+        r = client.put(
+            f"/wishlists/{wl_id}/items/{item_id}/reserve", json={"reserved_by": "A"}
+        )
+        assert r.json()["is_reserved"] is True
+
+        r = client.get(f"/users/{user_id}/wishlists/{wl_id}")
+        assert r.status_code == 200
+        assert list(r.json()["items"]) == [str(item_id)]
+
+        assert client.delete(f"/users/{user_id}").status_code == 200
+        assert client.get(f"/wishlist/{item_id}").status_code == 404
+    finally:
+        app.dependency_overrides.clear()
+
+
+def test_sql_backend_must_implement_queries():
+    class Incomplete(SqlRepository):
+        async def close(self) -> None: ...
+
+    with pytest.raises(TypeError, match="_fetch"):
+        Incomplete()
+
+
+async def test_sqlite_uses_statement_cache_setting(tmp_path):
+    settings = Settings(
+        db_path=str(tmp_path / "cache.db"),
+        db_pool_max_size=1,
+        db_statement_cache_size=7,
+    )
+    repository = await SQLiteRepository.connect(settings)
+    assert repository._statement_cache_size == 7
+    await repository.close()
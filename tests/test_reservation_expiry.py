@@ -0,0 +1,176 @@
+import asyncio
+from datetime import timedelta
+
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.models import now_utc
+from app.reservations import ReservationExpiry, reservation_expiry
+
+TTL = 0.3
+
+
+async def seed(repository, count, reserved_at=None):
+    user = await repository.create_user(
+        {
+            "username": "giver",
+            "email": "giver@example.com",
+            "password": "x",
+            "created_at": now_utc(),
+        }
+    )
+    wishlist = await repository.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    now = now_utc()
+    items = await repository.add_items(
+        wishlist["id"],
+        [
+            {
+                "name": f"Item {n}",
+                "is_reserved": False,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for n in range(count)
+        ],
+    )
+    if reserved_at is not None:
+        for item in items:
+            await repository.update_item(
+                wishlist["id"],
+                item["id"],
+                {"is_reserved": True, "reserved_by": "A", "reserved_at": reserved_at},
+            )
+    return wishlist["id"], [item["id"] for item in items]
+
+
+async def test_reservation_expires_through_api(repository):
+    wl_id, (first, second) = await seed(repository, 2)
+    await reservation_expiry.start(repository, TTL)
+    try:
+        transport = ASGITransport(app=app)
+        async with AsyncClient(transport=transport, base_url="http://test") as client:
+            url = f"/wishlists/{wl_id}/items"
+            r = await client.put(f"{url}/{first}/reserve", json={"reserved_by": "A"})
+            assert r.status_code == 200
+            # Ручное снятие и новый резерв: первый срок устарел и ничего не снимет
+            await client.put(f"{url}/{second}/reserve", json={"reserved_by": "B"})
+            await client.put(f"{url}/{second}/unreserve")
+            await asyncio.sleep(TTL / 2)
+            await client.put(f"{url}/{second}/reserve", json={"reserved_by": "C"})
+            assert len(reservation_expiry) == 3
+
+            await asyncio.sleep(TTL * 0.75)
+            assert (await repository.get_item(first))["is_reserved"] is False
+            assert (await repository.get_item(second))["reserved_by"] == "C"
+
+            await asyncio.sleep(TTL)
+            item = await repository.get_item(second)
+            assert item["is_reserved"] is False and item["reserved_at"] is None
+            assert reservation_expiry.expired == 2
+            assert len(reservation_expiry) == 0
+
+            # Снятый резерв снова можно поставить
+            r = await client.put(f"{url}/{first}/reserve", json={"reserved_by": "D"})
+            assert r.status_code == 200
+    finally:
+        await reservation_expiry.stop()
+        reservation_expiry.expired = 0
+
+
+async def test_existing_reservations_expire_in_batches(repository):
+    stale = now_utc() - timedelta(hours=1)
+    wl_id, ids = await seed(repository, 5, reserved_at=stale)
+    fresh = (await seed_more(repository, wl_id))["id"]
+    expiry = ReservationExpiry(batch_size=2)
+    await expiry.start(repository, ttl=600)
+    try:
+        assert len(expiry) == 6
+        for _ in range(100):
+            if expiry.expired == len(ids):
+                break
+            await asyncio.sleep(0.01)
+        assert expiry.expired == len(ids)
+        assert not any([(await repository.get_item(i))["is_reserved"] for i in ids])
+        assert (await repository.get_item(fresh))["is_reserved"] is True
+        assert len(expiry) == 1
+    finally:
+        await expiry.stop()
+
+
+async def test_failed_expiry_is_retried(repository, monkeypatch):
+    stale = now_utc() - timedelta(hours=1)
+    wl_id, ids = await seed(repository, 3, reserved_at=stale)
+    compare_and_set = repository.compare_and_set_item
+    failures = {ids[1]}
+
+    async def flaky(wishlist_id, item_id, expected, changes):
+        # Один элемент пачки падает на первой попытке (занятая база и т. п.)
+        if item_id in failures:
+            failures.discard(item_id)
+            raise RuntimeError("database is locked")
+        return await compare_and_set(wishlist_id, item_id, expected, changes)
+
+    monkeypatch.setattr(repository, "compare_and_set_item", flaky)
+    expiry = ReservationExpiry(retry_delay=0.05)
+    await expiry.start(repository, ttl=600)
+    try:
+        for _ in range(100):
+            if expiry.expired == len(ids):
+                break
+            await asyncio.sleep(0.01)
+        assert not failures
+        assert expiry.expired == len(ids)
+        assert not any([(await repository.get_item(i))["is_reserved"] for i in ids])
+        assert len(expiry) == 0
+    finally:
+        await expiry.stop()
+
+
+async def seed_more(repository, wl_id):
+    now = now_utc()
+    return await repository.add_item(
+        wl_id,
+        {
+            "name": "Свежий",
+            "is_reserved": True,
+            "reserved_by": "B",
+            "reserved_at": now,
+            "created_at": now,
+            "updated_at": now,
+        },
+    )
+
+
+async def test_earlier_deadline_wakes_scheduler(repository):
+    wl_id, (late, early) = await seed(repository, 2)
+    expiry = ReservationExpiry()
+    await expiry.start(repository, ttl=TTL)
+    try:
+        reserved_at = now_utc()
+        for item_id, at in ((late, reserved_at), (early, reserved_at - timedelta(1))):
+            item = await repository.update_item(
+                wl_id,
+                item_id,
+                {"is_reserved": True, "reserved_by": "A", "reserved_at": at},
+            )
+            expiry.schedule(item)
+        await asyncio.sleep(0.05)
+        assert (await repository.get_item(early))["is_reserved"] is False
+        assert (await repository.get_item(late))["is_reserved"] is True
+    finally:
+        await expiry.stop()
+
+
+async def test_disabled_without_ttl(repository):
+    expiry = ReservationExpiry()
+    await expiry.start(repository, ttl=0)
+    assert not expiry.enabled
+    expiry.schedule({"id": 1, "wishlist_id": 1, "reserved_at": now_utc()})
+    assert len(expiry) == 0
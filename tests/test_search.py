@@ -0,0 +1,182 @@
+import random
+from decimal import Decimal
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import search
+from app.database import InMemoryStore
+from app.main import app
+from app.models import now_utc
+
+ITEMS = [
+    {"name": "Книга о Python", "price": 900, "category": "Книги"},
+    {
+        "name": "Кружка",
+        "description": "С надписью про Python",
+        "price": 300,
+        "category": "Посуда",
+    },
+    {"name": "Python Cookbook", "description": "Книга рецептов", "price": 2500},
+    {"name": "Наушники", "price": 5000, "category": "Техника"},
+]
+
+
+@pytest.fixture
+def client(repository):
+    return TestClient(app)
+
+
+@pytest.fixture
+def items(client):
+    r = client.post(
+        "/users",
+        json={
+            "username": "seeker",
+            "email": "seeker@example.com",
+            "password": "secret123",
+        },
+    )
+    user_id = r.json()["id"]
+    public = client.post(
+        "/wishlists", params={"user_id": user_id}, json={"name": "Public"}
+    ).json()["id"]
+    private = client.post(
+        "/wishlists",
+        params={"user_id": user_id},
+        json={"name": "Private", "is_public": False},
+    ).json()["id"]
+    ids = [
+        client.post(f"/wishlists/{public}/items", json=item).json()["id"]
+        for item in ITEMS
+    ]
+    client.post(f"/wishlists/{private}/items", json={"name": "Секретный Python"})
+    return public, ids
+
+
+def found(response):
+    return [item["id"] for item in response.json()["items"]]
+
+
+def test_tokenize():
+    assert search.tokenize("Ёлка, ёлка_2 и ЁЛКА!") == ["елка", "2", "и"]
+    assert search.tokenize(None) == []
+
+
+def test_sorted_pairs(monkeypatch):
+    monkeypatch.setattr(search.SortedPairs, "BLOCK_SIZE", 4)
+    pairs = search.SortedPairs()
+    keys = list(range(0, 100, 3))
+    for key in reversed(keys):
+        pairs.add((key, key + 1000))
+    pairs.remove((30, 1030))
+    pairs.remove((31, 1031))  # отсутствующая пара — no-op
+    assert len(pairs) == len(keys) - 1
+    assert pairs.count() == len(keys) - 1
+    expected = [key + 1000 for key in range(12, 40, 3) if key != 30]
+    assert list(pairs.ids(10, 40)) == expected
+    assert pairs.count(10, 40) == 9
+    assert pairs.count(None, 2) == 1 and pairs.count(200) == 0
+
+
+def test_index_matches_brute_force():
+    rng = random.Random(7)
+    words = ["alpha", "beta", "gamma", "delta", "eta", "theta", "iota", "kappa"]
+    store = InMemoryStore()
+    wishlist = store.add_wishlist({"owner_id": 1, "name": "WL", "is_public": True})
+    records = [
+        {
+            "name": " ".join(rng.sample(words, 2)),
+            "description": rng.choice([None, rng.choice(words)]),
+            "price": (
+                Decimal(rng.randrange(0, 12000)) / 4 if rng.random() < 0.9 else None
+            ),
+            "category": rng.choice([None, "A", "B"]),
+            "created_at": now_utc(),
+        }
+        for _ in range(300)
+    ]
+    store.add_items(wishlist["id"], records)
+    items = store.list_items(wishlist["id"])
+
+    for _ in range(100):
+        term = rng.choice(words)
+        low = rng.choice([None, Decimal(rng.randrange(0, 3000))])
+        high = rng.choice([None, Decimal(rng.randrange(0, 12000)) / 4])
+        category = rng.choice([None, "A", "B"])
+        expected = [
+            item
+            for item in items
+            if term in search.tokenize(f"{item['name']} {item['description']}")
+            and (category is None or item["category"] == category)
+            and (low is None or (item["price"] is not None and item["price"] >= low))
+            and (high is None or (item["price"] is not None and item["price"] <= high))
+        ]
+        total, page, _, _ = store.search(term, category, low, high, limit=1000)
+        assert total == len(expected)
+        assert {item["id"] for item in page} == {item["id"] for item in expected}
+        scores = [item["score"] for item in page]
+        assert scores == sorted(scores, reverse=True)
+
+
+def test_ranked_results_from_public_wishlists(client, items):
+    _, ids = items
+    r = client.get("/search", params={"q": "python"})
+    assert r.status_code == 200
+    body = r.json()
+    # Совпадение в названии весомее, чем в описании; приватный не найден
+    assert body["total"] == 3
+    assert found(r) == [ids[0], ids[2], ids[1]]
+    assert [item["score"] for item in body["items"]] == [2, 2, 1]
+    assert body["items"][0]["wishlist_id"] == items[0]
+
+    r = client.get("/search", params={"q": "книга python"})
+    assert found(r) == [ids[0], ids[2]]
+    assert client.get("/search", params={"q": "ноутбук"}).json()["total"] == 0
+
+
+def test_filters_and_facets(client, items):
+    _, ids = items
+    r = client.get("/search", params={"q": "python", "category": "Книги"})
+    body = r.json()
+    assert found(r) == [ids[0]]
+    assert body["total"] == 1
+    # Фасет категорий не сужается собственным фильтром
+    assert body["facets"]["category"] == {"Книги": 1, "Посуда": 1}
+
+    r = client.get(
+        "/search", params={"q": "python", "min_price": 500, "max_price": 2500}
+    )
+    body = r.json()
+    assert found(r) == [ids[0], ids[2]]
+    assert body["facets"]["category"] == {"Книги": 1}
+    prices = {facet["min"]: facet["count"] for facet in body["facets"]["price"]}
+    assert prices == {"0": 1, "500": 1, "1000": 1, "5000": 0, "10000": 0}
+
+    r = client.get("/search", params={"q": "python", "limit": 1, "offset": 1})
+    assert found(r) == [ids[2]]
+    assert r.json()["total"] == 3
+
+
+def test_index_follows_item_changes(client, items):
+    wishlist_id, ids = items
+    url = f"/wishlists/{wishlist_id}/items/{ids[3]}"
+    r = client.put(url, json={"name": "Наушники для Python", "price": 5000})
+    assert r.status_code == 200
+    assert ids[3] in found(client.get("/search", params={"q": "python"}))
+    assert found(client.get("/search", params={"q": "наушники"})) == [ids[3]]
+
+    client.put(url, json={"name": "Колонка"})
+    assert found(client.get("/search", params={"q": "наушники"})) == []
+
+    client.delete(f"/wishlists/{wishlist_id}/items/{ids[0]}")
+    assert found(client.get("/search", params={"q": "python"})) == [ids[2], ids[1]]
+
+    client.delete(f"/wishlists/{wishlist_id}")
+    assert client.get("/search", params={"q": "python"}).json()["total"] == 0
+
+
+def test_search_validation(client):
+    assert client.get("/search").status_code == 422
+    assert client.get("/search", params={"q": "x", "limit": 1000}).status_code == 422
+    assert client.get("/search", params={"q": "!!!"}).json()["total"] == 0
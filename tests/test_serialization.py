@@ -0,0 +1,81 @@
+import json
+from decimal import Decimal
+
+import pytest
+
+from app.config import settings
+from app.models import WishItemResponse, now_utc
+from app.serialization import ITEMS_JSON
+
+
+@pytest.fixture
+async def wishlist(make_wishlist):
+    now = now_utc()
+    wishlist, _ = await make_wishlist(
+        "json",
+        items=[
+            {
+                "name": f"Item {n}",
+                "description": None,
+                "price": Decimal(n) / 4,
+                "url": None,
+                "category": "Книги" if n % 2 else None,
+                "is_reserved": n == 1,
+                "reserved_by": "A" if n == 1 else None,
+                "reserved_at": now if n == 1 else None,
+            }
+            for n in range(3)
+        ],
+    )
+    return wishlist
+
+
+async def fetch_both(client, monkeypatch, url, **kwargs):
+    monkeypatch.setattr(settings, "fast_json", False)
+    slow = await client.get(url, **kwargs)
+    monkeypatch.setattr(settings, "fast_json", True)
+    fast = await client.get(url, **kwargs)
+    assert fast.status_code == slow.status_code == 200
+    assert fast.headers["content-type"] == "application/json"
+    return slow, fast
+
+
+async def test_items_listing_matches(client, wishlist, monkeypatch):
+    url = f"/wishlists/{wishlist['id']}/items"
+    slow, fast = await fetch_both(client, monkeypatch, url, params={"limit": 2})
+    assert fast.json() == slow.json()
+    assert fast.headers["ETag"] == slow.headers["ETag"]
+    assert fast.headers["X-Next-Cursor"] == slow.headers["X-Next-Cursor"]
+    assert fast.headers["X-Correlation-ID"]
+
+
+async def test_single_item_and_wishlist_match(client, wishlist, monkeypatch):
+    items = (await client.get(f"/wishlists/{wishlist['id']}/items")).json()
+    slow, fast = await fetch_both(client, monkeypatch, f"/wishlist/{items[1]['id']}")
+    assert fast.json() == slow.json()
+    assert fast.headers["ETag"] == slow.headers["ETag"]
+
+    url = f"/users/{wishlist['owner_id']}/wishlists/{wishlist['id']}"
+    slow, fast = await fetch_both(client, monkeypatch, url)
+    assert fast.json() == slow.json()
+
+
+def test_items_adapter_drops_storage_fields():
+    now = now_utc()
+    record = {
+        "id": 1,
+        "wishlist_id": 7,
+        "name": "A",
+        "description": None,
+        "price": Decimal("10.50"),
+        "url": None,
+        "category": None,
+        "is_reserved": False,
+        "reserved_by": None,
+        "reservation_message": None,
+        "created_at": now,
+        "updated_at": now,
+        "version": 3,
+    }
+    expected = WishItemResponse.model_validate(record).model_dump(mode="json")
+    assert json.loads(ITEMS_JSON.dump_json([record])) == [expected]
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+
+import pytest
+
+from app import auth
+from app.config import settings
+from app.exceptions import ProblemDetail
+from app.token_cache import TokenCache
+
+
+def test_hit_miss_and_expiry():
+    cache = TokenCache(max_size=10)
+    assert cache.get("a") is None
+    cache.put("a", 1, time.time() + 60)
+    cache.put("b", 2, time.time() - 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats() == {"size": 1, "hits": 1, "misses": 2}
+
+
+def test_lru_eviction():
+    cache = TokenCache(max_size=2)
+    expires = time.time() + 60
+    cache.put("a", 1, expires)
+    cache.put("b", 2, expires)
+    cache.get("a")
+    cache.put("c", 3, expires)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+
+
+def test_get_current_user_uses_cache():
+    token = auth.create_access_token({"sub": "42"}, expires_delta=timedelta(minutes=5))
+    hits = auth.token_cache.hits
+
+    assert auth.get_current_user(token) == 42
+    assert auth.get_current_user(token) == 42
+    assert auth.token_cache.hits == hits + 1
+
+
+def test_secret_rotation_purges_cache():
+    old_secret = settings.jwt_secret
+    token = auth.create_access_token({"sub": "7"})
+    assert auth.get_current_user(token) == 7
+
+    auth.rotate_jwt_secret(old_secret + "-rotated")
+    try:
+        with pytest.raises(ProblemDetail):
+            auth.get_current_user(token)
+    finally:
+        auth.rotate_jwt_secret(old_secret)
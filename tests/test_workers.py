@@ -0,0 +1,108 @@
+import asyncio
+import multiprocessing
+import sqlite3
+
+import pytest
+from pydantic import ValidationError
+
+from app.config import Settings
+from app.models import now_utc
+from app.sql_repository import SQLiteRepository
+
+PROCESSES = 4
+PER_PROCESS = 25
+
+
+def test_workers_require_shared_backends():
+    with pytest.raises(ValidationError, match="DB_BACKEND"):
+        Settings(jwt_secret="x", web_concurrency=2)
+    with pytest.raises(ValidationError, match="RATE_LIMIT_BACKEND"):
+        Settings(jwt_secret="x", web_concurrency=2, db_backend="sqlite")
+    Settings(
+        jwt_secret="x",
+        web_concurrency=2,
+        db_backend="sqlite",
+        rate_limit_backend="sqlite",
+    )
+
+
+async def _worker(path, worker, wishlist_id, item_id):
+    repo = SQLiteRepository(path, 2, 5.0)
+    try:
+        now = now_utc()
+        user_ids, item_ids = [], []
+        for n in range(PER_PROCESS):
+            user = await repo.create_user(
+                {
+                    "username": f"w{worker}-{n}",
+                    "email": f"w{worker}-{n}@example.com",
+                    "password": "x",
+                    "created_at": now,
+                }
+            )
+            user_ids.append(user["id"])
+            items = await repo.add_items(
+                wishlist_id,
+                [
+                    {
+                        "name": "I",
+                        "is_reserved": False,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for _ in range(3)
+                ],
+            )
+            item_ids.extend(item["id"] for item in items)
+        reserved = await repo.compare_and_set_item(
+            wishlist_id,
+            item_id,
+            {"is_reserved": False},
+            {"is_reserved": True, "reserved_by": f"w{worker}"},
+        )
+        return user_ids, item_ids, reserved is not None
+    finally:
+        await repo.close()
+
+
+def _run_worker(args):
+    return asyncio.run(_worker(*args))
+
+
+async def test_processes_share_sqlite_database(tmp_path):
+    path = str(tmp_path / "shared.db")
+    repo = SQLiteRepository(path, 1, 5.0)
+    user = await repo.create_user(
+        {"username": "o", "email": "o@e.com", "password": "x", "created_at": now_utc()}
+    )
+    wishlist = await repo.create_wishlist(
+        {
+            "owner_id": user["id"],
+            "name": "WL",
+            "is_public": True,
+            "created_at": now_utc(),
+        }
+    )
+    now = now_utc()
+    item = await repo.add_item(
+        wishlist["id"],
+        {"name": "Общий", "is_reserved": False, "created_at": now, "updated_at": now},
+    )
+    await repo.close()
+
+    jobs = [(path, n, wishlist["id"], item["id"]) for n in range(PROCESSES)]
+    with multiprocessing.get_context("fork").Pool(PROCESSES) as pool:
+        results = await asyncio.to_thread(pool.map, _run_worker, jobs)
+
+    user_ids = [i for users, _, _ in results for i in users]
+    item_ids = [i for _, items, _ in results for i in items]
+    # Id уникальны во всех процессах, резерв достался ровно одному
+    assert len(set(user_ids)) == len(user_ids) == PROCESSES * PER_PROCESS
+    assert len(set(item_ids)) == len(item_ids) == PROCESSES * PER_PROCESS * 3
+    assert sum(won for _, _, won in results) == 1
+
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == (
+            1 + len(item_ids)
+        )